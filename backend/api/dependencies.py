@@ -17,6 +17,9 @@ from ..infrastructure.database.session import get_db
 from ..infrastructure.auth.jwt_handler import JWTHandler
 from ..app.core.exceptions import AuthenticationException, AuthorizationException
 from ..infrastructure.logging.structured_logger import AuditLogger, SecurityLogger
+from ..infrastructure.database.repositories import (
+    SQLAlchemyMovementRepository, SQLAlchemyProductRepository, SQLAlchemyUserRepository
+)
 
 # Servicios globales
 security = HTTPBearer()
@@ -181,6 +184,22 @@ def require_viewer(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
+# Repositorios (implementaciones concretas de los puertos)
+def get_product_repository(db: Session) -> SQLAlchemyProductRepository:
+    """Proveer repositorio de productos sobre la sesión de la request"""
+    return SQLAlchemyProductRepository(db)
+
+
+def get_movement_repository(db: Session) -> SQLAlchemyMovementRepository:
+    """Proveer repositorio de movimientos sobre la sesión de la request"""
+    return SQLAlchemyMovementRepository(db)
+
+
+def get_user_repository(db: Session) -> SQLAlchemyUserRepository:
+    """Proveer repositorio de usuarios sobre la sesión de la request"""
+    return SQLAlchemyUserRepository(db)
+
+
 # Dependencias para servicios
 def get_jwt_handler():
     """Proveer manejador JWT"""
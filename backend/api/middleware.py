@@ -16,106 +16,15 @@ from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Dict, Any
 
+from ..infrastructure.logging.request_logging import LoggingMiddleware
 from ..infrastructure.logging.structured_logger import AuditLogger
+from ..infrastructure.monitoring.http import MetricsMiddleware, QueryCountMiddleware
+from ..infrastructure.monitoring.request_profiler import ProfilingMiddleware
 
 logger = logging.getLogger(__name__)
 audit_logger = AuditLogger()
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware para logging estructurado de requests y responses.
-    """
-    
-    async def dispatch(self, request: Request, call_next):
-        # Obtener información de la request
-        start_time = time.time()
-        client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "unknown")
-        
-        # Información de autenticación
-        auth_info = "anonymous"
-        user_id = None
-        
-        # Intentar extraer información del token si existe
-        auth_header = request.headers.get("authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            try:
-                from ..infrastructure.auth.jwt_handler import JWTHandler
-                token = auth_header.split(" ")[1]
-                payload = JWTHandler.extract_user_from_token(token)
-                auth_info = payload.get("username", "authenticated")
-                user_id = payload.get("user_id")
-            except:
-                auth_info = "invalid_token"
-        
-        # Log de request
-        request_info = {
-            "method": request.method,
-            "url": str(request.url),
-            "client_ip": client_ip,
-            "user_agent": user_agent[:100],  # Limitar longitud
-            "user": auth_info,
-            "user_id": user_id,
-            "action": "request_start"
-        }
-        
-        logger.info(f"Request: {request.method} {request.url.path}", extra={"extra_data": request_info})
-        
-        try:
-            # Procesar request
-            response = await call_next(request)
-            
-            # Calcular tiempo de respuesta
-            process_time = time.time() - start_time
-            
-            # Log de response
-            response_info = {
-                "method": request.method,
-                "url": str(request.url),
-                "status_code": response.status_code,
-                "process_time": round(process_time, 4),
-                "client_ip": client_ip,
-                "user": auth_info,
-                "user_id": user_id,
-                "action": "request_complete"
-            }
-            
-            log_level = "info" if response.status_code < 400 else "warning" if response.status_code < 500 else "error"
-            getattr(logger, log_level)(
-                f"Response: {request.method} {request.url.path} - {response.status_code} ({process_time:.3f}s)",
-                extra={"extra_data": response_info}
-            )
-            
-            # Agregar header de tiempo de procesamiento
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            return response
-            
-        except Exception as e:
-            # Log de error no manejado
-            process_time = time.time() - start_time
-            error_info = {
-                "method": request.method,
-                "url": str(request.url),
-                "client_ip": client_ip,
-                "user": auth_info,
-                "user_id": user_id,
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "process_time": round(process_time, 4),
-                "action": "request_error"
-            }
-            
-            logger.error(
-                f"Unhandled error: {request.method} {request.url.path} - {str(e)}",
-                extra={"extra_data": error_info},
-                exc_info=True
-            )
-            
-            raise
-
-
 class AuditMiddleware(BaseHTTPMiddleware):
     """
     Middleware para auditoría de acciones específicas.
@@ -185,6 +94,17 @@ def setup_middlewares(app):
     # Audit Middleware
     app.add_middleware(AuditMiddleware)
     
+    # Perfilado bajo demanda (X-Profile: 1, solo administradores).
+    # Va dentro de QueryCountMiddleware para separar tiempo SQL y Python;
+    # las rutas deben usar ProfilingRoute para perfilar el endpoint.
+    app.add_middleware(ProfilingMiddleware)
+    
+    # Conteo de SQL por request (detección de N+1, headers en modo debug)
+    app.add_middleware(QueryCountMiddleware)
+    
+    # Metrics Middleware (latencias Prometheus para /metrics)
+    app.add_middleware(MetricsMiddleware)
+    
     # Security headers middleware (implementación simple)
     @app.middleware("http")
     async def add_security_headers(request: Request, call_next):
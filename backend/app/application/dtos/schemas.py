@@ -12,7 +12,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
-from ....app.domain.entities.user import UserRole as DomainUserRole
+from ...domain.entities.user import UserRole as DomainUserRole
 
 
 # ==================== ENUMS PARA SCHEMAS ====================
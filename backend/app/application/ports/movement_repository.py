@@ -7,7 +7,7 @@ from typing import List, Optional, Tuple
 from datetime import datetime
 
 
-from ....app.domain.entities.inventory_movement import InventoryMovement
+from ...domain.entities.inventory_movement import InventoryMovement
 
 
 class MovementRepository(ABC):
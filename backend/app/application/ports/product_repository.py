@@ -11,7 +11,7 @@ from abc import ABC, abstractmethod
 from typing import Optional, List, Tuple
 from datetime import datetime
 
-from ....app.domain.entities.product import Product
+from ...domain.entities.product import Product
 
 
 class ProductRepository(ABC):
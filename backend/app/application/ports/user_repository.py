@@ -5,7 +5,7 @@ Define operaciones de autenticación y gestión de usuarios.
 from abc import ABC, abstractmethod
 from typing import Optional, List
 
-from ....app.domain.entities.user import User
+from ...domain.entities.user import User
 
 class UserRepository(ABC):
     """Puerto para operaciones de usuarios"""
@@ -6,10 +6,10 @@ from dataclasses import dataclass
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 
-from ....app.core.exceptions import ValidationException, AuthenticationException
-from ....app.domain.entities.user import User
-from ....app.domain.exceptions import InvalidCredentialsError, UserInactiveError
-from ....app.application.ports.user_repository import UserRepository
+from ...core.exceptions import ValidationException, AuthenticationException
+from ...domain.entities.user import User
+from ...domain.exceptions import InvalidCredentialsError, UserInactiveError
+from ...application.ports.user_repository import UserRepository
 
 
 @dataclass
@@ -12,20 +12,20 @@ from dataclasses import dataclass
 from typing import Dict, Any
 from datetime import datetime
 
-from ....app.core.exceptions import ValidationException, NotFoundException
-from ....app.domain.entities.product import Product
-from ....app.domain.entities.inventory_movement import InventoryMovement
-from ....app.domain.entities.user import User
-from ....app.domain.exceptions import (
+from ...core.exceptions import ValidationException, NotFoundException
+from ...domain.entities.product import Product
+from ...domain.entities.inventory_movement import InventoryMovement
+from ...domain.entities.user import User
+from ...domain.exceptions import (
     ProductNotFoundError,
     InsufficientStockError,
     StockExceedsMaximumError,
     InvalidMovementTypeError,
     UserNotFoundError
 )
-from ....app.application.ports.product_repository import ProductRepository
-from ....app.application.ports.movement_repository import MovementRepository
-from ....app.application.ports.user_repository import UserRepository
+from ...application.ports.product_repository import ProductRepository
+from ...application.ports.movement_repository import MovementRepository
+from ...application.ports.user_repository import UserRepository
 
 
 @dataclass
@@ -12,8 +12,8 @@ from datetime import datetime
 from typing import Optional
 import uuid
 
-from ....app.core.exceptions import BusinessRuleException
-from ....app.domain.exceptions import InvalidMovementTypeError
+from ...core.exceptions import BusinessRuleException
+from ...domain.exceptions import InvalidMovementTypeError
 
 
 @dataclass(frozen=False)  # No frozen porque necesitamos asignar id después de persistir
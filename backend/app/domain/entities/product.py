@@ -14,8 +14,8 @@ from datetime import datetime
 from typing import Optional
 import uuid
 
-from ....app.core.exceptions import BusinessRuleException
-from ....app.domain.exceptions import (
+from ...core.exceptions import BusinessRuleException
+from ...domain.exceptions import (
     InsufficientStockError,
     StockExceedsMaximumError,
     InvalidMovementTypeError
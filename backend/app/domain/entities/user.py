@@ -7,8 +7,8 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 import enum
 
-from ....app.core.exceptions import BusinessRuleException
-from ....app.domain.exceptions import (
+from ...core.exceptions import BusinessRuleException
+from ...domain.exceptions import (
     InvalidCredentialsError,
     UserInactiveError,
     InsufficientPermissionsError
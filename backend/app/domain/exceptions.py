@@ -6,7 +6,7 @@ Diferencia con core/exceptions.py:
 - core/exceptions.py: Excepciones base del sistema
 - domain/exceptions.py: Excepciones específicas del dominio de inventario
 """
-from ...app.core.exceptions import DomainException, BusinessRuleException
+from ..core.exceptions import DomainException, BusinessRuleException
 
 
 class ProductNotFoundError(DomainException):
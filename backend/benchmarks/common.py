@@ -0,0 +1,166 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+- Percentiles exactos sobre muestras
+- Metadatos del entorno (commit, Python, plataforma) para comparar corridas
+- Guardado/carga de resultados en JSON
+- Comparación contra una corrida base con umbral de regresión
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+PROJECT_DIR = os.path.dirname(BACKEND_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+DATA_DIR = os.path.join(BENCHMARKS_DIR, ".data")
+
+# Código de salida cuando la comparación encuentra regresiones
+EXIT_REGRESSION = 3
+
+
+def setup_path() -> None:
+    """Agregar backend/ al sys.path (mismo esquema que scripts/)"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def setup_package_path() -> None:
+    """Permitir imports backend.* (api/ usa imports relativos al paquete)"""
+    setup_path()
+    if PROJECT_DIR not in sys.path:
+        sys.path.append(PROJECT_DIR)
+
+
+def percentile(sorted_values: Sequence[float], quantile: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados"""
+    if not sorted_values:
+        return 0.0
+    index = min(max(math.ceil(quantile * len(sorted_values)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def latency_summary(latencies: Iterable[float]) -> Dict[str, float]:
+    """Resumen en milisegundos de latencias medidas en segundos"""
+    values = sorted(latencies)
+    if not values:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """Datos del entorno que afectan los resultados"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def default_output_path(name: str) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    return os.path.join(RESULTS_DIR, f"{name}_{stamp}.json")
+
+
+def write_results(path: str, results: Dict[str, Any]) -> str:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_metrics(
+    baseline: Dict[str, Dict[str, Any]],
+    candidate: Dict[str, Dict[str, Any]],
+    metrics: List[Tuple[str, bool]],
+    threshold: float,
+    min_delta: float = 0.0
+) -> List[Dict[str, Any]]:
+    """
+    Comparar métricas por clave (endpoint, operación, ...).
+
+    Args:
+        baseline: {clave: {métrica: valor}} de la corrida base
+        candidate: lo mismo para la corrida nueva
+        metrics: [(nombre, mayor_es_mejor)], ej: [("p95_ms", False), ("throughput_rps", True)]
+        threshold: porcentaje de empeoramiento que se considera regresión
+        min_delta: diferencia absoluta mínima para marcar regresión (evita ruido en valores pequeños)
+
+    Returns:
+        Filas con base, nueva, cambio porcentual y si es regresión
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(candidate)):
+        for metric, higher_is_better in metrics:
+            before = baseline[key].get(metric)
+            after = candidate[key].get(metric)
+            if before is None or after is None:
+                continue
+            change = ((after - before) / before * 100) if before else 0.0
+            worse = -change if higher_is_better else change
+            rows.append({
+                "key": key,
+                "metric": metric,
+                "baseline": before,
+                "candidate": after,
+                "change_pct": round(change, 1),
+                "regression": worse > threshold and abs(after - before) >= min_delta,
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float) -> int:
+    """Imprimir la comparación; devuelve EXIT_REGRESSION si hubo regresiones"""
+    if not rows:
+        print("Sin métricas en común para comparar")
+        return 0
+    width = max(len(row["key"]) for row in rows)
+    print(f"{'clave':<{width}}  {'métrica':<16}{'base':>12}{'nueva':>12}{'cambio':>10}")
+    regressions = 0
+    for row in rows:
+        flag = "  REGRESIÓN" if row["regression"] else ""
+        regressions += row["regression"]
+        print(
+            f"{row['key']:<{width}}  {row['metric']:<16}{row['baseline']:>12}{row['candidate']:>12}"
+            f"{row['change_pct']:>+9.1f}%{flag}"
+        )
+    print()
+    if regressions:
+        print(f" {regressions} regresiones por encima de {threshold}%")
+        return EXIT_REGRESSION
+    print(f" Sin regresiones por encima de {threshold}%")
+    return 0
+
+
+def sqlite_url(filename: str, directory: Optional[str] = None) -> str:
+    """URL SQLite para un archivo en benchmarks/.data (o el directorio dado)"""
+    directory = directory or DATA_DIR
+    os.makedirs(directory, exist_ok=True)
+    return f"sqlite:///{os.path.join(directory, filename)}"
@@ -0,0 +1,292 @@
+"""
+Benchmark de carga HTTP con una mezcla de tráfico tipo app móvil.
+
+Genera una base de datos de prueba (ver seed.py) y ejecuta usuarios virtuales
+concurrentes contra la aplicación real, ya sea:
+- En proceso, con el transporte ASGI de httpx (sin red, default)
+- Contra un servidor corriendo (--base-url http://127.0.0.1:8000)
+
+Cada usuario virtual inicia sesión y repite operaciones elegidas según los
+pesos de WORKLOAD. Se reporta throughput y latencia p50/p95/p99 por endpoint,
+y los resultados se guardan en JSON para comparar corridas (--compare).
+
+Uso:
+    python benchmarks/http_load.py --products 2000 --movements 100000 --concurrency 20 --duration 30
+    python benchmarks/http_load.py --compare benchmarks/results/http_load_base.json
+    python benchmarks/http_load.py --base-url http://127.0.0.1:8000 --skip-seed \\
+        --database-url sqlite:///database/scis.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import (  # noqa: E402
+    compare_metrics, default_output_path, environment_info, latency_summary,
+    load_results, print_comparison, setup_path, sqlite_url, write_results
+)
+from seed import BENCH_PASSWORD, PRODUCT_WORDS, bench_usernames  # noqa: E402
+
+# Operación -> peso relativo en la mezcla de tráfico
+WORKLOAD = {
+    "login": 2,
+    "products_list": 25,
+    "products_search": 15,
+    "movement_create": 13,
+    "movements_history": 25,
+    "dashboard": 20,
+}
+
+# Tamaño de página típico de la app móvil
+PAGE_SIZE = 20
+
+
+class LoadStats:
+    """Latencias y errores por operación"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_codes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, operation: str, elapsed: float, status_code: int) -> None:
+        self.latencies[operation].append(elapsed)
+        self.status_codes[operation][status_code] += 1
+        if status_code >= 400:
+            self.errors[operation] += 1
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        endpoints = {}
+        for operation in sorted(self.latencies):
+            count = len(self.latencies[operation])
+            endpoints[operation] = {
+                "count": count,
+                "errors": self.errors[operation],
+                "throughput_rps": round(count / duration, 2) if duration else 0.0,
+                **latency_summary(self.latencies[operation]),
+                "status_codes": dict(self.status_codes[operation]),
+            }
+        return endpoints
+
+
+class VirtualUser:
+    """Usuario de la app móvil: inicia sesión y ejecuta operaciones aleatorias"""
+
+    def __init__(self, client, username: str, products: int, stats: LoadStats, rng: random.Random):
+        self.client = client
+        self.username = username
+        self.products = products
+        self.stats = stats
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+
+    async def timed(self, operation: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status_code = response.status_code
+        except Exception:
+            response, status_code = None, 599  # Error de conexión / timeout
+        self.stats.record(operation, time.perf_counter() - start, status_code)
+        return response
+
+    async def login(self) -> None:
+        response = await self.timed("login", "POST", "/token", data={
+            "username": self.username,
+            "password": BENCH_PASSWORD,
+        })
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def run_operation(self, operation: str) -> None:
+        if operation == "login" or not self.headers:
+            await self.login()
+            return
+
+        product_id = self.rng.randint(1, self.products)
+        if operation == "products_list":
+            skip = self.rng.randrange(0, max(self.products - PAGE_SIZE, 1))
+            await self.timed(operation, "GET", f"/products/?skip={skip}&limit={PAGE_SIZE}", headers=self.headers)
+        elif operation == "products_search":
+            term = self.rng.choice(PRODUCT_WORDS)
+            await self.timed(operation, "GET", "/products/", params={"search": term, "limit": PAGE_SIZE},
+                             headers=self.headers)
+        elif operation == "movement_create":
+            await self.timed(operation, "POST", "/movements/", headers=self.headers, json={
+                "product_id": product_id,
+                "quantity": self.rng.randint(1, 5),
+                # Más entradas que salidas para no agotar stock durante la corrida
+                "movement_type": "IN" if self.rng.random() < 0.6 else "OUT",
+                "reason": "Benchmark de carga",
+            })
+        elif operation == "movements_history":
+            params = {"limit": PAGE_SIZE}
+            if self.rng.random() < 0.5:
+                params["product_id"] = product_id
+            else:
+                params["days"] = 7
+            await self.timed(operation, "GET", "/movements/", params=params, headers=self.headers)
+        elif operation == "dashboard":
+            await self.timed(operation, "GET", "/dashboard/stats", headers=self.headers)
+
+
+async def run_load(
+    client,
+    usernames: List[str],
+    products: int,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int
+) -> Tuple[LoadStats, float]:
+    """Ejecutar usuarios virtuales; devuelve estadísticas (sin warmup) y duración medida"""
+    operations, weights = zip(*WORKLOAD.items())
+    stats = LoadStats()
+    warmup_stats = LoadStats()
+    measuring = False
+    stop_at = time.perf_counter() + warmup + duration
+
+    async def worker(index: int) -> None:
+        rng = random.Random(seed + index)
+        user = VirtualUser(client, usernames[index % len(usernames)], products, warmup_stats, rng)
+        await user.login()
+        while time.perf_counter() < stop_at:
+            user.stats = stats if measuring else warmup_stats
+            await user.run_operation(rng.choices(operations, weights)[0])
+
+    tasks = [asyncio.create_task(worker(i)) for i in range(concurrency)]
+    if warmup:
+        await asyncio.sleep(warmup)
+    measuring = True
+    measure_start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - measure_start
+
+
+def print_report(endpoints: Dict[str, Dict[str, Any]], duration: float) -> None:
+    total = sum(data["count"] for data in endpoints.values())
+    errors = sum(data["errors"] for data in endpoints.values())
+    print(f"\n{'operación':<20}{'requests':>10}{'errores':>9}{'req/s':>9}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, data in endpoints.items():
+        print(
+            f"{operation:<20}{data['count']:>10}{data['errors']:>9}{data['throughput_rps']:>9}"
+            f"{data['p50_ms']:>10}{data['p95_ms']:>10}{data['p99_ms']:>10}{data['max_ms']:>10}"
+        )
+    print(f"\n Total: {total} requests en {duration:.1f}s "
+          f"({total / duration if duration else 0:.1f} req/s), {errors} errores")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de carga HTTP de la API SCIS")
+    parser.add_argument("--base-url", help="Servidor a probar; sin este valor se usa la app en proceso (ASGI)")
+    parser.add_argument("--database-url", default=None,
+                        help="Base de datos a generar/usar (default: benchmarks/.data/http_load.db)")
+    parser.add_argument("--skip-seed", action="store_true", help="Usar los datos existentes")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--movements", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=10, help="Usuarios virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Segundos iniciales no medidos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: benchmarks/results/...)")
+    parser.add_argument("--compare", help="Resultados base (JSON) para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Empeoramiento (%%) de p95 o throughput considerado regresión")
+    return parser.parse_args(argv)
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    usernames = bench_usernames(args.users)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30.0)
+        target = args.base_url
+    else:
+        # La app usa DATABASE_URL al importarse: se configura antes del import
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30.0)
+        target = "asgi"
+
+    async with client:
+        stats, duration = await run_load(
+            client, usernames, args.products, args.concurrency, args.duration, args.warmup, args.seed
+        )
+
+    return {
+        "benchmark": "http_load",
+        "environment": environment_info(),
+        "config": {
+            "target": target,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "workload": WORKLOAD,
+            "page_size": PAGE_SIZE,
+        },
+        "totals": {
+            "requests": sum(len(values) for values in stats.latencies.values()),
+            "errors": sum(stats.errors.values()),
+            "duration_seconds": round(duration, 3),
+        },
+        "endpoints": stats.summary(duration),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    database_url = args.database_url or sqlite_url("http_load.db")
+
+    print("=" * 60)
+    print(" BENCHMARK DE CARGA HTTP - SCIS API")
+    print("=" * 60)
+
+    dataset = None
+    if not args.skip_seed:
+        from sqlalchemy import create_engine
+        from seed import seed_database
+
+        print(f" Generando datos en {database_url} ...")
+        summary = seed_database(
+            create_engine(database_url), args.products, args.users, args.movements,
+            seed=args.seed, reset=True
+        )
+        dataset = summary.to_dict()
+        print(f" {summary.products:,} productos, {summary.users} usuarios, "
+              f"{summary.movements:,} movimientos ({summary.seconds}s)")
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    setup_path()
+
+    print(f" {args.concurrency} usuarios virtuales, {args.duration}s (+{args.warmup}s warmup) "
+          f"contra {args.base_url or 'la app en proceso (ASGI)'}")
+    results = asyncio.run(main_async(args))
+    results["dataset"] = dataset
+    print_report(results["endpoints"], results["totals"]["duration_seconds"])
+
+    output = args.output or default_output_path("http_load")
+    write_results(output, results)
+    print(f" Resultados guardados en {output}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        print(f"\n Comparación contra {args.compare}")
+        rows = compare_metrics(
+            baseline.get("endpoints", {}), results["endpoints"],
+            [("p95_ms", False), ("p99_ms", False), ("throughput_rps", True)],
+            args.threshold
+        )
+        return print_comparison(rows, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
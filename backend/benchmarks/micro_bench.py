@@ -0,0 +1,225 @@
+"""
+Microbenchmarks de las rutas de CPU calientes.
+
+Cubre la lógica de dominio (Product, InventoryMovement), la validación de
+schemas pydantic, JWT, verificación PBKDF2 y el formatter de logs JSON.
+
+Cada caso tiene un número de iteraciones fijo (no calibrado en cada corrida),
+así dos corridas ejecutan exactamente el mismo trabajo y son comparables.
+Se ejecutan varias rondas con el GC desactivado (como timeit) y se reporta
+operaciones por segundo (mediana de las rondas), ns por operación y la
+dispersión entre rondas. La comparación usa la mejor ronda de cada caso.
+
+Uso:
+    python benchmarks/micro_bench.py
+    python benchmarks/micro_bench.py --cases jwt crypto --rounds 10
+    python benchmarks/micro_bench.py --compare benchmarks/results/micro_base.json
+"""
+import argparse
+import gc
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import (  # noqa: E402
+    compare_metrics, default_output_path, environment_info, load_results,
+    print_comparison, setup_package_path, write_results
+)
+
+
+class Case(NamedTuple):
+    """Caso de microbenchmark: setup() crea el estado, run(estado, n) ejecuta n operaciones"""
+    name: str
+    iterations: int
+    setup: Callable[[], Any]
+    run: Callable[[Any, int], None]
+
+
+# ==================== CASOS ====================
+
+def build_cases() -> List[Case]:
+    setup_package_path()
+    from backend.app.application.dtos.schemas import InventoryMovementCreate, ProductResponse
+    from backend.app.domain.entities.inventory_movement import InventoryMovement
+    from backend.app.domain.entities.product import Product
+    from infrastructure.auth.jwt_handler import JWTHandler
+    from infrastructure.logging.structured_logger import StructuredFormatter
+
+    now = datetime.utcnow()
+
+    def new_product() -> Product:
+        return Product(
+            id=1, code="MICRO-001", name="Cemento gris", description="Saco de 42.5 kg",
+            current_stock=500, min_stock=50, max_stock=1000, unit="unidades",
+            created_at=now, updated_at=now
+        )
+
+    def run_validate(product, n):
+        for _ in range(n):
+            product._validate()
+
+    def run_apply_movement(product, n):
+        # Alterna entradas y salidas para mantener el stock dentro de los límites
+        for i in range(n):
+            product.apply_stock_movement(1, "IN" if i % 2 == 0 else "OUT")
+        product.clear_domain_events()
+
+    def run_create_movement(_, n):
+        for i in range(n):
+            InventoryMovement.create_from_movement(
+                product_id=1, quantity=5, movement_type="IN", reason="Compra a proveedor",
+                previous_stock=i, new_stock=i + 5, user_id=1
+            )
+
+    movement_payload = {"product_id": 1, "quantity": 5, "movement_type": "IN", "reason": "Reposición de stock"}
+
+    def run_movement_create(payload, n):
+        for _ in range(n):
+            InventoryMovementCreate.model_validate(payload)
+
+    product_fields = {
+        "id": 1, "code": "MICRO-001", "name": "Cemento gris", "description": "Saco de 42.5 kg",
+        "current_stock": 500, "min_stock": 50, "max_stock": 1000, "unit": "unidades",
+        "stock_percentage": 50.0, "needs_reorder": False, "is_stock_low": False, "is_stock_high": False,
+        "created_at": now, "updated_at": now,
+    }
+
+    def run_product_response_dict(payload, n):
+        for _ in range(n):
+            ProductResponse.model_validate(payload)
+
+    def run_product_response_attributes(source, n):
+        for _ in range(n):
+            ProductResponse.model_validate(source, from_attributes=True)
+
+    token_data = {"sub": "micro_user", "user_id": 1, "role": "operator", "email": "micro@scis.com"}
+
+    def run_create_token(data, n):
+        for _ in range(n):
+            JWTHandler.create_access_token(data)
+
+    def run_verify_token(token, n):
+        for _ in range(n):
+            JWTHandler.verify_token(token)
+
+    def run_verify_pbkdf2(hashed, n):
+        for _ in range(n):
+            JWTHandler._verify_pbkdf2_hash("Micro12345!", hashed)
+
+    def setup_log_record():
+        record = logging.LogRecord(
+            "scis.audit", logging.INFO, __file__, 42, "Movimiento registrado: %s", ("IN",), None
+        )
+        record.extra_data = {"action": "register_movement", "product_id": 1, "quantity": 5, "user_id": 1}
+        return StructuredFormatter(), record
+
+    def run_format(state, n):
+        formatter, record = state
+        for _ in range(n):
+            formatter.format(record)
+
+    return [
+        Case("domain.product_validate", 200_000, new_product, run_validate),
+        Case("domain.product_apply_stock_movement", 100_000, new_product, run_apply_movement),
+        Case("domain.movement_create_from_movement", 50_000, lambda: None, run_create_movement),
+        Case("schema.inventory_movement_create", 50_000, lambda: movement_payload, run_movement_create),
+        Case("schema.product_response_dict", 50_000, lambda: product_fields, run_product_response_dict),
+        Case("schema.product_response_attributes", 50_000,
+             lambda: SimpleNamespace(**product_fields), run_product_response_attributes),
+        Case("jwt.create_access_token", 5_000, lambda: token_data, run_create_token),
+        Case("jwt.verify_token", 5_000, lambda: JWTHandler.create_access_token(token_data), run_verify_token),
+        # Hash con las iteraciones por defecto del sistema (costo real de un login)
+        Case("crypto.verify_pbkdf2_hash", 20,
+             lambda: JWTHandler._create_pbkdf2_hash("Micro12345!"), run_verify_pbkdf2),
+        Case("logging.structured_format", 50_000, setup_log_record, run_format),
+    ]
+
+
+# ==================== EJECUCIÓN ====================
+
+def run_case(case: Case, rounds: int, scale: float) -> Dict[str, Any]:
+    iterations = max(int(case.iterations * scale), 1)
+    state = case.setup()
+    case.run(state, max(iterations // 10, 1))  # Warmup
+
+    durations = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            case.run(state, iterations)
+            durations.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    rates = [iterations / duration for duration in durations]
+    median_rate = statistics.median(rates)
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "ops_per_sec": round(median_rate, 1),
+        "best_ops_per_sec": round(max(rates), 1),
+        "ns_per_op": round(1e9 / median_rate, 1),
+        "stdev_pct": round(statistics.pstdev(rates) / median_rate * 100, 2) if rounds > 1 else 0.0,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmarks de dominio, schemas, JWT, crypto y logging")
+    parser.add_argument("--cases", nargs="*", help="Ejecutar solo casos que contengan estos textos")
+    parser.add_argument("--rounds", type=int, default=5, help="Rondas cronometradas por caso")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplicador de iteraciones (ej: 0.1 para una corrida rápida)")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: benchmarks/results/...)")
+    parser.add_argument("--compare", help="Resultados base (JSON) para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Caída (%%) de operaciones por segundo considerada regresión")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+
+    print("=" * 60)
+    print(" MICROBENCHMARKS - SCIS")
+    print("=" * 60)
+    print(f"{'caso':<40}{'iteraciones':>12}{'ops/s':>14}{'mejor ops/s':>14}{'ns/op':>16}{'±%':>8}")
+
+    results = {}
+    for case in build_cases():
+        if args.cases and not any(pattern in case.name for pattern in args.cases):
+            continue
+        data = run_case(case, args.rounds, args.scale)
+        results[case.name] = data
+        print(f"{case.name:<40}{data['iterations']:>12,}{data['ops_per_sec']:>14,.1f}"
+              f"{data['best_ops_per_sec']:>14,.1f}{data['ns_per_op']:>16,.1f}{data['stdev_pct']:>8.2f}")
+
+    output = args.output or default_output_path("micro")
+    write_results(output, {
+        "benchmark": "micro",
+        "environment": environment_info(),
+        "config": {"rounds": args.rounds, "scale": args.scale},
+        "results": results,
+    })
+    print(f"\n Resultados guardados en {output}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        print(f"\n Comparación contra {args.compare}")
+        # La mejor ronda es la menos afectada por ruido del sistema (mismo criterio que timeit)
+        rows = compare_metrics(baseline.get("results", {}), results, [("best_ops_per_sec", True)], args.threshold)
+        return print_comparison(rows, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
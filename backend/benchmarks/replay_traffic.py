@@ -0,0 +1,327 @@
+"""
+Reproducción de tráfico capturado (TRAFFIC_CAPTURE_ENABLED) contra otra instancia.
+
+Lee el archivo de captura y vuelve a emitir cada request respetando los
+tiempos relativos originales: cada request sale en su instante (dividido por
+--speed) sin esperar a las anteriores, así la concurrencia resultante es la
+del tráfico real. Se reporta por ruta la latencia capturada vs la reproducida
+y las diferencias de status. La latencia capturada es tiempo en el servidor;
+la reproducida se mide en el cliente (incluye red y cliente).
+
+Los cuerpos se reconstruyen desde la forma capturada: números y campos
+conservados se envían tal cual y los textos saneados se reemplazan por texto
+sintético del mismo largo. Las requests autenticadas usan un token por rol
+obtenido con --credentials (rol=usuario:contraseña); /token usa las
+credenciales del primer rol.
+
+Uso:
+    python benchmarks/replay_traffic.py logs/traffic.jsonl --base-url http://staging:8000 \\
+        --credentials admin=admin:Admin123! --credentials operator=operador:Operador123! --speed 2
+    python benchmarks/replay_traffic.py logs/traffic.jsonl --compare benchmarks/results/replay_base.json
+"""
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import (  # noqa: E402
+    compare_metrics, default_output_path, environment_info, latency_summary,
+    load_results, percentile, print_comparison, setup_path, write_results
+)
+
+_MASKED_STRING = re.compile(r"^<str:(\d+)>$")
+REDACTED = "<redacted>"
+TOKEN_ROUTE = "/token"
+
+
+def load_capture(path: str, limit: Optional[int] = None, routes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Leer la captura (JSONL, opcionalmente .gz) ordenada por instante de inicio"""
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if routes and not any(pattern in (record.get("route") or record["path"]) for pattern in routes):
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def synthesize(shape: Any, counter: Iterator[int]) -> Any:
+    """Reconstruir un valor desde su forma saneada"""
+    if isinstance(shape, dict):
+        return {key: synthesize(value, counter) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [synthesize(value, counter) for value in shape]
+    if isinstance(shape, str):
+        match = _MASKED_STRING.match(shape)
+        if match:
+            # Texto único para no chocar con restricciones de unicidad (ej: código de producto)
+            length = int(match.group(1))
+            text = f"r{next(counter)}"
+            return (text + "x" * max(length - len(text), 0))[:max(length, 1)]
+        if shape == REDACTED:
+            return None
+    return shape
+
+
+def route_key(record: Dict[str, Any]) -> str:
+    return f"{record['method']} {record.get('route') or record['path']}"
+
+
+class ReplayStats:
+    """Latencias capturadas y reproducidas por ruta"""
+
+    def __init__(self):
+        self.captured: Dict[str, List[float]] = defaultdict(list)
+        self.replayed: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_mismatches: Dict[str, int] = defaultdict(int)
+        self.schedule_lag: List[float] = []
+        self.skipped = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, record: Dict[str, Any], elapsed: float, status_code: int) -> None:
+        key = route_key(record)
+        self.captured[key].append(record["duration_ms"] / 1000)
+        self.replayed[key].append(elapsed)
+        if status_code >= 400:
+            self.errors[key] += 1
+        if status_code != record.get("status"):
+            self.status_mismatches[key] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        routes = {}
+        for key in sorted(self.replayed, key=lambda name: -len(self.replayed[name])):
+            captured = latency_summary(self.captured[key])
+            replayed = latency_summary(self.replayed[key])
+            routes[key] = {
+                "count": len(self.replayed[key]),
+                "errors": self.errors[key],
+                "status_mismatches": self.status_mismatches[key],
+                **{f"captured_{name}": value for name, value in captured.items()},
+                **replayed,
+                "p50_delta_pct": _delta_pct(captured["p50_ms"], replayed["p50_ms"]),
+                "p95_delta_pct": _delta_pct(captured["p95_ms"], replayed["p95_ms"]),
+            }
+        return routes
+
+
+def _delta_pct(before: float, after: float) -> Optional[float]:
+    return round((after - before) / before * 100, 1) if before else None
+
+
+async def login(client, username: str, password: str) -> str:
+    response = await client.post(TOKEN_ROUTE, data={"username": username, "password": password})
+    if response.status_code != 200:
+        raise RuntimeError(f"No se pudo iniciar sesión como {username}: HTTP {response.status_code}")
+    return response.json()["access_token"]
+
+
+def build_request(record: Dict[str, Any], tokens: Dict[str, str], credentials: Dict[str, Tuple[str, str]],
+                  counter: Iterator[int]) -> Optional[Dict[str, Any]]:
+    """Argumentos de httpx para reproducir un registro (None si no se puede)"""
+    request: Dict[str, Any] = {"method": record["method"], "url": record["path"], "headers": {}}
+    query = {
+        key: synthesize(value, counter)
+        for key, value in (record.get("query") or {}).items() if value != REDACTED
+    }
+    if query:
+        request["params"] = query
+
+    body = synthesize(record.get("body"), counter)
+    if record["path"] == TOKEN_ROUTE and record["method"] == "POST":
+        if not credentials:
+            return None
+        username, password = next(iter(credentials.values()))
+        request["data"] = {**(body or {}), "username": username, "password": password}
+    elif record.get("body_type") == "json":
+        request["json"] = body
+    elif record.get("body_type") == "form":
+        request["data"] = body
+    elif record.get("body_type") == "bytes":
+        request["content"] = b"\0" * body.get("_bytes", 0)
+
+    role = record.get("role")
+    if role:
+        token = tokens.get(role) or next(iter(tokens.values()), None)
+        if token is None:
+            return None
+        request["headers"]["Authorization"] = f"Bearer {token}"
+    return request
+
+
+async def replay(client, records: List[Dict[str, Any]], tokens: Dict[str, str],
+                 credentials: Dict[str, Tuple[str, str]], speed: float, timeout: float) -> Tuple[ReplayStats, float]:
+    stats = ReplayStats()
+    counter = itertools.count(1)
+    tasks = []
+    first_ts = records[0]["ts"]
+    start = time.perf_counter()
+
+    async def send(record: Dict[str, Any], request: Dict[str, Any]) -> None:
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        sent = time.perf_counter()
+        try:
+            response = await client.request(**request, timeout=timeout)
+            status_code = response.status_code
+        except Exception:
+            status_code = 599
+        finally:
+            stats.in_flight -= 1
+        stats.record(record, time.perf_counter() - sent, status_code)
+
+    for record in records:
+        due = (record["ts"] - first_ts) / speed
+        delay = due - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Atraso respecto al horario original: si crece, el cliente no alcanza a emitir el ritmo pedido
+        stats.schedule_lag.append(max(time.perf_counter() - start - due, 0.0))
+        request = build_request(record, tokens, credentials, counter)
+        if request is None:
+            stats.skipped += 1
+            continue
+        tasks.append(asyncio.create_task(send(record, request)))
+
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - start
+
+
+def print_report(routes: Dict[str, Dict[str, Any]], totals: Dict[str, Any]) -> None:
+    print(f"\n{'ruta':<40}{'requests':>9}{'errores':>8}{'status≠':>8}"
+          f"{'p50 cap':>10}{'p50 rep':>10}{'Δp50%':>8}{'p95 cap':>10}{'p95 rep':>10}{'Δp95%':>8}")
+    for key, data in routes.items():
+        print(
+            f"{key[:39]:<40}{data['count']:>9}{data['errors']:>8}{data['status_mismatches']:>8}"
+            f"{data['captured_p50_ms']:>10}{data['p50_ms']:>10}{_format_delta(data['p50_delta_pct']):>8}"
+            f"{data['captured_p95_ms']:>10}{data['p95_ms']:>10}{_format_delta(data['p95_delta_pct']):>8}"
+        )
+    print(f"\n Total: {totals['requests']} requests en {totals['duration_seconds']}s "
+          f"(capturado: {totals['captured_duration_seconds']}s), {totals['errors']} errores, "
+          f"{totals['skipped']} omitidas")
+    print(f" Concurrencia máxima: capturada {totals['captured_max_in_flight']}, "
+          f"reproducida {totals['max_in_flight']}; atraso p99 del cliente {totals['schedule_lag_p99_ms']} ms")
+
+
+def _format_delta(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:+.1f}"
+
+
+def parse_credentials(values: List[str]) -> Dict[str, Tuple[str, str]]:
+    credentials = {}
+    for value in values:
+        role, _, pair = value.partition("=")
+        username, _, password = pair.partition(":")
+        if not role or not username:
+            raise argparse.ArgumentTypeError(f"Credencial inválida: {value} (formato rol=usuario:contraseña)")
+        credentials[role] = (username, password)
+    return credentials
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reproducir tráfico capturado contra una instancia de SCIS")
+    parser.add_argument("capture", help="Archivo de captura (TRAFFIC_CAPTURE_PATH, .jsonl o .jsonl.gz)")
+    parser.add_argument("--base-url", help="Instancia destino; sin este valor se usa la app en proceso (ASGI)")
+    parser.add_argument("--credentials", action="append", default=[],
+                        help="rol=usuario:contraseña para las requests de ese rol (repetible)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Aceleración (2 = el doble de rápido)")
+    parser.add_argument("--limit", type=int, help="Reproducir solo las primeras N requests")
+    parser.add_argument("--routes", nargs="*", help="Reproducir solo rutas que contengan estos textos")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por request (segundos)")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: benchmarks/results/...)")
+    parser.add_argument("--compare", help="Resultados de un replay anterior (JSON) para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Empeoramiento (%%) de p95/p99 considerado regresión")
+    return parser.parse_args(argv)
+
+
+async def main_async(args: argparse.Namespace, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import httpx
+
+    credentials = parse_credentials(args.credentials)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        setup_path()
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay",
+                                   timeout=args.timeout)
+
+    async with client:
+        tokens = {role: await login(client, username, password) for role, (username, password) in credentials.items()}
+        stats, duration = await replay(client, records, tokens, credentials, args.speed, args.timeout)
+
+    routes = stats.summary()
+    lag = sorted(stats.schedule_lag)
+    return {
+        "benchmark": "replay",
+        "environment": environment_info(),
+        "config": {
+            "capture": args.capture,
+            "target": args.base_url or "asgi",
+            "speed": args.speed,
+            "roles": sorted(credentials),
+        },
+        "totals": {
+            "requests": sum(data["count"] for data in routes.values()),
+            "errors": sum(data["errors"] for data in routes.values()),
+            "status_mismatches": sum(data["status_mismatches"] for data in routes.values()),
+            "skipped": stats.skipped,
+            "duration_seconds": round(duration, 3),
+            "captured_duration_seconds": round(records[-1]["ts"] - records[0]["ts"], 3),
+            "max_in_flight": stats.max_in_flight,
+            "captured_max_in_flight": max(record.get("in_flight", 0) for record in records) + 1,
+            "schedule_lag_p99_ms": round(percentile(lag, 0.99) * 1000, 3),
+        },
+        "routes": routes,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    records = load_capture(args.capture, args.limit, args.routes)
+    if not records:
+        print(f"Sin requests para reproducir en {args.capture}")
+        return 1
+
+    print("=" * 60)
+    print(" REPLAY DE TRÁFICO CAPTURADO - SCIS API")
+    print("=" * 60)
+    print(f" {len(records)} requests de {args.capture} a {args.speed}x "
+          f"contra {args.base_url or 'la app en proceso (ASGI)'}")
+
+    results = asyncio.run(main_async(args, records))
+    print_report(results["routes"], results["totals"])
+
+    output = args.output or default_output_path("replay")
+    write_results(output, results)
+    print(f"\n Resultados guardados en {output}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        print(f"\n Comparación contra {args.compare}")
+        rows = compare_metrics(
+            baseline.get("routes", {}), results["routes"], [("p95_ms", False), ("p99_ms", False)], args.threshold
+        )
+        return print_comparison(rows, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Generación de datos para benchmarks.
+
+Usa el generador de scripts/generate_data.py (inserts masivos, historial de
+stock encadenado y distribuciones de demanda realistas) con identificadores
+propios de benchmark: usuarios bench_user_*, productos BENCH-* y la
+contraseña BENCH_PASSWORD para todos los usuarios.
+
+Uso:
+    python benchmarks/seed.py --products 1000 --users 20 --movements 100000 \\
+        --database-url sqlite:///benchmarks/.data/bench.db --reset
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import setup_path, sqlite_url  # noqa: E402
+
+setup_path()
+from scripts.generate_data import PRODUCT_WORDS, GenerationSummary, generate, usernames  # noqa: E402
+
+BENCH_PASSWORD = "Bench12345!"
+USER_PREFIX = "bench_user_"
+PRODUCT_PREFIX = "BENCH-"
+EMAIL_DOMAIN = "bench.scis.local"
+
+SeedSummary = GenerationSummary
+
+__all__ = ["BENCH_PASSWORD", "PRODUCT_WORDS", "SeedSummary", "bench_usernames", "seed_database"]
+
+
+def bench_usernames(users: int) -> List[str]:
+    return usernames(users, USER_PREFIX)
+
+
+def seed_database(
+    engine,
+    products: int = 1000,
+    users: int = 20,
+    movements: int = 50000,
+    seed: int = 42,
+    days: int = 365,
+    batch_size: int = 20000,
+    reset: bool = False,
+    progress: bool = True
+) -> SeedSummary:
+    """
+    Poblar la base de datos del engine con datos sintéticos de benchmark.
+
+    Args:
+        engine: Engine de SQLAlchemy destino
+        products, users, movements: Cantidades a generar
+        seed: Semilla para que dos corridas generen los mismos datos
+        days: Los movimientos se reparten en los últimos `days` días
+        batch_size: Filas por insert masivo
+        reset: Eliminar y recrear las tablas antes de cargar
+    """
+    return generate(
+        engine, products, users, movements, days=days, seed=seed, batch_size=batch_size,
+        reset=reset, progress=progress, user_prefix=USER_PREFIX, product_prefix=PRODUCT_PREFIX,
+        email_domain=EMAIL_DOMAIN, password=BENCH_PASSWORD
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para benchmarks")
+    parser.add_argument("--database-url", default=sqlite_url("bench.db"),
+                        help="Base de datos destino (default: benchmarks/.data/bench.db)")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--movements", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=365, help="Días cubiertos por los movimientos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--reset", action="store_true", help="Eliminar y recrear las tablas antes de cargar")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine
+
+    print("=" * 60)
+    print(" GENERACIÓN DE DATOS PARA BENCHMARKS")
+    print("=" * 60)
+    print(f" Base de datos: {args.database_url}")
+    engine = create_engine(args.database_url)
+    summary = seed_database(
+        engine, args.products, args.users, args.movements,
+        seed=args.seed, days=args.days, batch_size=args.batch_size, reset=args.reset
+    )
+    print(f" {summary.products:,} productos, {summary.users:,} usuarios, "
+          f"{summary.movements:,} movimientos en {summary.seconds}s")
+    print(f" Contraseña de los usuarios {USER_PREFIX}*: {BENCH_PASSWORD}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Sincronización incremental para clientes offline (GET /sync).
+
+Cada flush que crea, modifica o elimina productos o movimientos registra
+el cambio en sync_changes con un seq nuevo (AUTOINCREMENT, orden de
+commit en SQLite). Un cambio reemplaza la fila anterior de la misma
+entidad, así que la tabla tiene una fila por entidad: GET /sync?since=N
+lee por el índice primario solo las filas con seq > N y el costo depende
+de lo que cambió, no del tamaño del catálogo.
+
+- Sin cursor: estado completo (todos los productos y los movimientos de
+  los últimos SYNC_INITIAL_MOVEMENT_DAYS días) y el cursor para seguir
+- Con cursor: productos y movimientos nuevos o modificados, más las marcas
+  de eliminación (deleted_product_ids, deleted_movement_ids), en páginas
+  de hasta `limit` cambios (has_more indica que hay que volver a pedir)
+
+Los movimientos archivados (movement_archive.py) dejan de aparecer como
+cambios, pero no se marcan como eliminados: el cliente los conserva.
+
+Las escrituras Core que modifican productos fuera del ORM (conciliación,
+restauración desde el flujo de eventos) registran sus cambios con
+record_changes().
+
+En una base anterior, upgrade_schema() (session.py) crea sync_changes al
+iniciar la app. No hace falta cargarla: los clientes sin cursor reciben el
+estado completo y el cursor actual, y desde ahí solo los cambios nuevos.
+
+Configuración (variables de entorno):
+- SYNC_PAGE_SIZE: cambios por respuesta por defecto (default 1000)
+- SYNC_INITIAL_MOVEMENT_DAYS: días de movimientos de la sincronización inicial (default 7)
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import InventoryMovement, Product, SyncChange
+
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+SYNC_INITIAL_MOVEMENT_DAYS = int(os.getenv("SYNC_INITIAL_MOVEMENT_DAYS", "7"))
+
+PRODUCT = "product"
+MOVEMENT = "movement"
+UPSERT = "upsert"
+DELETE = "delete"
+
+_changes = SyncChange.__table__
+_products = Product.__table__
+_movements = InventoryMovement.__table__
+
+_PRODUCT_COLUMNS = (
+    _products.c.id, _products.c.code, _products.c.name, _products.c.description, _products.c.current_stock,
+    _products.c.min_stock, _products.c.max_stock, _products.c.unit, _products.c.created_at, _products.c.updated_at,
+)
+_MOVEMENT_COLUMNS = (
+    _movements.c.id, _movements.c.product_id, _movements.c.quantity, _movements.c.movement_type,
+    _movements.c.reason, _movements.c.previous_stock, _movements.c.new_stock, _movements.c.user_id,
+    _movements.c.created_at,
+)
+
+
+class InvalidCursor(ValueError):
+    """El cursor no fue emitido por este servidor"""
+
+
+# ==================== REGISTRO DE CAMBIOS ====================
+
+def record_changes(connection: Connection, changes: Iterable[Tuple[str, int, str]]) -> None:
+    """Registrar (entidad, id, operación) reemplazando el cambio anterior de cada entidad"""
+    latest: Dict[Tuple[str, int], str] = {}
+    for entity, entity_id, operation in changes:
+        latest[(entity, entity_id)] = operation
+    if not latest:
+        return
+    by_entity: Dict[str, List[int]] = {}
+    for entity, entity_id in latest:
+        by_entity.setdefault(entity, []).append(entity_id)
+    for entity, ids in by_entity.items():
+        connection.execute(delete(_changes).where(and_(_changes.c.entity == entity, _changes.c.entity_id.in_(ids))))
+    now = datetime.utcnow()
+    connection.execute(insert(_changes), [
+        {"entity": entity, "entity_id": entity_id, "operation": operation, "changed_at": now}
+        for (entity, entity_id), operation in latest.items()
+    ])
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    changes: List[Tuple[str, int, str]] = []
+    for obj in session.new:
+        if isinstance(obj, Product):
+            changes.append((PRODUCT, obj.id, UPSERT))
+        elif isinstance(obj, InventoryMovement):
+            changes.append((MOVEMENT, obj.id, UPSERT))
+    for obj in session.dirty:
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False):
+            changes.append((PRODUCT, obj.id, UPSERT))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes.append((PRODUCT, obj.id, DELETE))
+        elif isinstance(obj, InventoryMovement):
+            changes.append((MOVEMENT, obj.id, DELETE))
+    if changes:
+        record_changes(session.connection(), changes)
+
+
+def install_sync_tracking() -> None:
+    """Registrar los cambios en cada flush de cualquier sesión (idempotente)"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+install_sync_tracking()
+
+
+# ==================== LECTURA ====================
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None or cursor == "":
+        return None
+    if not cursor.isdigit():
+        raise InvalidCursor(f"Cursor inválido: {cursor!r}")
+    return int(cursor)
+
+
+def _product(row) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    data["created_at"] = row.created_at.isoformat() if row.created_at else None
+    data["updated_at"] = row.updated_at.isoformat() if row.updated_at else None
+    return data
+
+
+def _movement(row) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    data["created_at"] = row.created_at.isoformat() if row.created_at else None
+    return data
+
+
+def product_states(db: Session, product_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Estado actual de los productos (mismo formato que la sincronización)"""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    return [
+        _product(row) for row in db.execute(
+            select(*_PRODUCT_COLUMNS).where(_products.c.id.in_(product_ids)).order_by(_products.c.id)
+        )
+    ]
+
+
+def _last_seq(db: Session) -> int:
+    return db.execute(select(func.max(_changes.c.seq))).scalar() or 0
+
+
+def full_sync(db: Session, movement_days: int = SYNC_INITIAL_MOVEMENT_DAYS) -> Dict[str, Any]:
+    """Estado completo; el cursor se toma antes de leer (un cambio concurrente se reenvía, no se pierde)"""
+    cursor = _last_seq(db)
+    since = datetime.utcnow() - timedelta(days=movement_days)
+    return {
+        "cursor": str(cursor),
+        "full": True,
+        "has_more": False,
+        "products": [_product(row) for row in db.execute(select(*_PRODUCT_COLUMNS).order_by(_products.c.id))],
+        "deleted_product_ids": [],
+        "movements": [
+            _movement(row) for row in db.execute(
+                select(*_MOVEMENT_COLUMNS).where(_movements.c.created_at >= since).order_by(_movements.c.id)
+            )
+        ],
+        "deleted_movement_ids": [],
+    }
+
+
+def changes_since(db: Session, since: int, limit: int = SYNC_PAGE_SIZE) -> Dict[str, Any]:
+    """Cambios con seq > since (hasta `limit`), con el estado actual de cada entidad"""
+    if since > _last_seq(db):
+        raise InvalidCursor(f"Cursor {since} posterior al último cambio")
+    rows = db.execute(
+        select(_changes.c.seq, _changes.c.entity, _changes.c.entity_id, _changes.c.operation)
+        .where(_changes.c.seq > since).order_by(_changes.c.seq).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    ids = {(entity, operation): [] for entity in (PRODUCT, MOVEMENT) for operation in (UPSERT, DELETE)}
+    for row in rows:
+        ids[(row.entity, row.operation)].append(row.entity_id)
+    products = product_states(db, ids[(PRODUCT, UPSERT)])
+    movements = [
+        _movement(row) for row in db.execute(
+            select(*_MOVEMENT_COLUMNS).where(_movements.c.id.in_(ids[(MOVEMENT, UPSERT)])).order_by(_movements.c.id)
+        )
+    ] if ids[(MOVEMENT, UPSERT)] else []
+    # Producto eliminado fuera del ORM (sin marca): se informa como eliminado
+    missing = set(ids[(PRODUCT, UPSERT)]) - {item["id"] for item in products}
+    return {
+        "cursor": str(rows[-1].seq if rows else since),
+        "full": False,
+        "has_more": has_more,
+        "products": products,
+        "deleted_product_ids": sorted(set(ids[(PRODUCT, DELETE)]) | missing),
+        "movements": movements,
+        "deleted_movement_ids": sorted(ids[(MOVEMENT, DELETE)]),
+    }
@@ -0,0 +1,303 @@
+"""
+Despacho asíncrono de los eventos de stock a suscriptores en proceso.
+
+stock_events (event_stream.py) es la bandeja de salida transaccional: cada
+evento se escribe en la misma transacción que el producto o el movimiento
+que lo origina, así que nunca se pierde un evento de un cambio confirmado
+ni se publica uno de un cambio revertido. Un hilo en segundo plano lee la
+tabla por lotes a partir de la posición (seq) de cada suscriptor y se los
+entrega; la request que registra el movimiento no espera a ninguna
+reacción (alertas, cachés, acumulados, webhooks).
+
+Suscriptores:
+- Durables (default): posición guardada en event_subscriber_offsets. El
+  handler recibe (eventos, sesión) y la posición avanza en la misma
+  transacción que lo que el handler escriba en la base: si falla, el lote
+  se reintenta (con espera creciente) y no se avanza. Entrega al menos una
+  vez: los efectos externos (webhooks) deben ser idempotentes por seq
+- Locales (durable=False): posición en memoria desde el inicio del proceso;
+  cada worker recibe todos los eventos nuevos (cachés en memoria, push a
+  clientes conectados)
+
+Los commits de este proceso que escriben eventos despiertan al
+despachador; los de otros procesos se ven en el siguiente sondeo.
+
+Configuración (variables de entorno):
+- EVENT_DISPATCHER_ENABLED: iniciar el despachador con la aplicación (default true)
+- EVENT_DISPATCH_BATCH_SIZE: eventos por entrega (default 500)
+- EVENT_DISPATCH_POLL_SECONDS: intervalo de sondeo sin eventos nuevos (default 1)
+- EVENT_DISPATCH_MAX_RETRY_SECONDS: espera máxima entre reintentos de un suscriptor (default 300)
+
+Uso:
+    from infrastructure.database.event_dispatcher import event_dispatcher
+
+    @event_dispatcher.subscribe("webhooks")
+    def send_webhooks(events, db):
+        ...
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .event_stream import STOCK_MOVEMENT_APPLIED
+from .models import EventSubscriberOffset, InventoryMovement, Product, StockEvent
+
+EVENT_DISPATCHER_ENABLED = os.getenv("EVENT_DISPATCHER_ENABLED", "true").lower() == "true"
+EVENT_DISPATCH_BATCH_SIZE = int(os.getenv("EVENT_DISPATCH_BATCH_SIZE", "500"))
+EVENT_DISPATCH_POLL_SECONDS = float(os.getenv("EVENT_DISPATCH_POLL_SECONDS", "1"))
+EVENT_DISPATCH_MAX_RETRY_SECONDS = float(os.getenv("EVENT_DISPATCH_MAX_RETRY_SECONDS", "300"))
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[List[Dict[str, Any]], Session], None]
+
+_events = StockEvent.__table__
+_offsets = EventSubscriberOffset.__table__
+_products = Product.__table__
+
+# Despachadores iniciados en este proceso (los despierta el commit que escribe eventos)
+_running: "List[EventDispatcher]" = []
+_WROTE_EVENTS_KEY = (__name__, "wrote_events")
+
+
+@dataclass
+class Subscriber:
+    """Suscriptor registrado y su estado de entrega en este proceso"""
+    name: str
+    handler: Handler
+    durable: bool = True
+    from_start: bool = False
+    position: Optional[int] = None      # Solo suscriptores locales
+    delivered: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+    retry_at: float = 0.0
+    lag: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "durable": self.durable,
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "lag": self.lag,
+        }
+
+
+@dataclass
+class EventDispatcher:
+    """
+    Hilo que entrega los eventos nuevos a cada suscriptor.
+
+    Uso:
+        dispatcher = EventDispatcher(session_factory)
+        dispatcher.subscribe("alertas", handler)
+        dispatcher.start()
+    """
+    session_factory: Optional[Callable[[], Session]] = None
+    batch_size: int = EVENT_DISPATCH_BATCH_SIZE
+    poll_seconds: float = EVENT_DISPATCH_POLL_SECONDS
+    max_retry_seconds: float = EVENT_DISPATCH_MAX_RETRY_SECONDS
+    subscribers: Dict[str, Subscriber] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== SUSCRIPCIONES ====================
+
+    def subscribe(self, name: str, handler: Optional[Handler] = None, durable: bool = True,
+                  from_start: bool = False):
+        """
+        Registrar un handler (también como decorador). from_start: un
+        suscriptor durable nuevo recibe todo el flujo (default: solo los
+        eventos posteriores a su registro).
+        """
+        def register(function: Handler) -> Handler:
+            self.subscribers[name] = Subscriber(name, function, durable, from_start)
+            return function
+        return register(handler) if handler is not None else register
+
+    # ==================== CICLO DE VIDA ====================
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Iniciar el hilo de despacho (idempotente)"""
+        if self.running:
+            return
+        if self.session_factory is None:
+            from .session import SessionLocal
+            self.session_factory = SessionLocal
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="event-dispatcher", daemon=True)
+        self._thread.start()
+        _running.append(self)
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+        if self in _running:
+            _running.remove(self)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                delivered = self.dispatch_once()
+            except Exception:
+                logger.exception("Error en el despacho de eventos")
+                delivered = 0
+            if not delivered:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    # ==================== ENTREGA ====================
+
+    def dispatch_once(self) -> int:
+        """Entregar a cada suscriptor un lote de eventos pendientes; devuelve los eventos entregados"""
+        if self.session_factory is None:
+            from .session import SessionLocal
+            self.session_factory = SessionLocal
+        delivered = 0
+        now = time.monotonic()
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.retry_at > now:
+                continue
+            delivered += self._deliver(subscriber)
+        return delivered
+
+    def _position(self, db: Session, subscriber: Subscriber) -> int:
+        if not subscriber.durable:
+            if subscriber.position is None:
+                subscriber.position = 0 if subscriber.from_start else self._last_seq(db)
+            return subscriber.position
+        position = db.execute(select(_offsets.c.position).where(_offsets.c.subscriber == subscriber.name)).scalar()
+        if position is None:
+            position = 0 if subscriber.from_start else self._last_seq(db)
+            db.execute(insert(_offsets).values(subscriber=subscriber.name, position=position,
+                                               updated_at=datetime.utcnow()))
+            db.commit()
+        return position
+
+    @staticmethod
+    def _last_seq(db: Session) -> int:
+        return db.execute(select(func.max(_events.c.seq))).scalar() or 0
+
+    def _deliver(self, subscriber: Subscriber) -> int:
+        db = self.session_factory()
+        try:
+            position = self._position(db, subscriber)
+            events = [
+                dict(row._mapping) for row in db.execute(
+                    select(_events).where(_events.c.seq > position).order_by(_events.c.seq).limit(self.batch_size)
+                )
+            ]
+            if not events:
+                subscriber.lag = 0
+                return 0
+            last = events[-1]["seq"]
+            try:
+                subscriber.handler(events, db)
+                if subscriber.durable:
+                    db.execute(
+                        update(_offsets)
+                        .where(_offsets.c.subscriber == subscriber.name)
+                        .values(position=last, updated_at=datetime.utcnow())
+                    )
+                db.commit()
+            except Exception as error:
+                db.rollback()
+                subscriber.failures += 1
+                subscriber.last_error = f"{type(error).__name__}: {error}"
+                delay = min(self.max_retry_seconds, self.poll_seconds * 2 ** min(subscriber.failures, 16))
+                subscriber.retry_at = time.monotonic() + delay
+                logger.warning(
+                    "Suscriptor %s falló en los eventos %s-%s (reintento en %.0fs): %s",
+                    subscriber.name, events[0]["seq"], last, delay, subscriber.last_error,
+                )
+                return 0
+            if not subscriber.durable:
+                subscriber.position = last
+            subscriber.failures = 0
+            subscriber.retry_at = 0.0
+            subscriber.delivered += len(events)
+            subscriber.lag = self._last_seq(db) - last
+            return len(events)
+        finally:
+            db.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "batch_size": self.batch_size,
+            "poll_seconds": self.poll_seconds,
+            "subscribers": [subscriber.to_dict() for subscriber in self.subscribers.values()],
+        }
+
+
+# ==================== AVISO DE EVENTOS NUEVOS ====================
+
+def _after_flush(session: Session, flush_context) -> None:
+    if any(isinstance(obj, (Product, InventoryMovement, StockEvent)) for obj in session.new) \
+            or any(isinstance(obj, Product) for obj in session.deleted):
+        session.info[_WROTE_EVENTS_KEY] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_WROTE_EVENTS_KEY, False):
+        for dispatcher in _running:
+            dispatcher.wake()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_WROTE_EVENTS_KEY, None)
+
+
+if not event.contains(Session, "after_commit", _after_commit):
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+# ==================== SUSCRIPTORES ====================
+
+event_dispatcher = EventDispatcher()
+
+
+@event_dispatcher.subscribe("low_stock_alerts")
+def low_stock_alerts(events: List[Dict[str, Any]], db: Session) -> None:
+    """Advertir cuando un movimiento deja un producto por debajo de su stock mínimo"""
+    crossings = [
+        item for item in events
+        if item["event_type"] == STOCK_MOVEMENT_APPLIED and item["delta"] < 0 and item["new_stock"] is not None
+    ]
+    if not crossings:
+        return
+    minimums = dict(db.execute(
+        select(_products.c.id, _products.c.min_stock).where(_products.c.id.in_({item["product_id"] for item in crossings}))
+    ).all())
+    for item in crossings:
+        minimum = minimums.get(item["product_id"])
+        if minimum is not None and item["new_stock"] < minimum <= item["old_stock"]:
+            logger.warning(
+                "Stock bajo: producto %s quedó en %s (mínimo %s) por el movimiento %s",
+                item["product_id"], item["new_stock"], minimum, item["movement_id"],
+            )
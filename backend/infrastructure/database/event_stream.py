@@ -0,0 +1,466 @@
+"""
+Flujo de eventos de stock (event sourcing) con snapshots y reproducción.
+
+Cada flush del ORM agrega a stock_events, en la misma transacción, los
+eventos de dominio de Product (mismos campos que _record_domain_event):
+- StockInitialized: producto creado (delta = stock inicial)
+- StockMovementApplied: movimiento registrado (delta = ±quantity, con
+  old_stock / new_stock, movement_id y user_id)
+- ProductRemoved: producto eliminado (el estado reproducido lo descarta)
+
+El flujo es append-only: los eventos no se modifican ni se eliminan (el
+archivo histórico y las eliminaciones de productos no lo tocan). Cada
+producto tiene su propia secuencia (version) además del orden global (seq).
+
+replay() reconstruye el estado de uno o de todos los productos desde la
+última generación de snapshots (un snapshot por producto que cambió, todos
+en la misma posición del flujo) más los eventos posteriores, plegados
+con agregados en la base sobre un índice que cubre la query (sin objetos
+del ORM ni filas por evento en Python): millones de eventos por segundo.
+Se usa para:
+- Recuperación ante desastres: restore_read_models() reescribe
+  products.current_stock y stock_summary desde el flujo
+- Reconstruir proyecciones después de cambios de esquema: event_batches()
+  entrega los eventos en orden como lotes de tuplas del cursor DB-API
+
+Las escrituras fuera del ORM no generan eventos; backfill_event_stream()
+crea el flujo inicial de una base existente desde inventory_movements.
+
+Configuración (variables de entorno):
+- SNAPSHOT_EVERY: eventos del flujo entre generaciones de snapshots (default 100000)
+
+Uso:
+    python scripts/replay_events.py --backfill
+    python scripts/replay_events.py --snapshot    # cron
+    python scripts/replay_events.py --verify
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, case, event, func, insert, inspect, literal, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .models import InventoryMovement, Product, ProductOpeningBalance, StockEvent, StockSnapshot
+
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "100000"))
+
+STOCK_INITIALIZED = "StockInitialized"
+STOCK_MOVEMENT_APPLIED = "StockMovementApplied"
+PRODUCT_REMOVED = "ProductRemoved"
+
+# Eventos leídos por lote del cursor al reproducir
+REPLAY_BATCH_SIZE = 50000
+
+_events = StockEvent.__table__
+_snapshots = StockSnapshot.__table__
+_movements = InventoryMovement.__table__
+_products = Product.__table__
+_balances = ProductOpeningBalance.__table__
+
+
+# ==================== ESCRITURA (LISTENER DEL ORM) ====================
+
+def _event(product_id: int, event_type: str, delta: int, occurred_at: datetime, **values) -> Dict:
+    return {
+        "product_id": product_id, "event_type": event_type, "delta": delta, "occurred_at": occurred_at,
+        "old_stock": None, "new_stock": None, "movement_id": None, "user_id": None, **values,
+    }
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    now = datetime.utcnow()
+    pending: List[Dict] = []
+    for obj in session.new:
+        if isinstance(obj, Product):
+            # created_at con default del servidor queda expirado: no se recarga solo para el evento
+            created_at = inspect(obj).dict.get("created_at")
+            pending.append(_event(obj.id, STOCK_INITIALIZED, obj.current_stock or 0,
+                                  created_at if isinstance(created_at, datetime) else now,
+                                  new_stock=obj.current_stock or 0))
+    movements = sorted(
+        (obj for obj in session.new if isinstance(obj, InventoryMovement)),
+        key=lambda obj: (obj.created_at or now, obj.id),
+    )
+    for obj in movements:
+        pending.append(_event(
+            obj.product_id, STOCK_MOVEMENT_APPLIED, obj.quantity if obj.movement_type == "IN" else -obj.quantity,
+            obj.created_at or now, old_stock=obj.previous_stock, new_stock=obj.new_stock,
+            movement_id=obj.id, user_id=obj.user_id,
+        ))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            pending.append(_event(obj.id, PRODUCT_REMOVED, -(obj.current_stock or 0), now,
+                                  old_stock=obj.current_stock))
+    if not pending:
+        return
+
+    connection = session.connection()
+    product_ids = {row["product_id"] for row in pending}
+    versions = dict(connection.execute(
+        select(_events.c.product_id, func.max(_events.c.version))
+        .where(_events.c.product_id.in_(product_ids))
+        .group_by(_events.c.product_id)
+    ).all())
+    rows = []
+    for row in pending:
+        product_id = row["product_id"]
+        if product_id not in versions and row["event_type"] == STOCK_MOVEMENT_APPLIED:
+            # Producto anterior al flujo: se inicializa con el stock previo a su primer evento
+            rows.append(_event(product_id, STOCK_INITIALIZED, row["old_stock"] or 0, row["occurred_at"],
+                               new_stock=row["old_stock"] or 0, version=1))
+            versions[product_id] = 1
+        row["version"] = versions[product_id] = versions.get(product_id, 0) + 1
+        rows.append(row)
+    connection.execute(insert(_events), rows)
+
+
+def install_event_stream_tracking() -> None:
+    """Registrar los eventos en cada flush de cualquier sesión (idempotente)"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+install_event_stream_tracking()
+
+
+def backfill_event_stream(engine: Engine) -> int:
+    """
+    Crear el flujo de los productos que todavía no tienen eventos: un
+    StockInitialized (saldo de apertura del archivo, previous_stock del
+    primer movimiento o stock actual) y un StockMovementApplied por cada
+    movimiento de inventory_movements, en orden cronológico. Los productos
+    con eventos no se tocan (el flujo es append-only; el listener inicializa
+    solo a los productos anteriores al flujo en su primer movimiento).
+
+    Returns:
+        int: Eventos creados
+    """
+    with engine.begin() as connection:
+        before = connection.execute(select(func.count()).select_from(_events)).scalar()
+        before_seq = connection.execute(select(func.max(_events.c.seq))).scalar() or 0
+        without_events = _products.c.id.not_in(select(_events.c.product_id).distinct())
+        ordering = (_movements.c.created_at, _movements.c.id)
+        first = select(
+            _movements.c.product_id, _movements.c.previous_stock, _movements.c.created_at,
+            func.row_number().over(partition_by=_movements.c.product_id, order_by=ordering).label("position"),
+        ).subquery()
+        baseline = func.coalesce(_balances.c.stock, first.c.previous_stock, _products.c.current_stock)
+        connection.execute(insert(_events).from_select(
+            ["product_id", "version", "event_type", "delta", "new_stock", "occurred_at"],
+            select(
+                _products.c.id, literal(1), literal(STOCK_INITIALIZED), baseline, baseline,
+                func.coalesce(_balances.c.last_movement_at, first.c.created_at, _products.c.created_at),
+            )
+            .select_from(
+                _products
+                .outerjoin(_balances, _balances.c.product_id == _products.c.id)
+                .outerjoin(first, and_(first.c.product_id == _products.c.id, first.c.position == 1))
+            )
+            .where(without_events)
+            .order_by(_products.c.id)
+        ))
+        initialized = select(_events.c.product_id).where(_events.c.version == 1, _events.c.seq > before_seq)
+        signed = case((_movements.c.movement_type == "IN", _movements.c.quantity), else_=-_movements.c.quantity)
+        connection.execute(insert(_events).from_select(
+            ["product_id", "version", "event_type", "delta", "old_stock", "new_stock",
+             "movement_id", "user_id", "occurred_at"],
+            select(
+                _movements.c.product_id,
+                func.row_number().over(partition_by=_movements.c.product_id, order_by=ordering) + 1,
+                literal(STOCK_MOVEMENT_APPLIED), signed, _movements.c.previous_stock, _movements.c.new_stock,
+                _movements.c.id, _movements.c.user_id, _movements.c.created_at,
+            )
+            .where(_movements.c.product_id.in_(initialized))
+            .order_by(*ordering)
+        ))
+        return connection.execute(select(func.count()).select_from(_events)).scalar() - before
+
+
+# ==================== REPRODUCCIÓN ====================
+
+@dataclass
+class ProductState:
+    """Estado de un producto reconstruido desde el flujo"""
+    product_id: int
+    stock: int
+    version: int
+    quantity_in: int = 0
+    quantity_out: int = 0
+    movements: int = 0
+    last_event_at: Optional[datetime] = None
+
+
+@dataclass
+class ReplayResult:
+    """Estados reproducidos y costo de la reproducción"""
+    states: Dict[int, ProductState] = field(default_factory=dict)
+    position: int = 0  # seq del último evento incluido
+    snapshots: int = 0
+    events: int = 0
+    seconds: float = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+
+# Códigos numéricos de event_type en las tuplas de los lotes
+_KIND = case(
+    (_events.c.event_type == STOCK_MOVEMENT_APPLIED, 1),
+    (_events.c.event_type == STOCK_INITIALIZED, 0),
+    else_=2,
+)
+
+
+def event_batches(
+    connection: Connection,
+    product_id: Optional[int] = None,
+    after_seq: int = 0,
+    until_seq: Optional[int] = None,
+    batch_size: int = REPLAY_BATCH_SIZE
+) -> Iterator[List[Tuple]]:
+    """
+    Lotes de tuplas (product_id, version, kind, delta, occurred_at, seq) en
+    orden de seq, para reconstruir proyecciones; kind: 0 StockInitialized,
+    1 StockMovementApplied, 2 ProductRemoved. occurred_at llega como lo
+    entrega el driver (texto en SQLite).
+    """
+    query = select(
+        _events.c.product_id, _events.c.version, _KIND, _events.c.delta, _events.c.occurred_at, _events.c.seq
+    ).where(_events.c.seq > after_seq)
+    if product_id is not None:
+        query = query.where(_events.c.product_id == product_id)
+    if until_seq is not None:
+        query = query.where(_events.c.seq <= until_seq)
+    query = query.order_by(_events.c.seq)
+
+    # Cursor DB-API directo: los parámetros son enteros, se compilan como literales
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _decode_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _fold(connection: Connection, product_id: int, after_seq: int, until_seq: Optional[int]) -> Optional[list]:
+    """Reproducción evento por evento de un producto (ids eliminados y vueltos a crear)"""
+    state = None
+    for batch in event_batches(connection, product_id, after_seq, until_seq):
+        for _, version, kind, delta, occurred_at, _ in batch:
+            if kind == 0:
+                state = [delta, version, 0, 0, 0, occurred_at]
+            elif kind == 2:
+                state = None
+            elif state is not None:
+                state[0] += delta
+                state[2 if delta > 0 else 3] += abs(delta)
+                state[4] += 1
+                state[1], state[5] = version, occurred_at
+    return state
+
+
+def replay(
+    connection: Connection,
+    product_id: Optional[int] = None,
+    use_snapshots: bool = True,
+    until_seq: Optional[int] = None
+) -> ReplayResult:
+    """
+    Reconstruir el estado de todos los productos (o de uno) desde el flujo.
+
+    Parte de la generación de snapshots más reciente (posición S, ver
+    write_snapshots) y pliega los eventos con seq > S con agregados en la
+    base (SUM / MAX agrupados por producto, sobre el índice
+    ix_stock_events_replay que cubre la query): el stock es un plegado
+    asociativo de los deltas, StockInitialized siempre es la versión 1 y
+    ProductRemoved es terminal. Solo los productos eliminados en ese tramo
+    se reproducen evento por evento.
+
+    Args:
+        connection: Conexión (se lee dentro de su transacción)
+        product_id: Limitar a un producto (búsqueda por índice)
+        use_snapshots: Partir de los snapshots (False: desde el primer evento)
+        until_seq: Reproducir hasta este evento (estado en un punto del flujo)
+    """
+    start = time.perf_counter()
+    result = ReplayResult()
+    # Estado por producto: [stock, version, entradas, salidas, movimientos, fecha del último evento]
+    states: Dict[int, list] = {}
+    position = 0
+    if use_snapshots:
+        generation = select(func.max(_snapshots.c.seq))
+        if until_seq is not None:
+            generation = generation.where(_snapshots.c.seq <= until_seq)
+        position = connection.execute(generation).scalar() or 0
+        # Snapshot más reciente de cada producto hasta esa generación
+        latest = select(_snapshots.c.product_id, func.max(_snapshots.c.version).label("version")).where(
+            _snapshots.c.seq <= position
+        )
+        if product_id is not None:
+            latest = latest.where(_snapshots.c.product_id == product_id)
+        latest = latest.group_by(_snapshots.c.product_id).subquery()
+        for row in connection.execute(
+            select(_snapshots).join(latest, and_(
+                latest.c.product_id == _snapshots.c.product_id, latest.c.version == _snapshots.c.version
+            )).where(_snapshots.c.removed.is_(False))
+        ):
+            states[row.product_id] = [row.stock, row.version, row.quantity_in, row.quantity_out,
+                                      row.movements, row.last_event_at]
+        result.snapshots = len(states)
+
+    is_movement = _events.c.version > 1
+    tail = select(
+        _events.c.product_id,
+        func.sum(_events.c.delta),
+        func.sum(case((is_movement & (_events.c.delta > 0), _events.c.delta), else_=0)),
+        func.sum(case((is_movement & (_events.c.delta < 0), -_events.c.delta), else_=0)),
+        func.sum(case((is_movement, 1), else_=0)),
+        func.max(_events.c.version),
+        func.max(_events.c.occurred_at),
+        func.count(),
+        func.max(_events.c.seq),
+    ).where(_events.c.seq > position).group_by(_events.c.product_id)
+    removed = select(_events.c.product_id, func.max(_events.c.version)).where(
+        _events.c.event_type == PRODUCT_REMOVED, _events.c.seq > position
+    ).group_by(_events.c.product_id)
+    if product_id is not None:
+        tail = tail.where(_events.c.product_id == product_id)
+        removed = removed.where(_events.c.product_id == product_id)
+    if until_seq is not None:
+        tail = tail.where(_events.c.seq <= until_seq)
+        removed = removed.where(_events.c.seq <= until_seq)
+
+    result.position = position
+    for pid, net, quantity_in, quantity_out, movements, version, occurred_at, count, seq in connection.execute(tail):
+        occurred_at = _decode_datetime(occurred_at)
+        state = states.get(pid)
+        if state is None:
+            states[pid] = [net, version, quantity_in, quantity_out, movements, occurred_at]
+        else:
+            state[0] += net
+            state[1] = version
+            state[2] += quantity_in
+            state[3] += quantity_out
+            state[4] += movements
+            state[5] = max(state[5], occurred_at) if state[5] else occurred_at
+        result.events += count
+        result.position = max(result.position, seq)
+    for pid, removed_version in connection.execute(removed):
+        if pid in states and states[pid][1] == removed_version:
+            del states[pid]
+            continue
+        # Id reutilizado después de eliminar el producto: desde su nuevo StockInitialized
+        state = _fold(connection, pid, position, until_seq)
+        if state is None:
+            states.pop(pid, None)
+        else:
+            states[pid] = state
+
+    result.states = {
+        pid: ProductState(pid, stock, version, quantity_in, quantity_out, movements, _decode_datetime(at))
+        for pid, (stock, version, quantity_in, quantity_out, movements, at) in sorted(states.items())
+    }
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def write_snapshots(engine: Engine, every: int = SNAPSHOT_EVERY) -> int:
+    """
+    Escribir una generación de snapshots si el flujo tiene al menos `every`
+    eventos desde la anterior: un snapshot por cada producto que cambió,
+    todos en la misma posición del flujo (seq), y una marca (removed) por
+    cada producto eliminado desde la anterior. Los productos sin cambios
+    conservan su snapshot anterior.
+
+    Returns:
+        int: Snapshots escritos
+    """
+    with engine.begin() as connection:
+        previous = connection.execute(select(func.max(_snapshots.c.seq))).scalar() or 0
+        last = connection.execute(select(func.max(_events.c.seq))).scalar() or 0
+        if last - previous < max(every, 1):
+            return 0
+        result = replay(connection, until_seq=last)
+        versions = select(_snapshots.c.product_id, func.max(_snapshots.c.version).label("version")).group_by(
+            _snapshots.c.product_id
+        ).subquery()
+        latest = {
+            row.product_id: row for row in connection.execute(
+                select(_snapshots.c.product_id, _snapshots.c.version, _snapshots.c.removed).join(versions, and_(
+                    versions.c.product_id == _snapshots.c.product_id, versions.c.version == _snapshots.c.version
+                ))
+            )
+        }
+        now = datetime.utcnow()
+        rows = [
+            {
+                "product_id": state.product_id, "version": state.version, "seq": last, "stock": state.stock,
+                "quantity_in": state.quantity_in, "quantity_out": state.quantity_out, "movements": state.movements,
+                "last_event_at": state.last_event_at, "removed": False, "taken_at": now,
+            }
+            for state in result.states.values()
+            if state.product_id not in latest or state.version != latest[state.product_id].version
+        ]
+        # Eliminados desde la generación anterior: la marca evita partir de su último snapshot
+        rows.extend(
+            {
+                "product_id": product_id, "version": previous_row.version + 1, "seq": last, "stock": 0,
+                "quantity_in": 0, "quantity_out": 0, "movements": 0, "last_event_at": None,
+                "removed": True, "taken_at": now,
+            }
+            for product_id, previous_row in latest.items()
+            if product_id not in result.states and not previous_row.removed
+        )
+        for offset in range(0, len(rows), 5000):
+            connection.execute(insert(_snapshots), rows[offset:offset + 5000])
+    return len(rows)
+
+
+def stock_drift(connection: Connection, states: Dict[int, ProductState]) -> List[Tuple[int, int, int]]:
+    """(product_id, current_stock, stock reproducido) de los productos que no coinciden con el flujo"""
+    drift = []
+    for product_id, current_stock in connection.execute(select(_products.c.id, _products.c.current_stock)):
+        state = states.get(product_id)
+        if state is not None and state.stock != current_stock:
+            drift.append((product_id, current_stock, state.stock))
+    return drift
+
+
+def restore_read_models(engine: Engine) -> int:
+    """
+    Recuperación: reescribir products.current_stock desde el flujo y
+    recalcular stock_summary.
+
+    Returns:
+        int: Productos corregidos
+    """
+    from .delta_sync import PRODUCT, UPSERT, record_changes
+    from .stock_summary import rebuild_stock_summary
+
+    with engine.begin() as connection:
+        drift = stock_drift(connection, replay(connection).states)
+        if drift:
+            now = datetime.utcnow()
+            for product_id, _, stock in drift:
+                connection.execute(
+                    update(_products).where(_products.c.id == product_id).values(current_stock=stock, updated_at=now)
+                )
+            record_changes(connection, [(PRODUCT, product_id, UPSERT) for product_id, _, _ in drift])
+        rebuild_stock_summary(connection)
+    return len(drift)
@@ -0,0 +1,84 @@
+"""
+Instrumentación de sentencias SQL.
+Mide cada sentencia con los eventos before/after_cursor_execute de SQLAlchemy
+y la entrega a los observadores registrados (métricas, trazas, etc.).
+
+Uso:
+    from infrastructure.database.instrumentation import add_query_observer
+
+    def observer(execution: QueryExecution):
+        print(execution.statement, execution.elapsed)
+
+    add_query_observer(observer)
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Clave en connection.info para la pila de tiempos de inicio
+_START_TIMES_KEY = "query_start_times"
+
+_observers: List[Callable[["QueryExecution"], None]] = []
+
+
+@dataclass
+class QueryExecution:
+    """Datos de una sentencia SQL ejecutada"""
+    statement: str
+    parameters: Any
+    executemany: bool
+    elapsed: float  # Segundos
+    connection: Any  # sqlalchemy.engine.Connection
+
+
+def add_query_observer(observer: Callable[[QueryExecution], None]) -> None:
+    """
+    Registrar un observador que recibe cada sentencia ejecutada.
+
+    Los observadores se ejecutan en el hilo de la consulta y deben ser baratos.
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def remove_query_observer(observer: Callable[[QueryExecution], None]) -> None:
+    """Eliminar un observador registrado"""
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get(_START_TIMES_KEY)
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    if not _observers:
+        return
+    execution = QueryExecution(statement, parameters, executemany, elapsed, conn)
+    for observer in _observers:
+        observer(execution)
+
+
+def _handle_error(exception_context):
+    # La sentencia falló: descartar su tiempo de inicio
+    conn = exception_context.connection
+    if conn is not None:
+        start_times = conn.info.get(_START_TIMES_KEY)
+        if start_times:
+            start_times.pop()
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """Registrar los eventos de instrumentación en un engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -7,7 +7,7 @@ Principios:
 - Relaciones definidas con SQLAlchemy ORM
 - Validaciones a nivel de base de datos con CheckConstraint
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Boolean, Enum, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, CheckConstraint, Boolean, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -198,7 +198,7 @@ class InventoryMovement(Base):
     previous_stock = Column(Integer, nullable=True)
     new_stock = Column(Integer, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=func.now(), nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False, index=True)
     
     # Relaciones muchos-a-uno
     product = relationship("Product", back_populates="movements")
@@ -212,6 +212,8 @@ class InventoryMovement(Base):
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
         # Solo tipos válidos
         CheckConstraint('movement_type IN ("IN", "OUT")', name='check_movement_type'),
+        # Historial de un producto ordenado por fecha (saldos, estados de cuenta)
+        Index('ix_inventory_movements_product_created', 'product_id', 'created_at'),
     )
     
     def __repr__(self) -> str:
@@ -231,4 +233,273 @@ class InventoryMovement(Base):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "product": self.product.to_dict() if self.product else None,
             "user": self.user.to_dict() if self.user else None,
-        }
\ No newline at end of file
+        }
+
+
+# ==================== RESÚMENES MATERIALIZADOS ====================
+class StockSummary(Base):
+    """
+    Resumen global del inventario (una sola fila, id = 1).
+    Se mantiene en la misma transacción que cada escritura de productos y
+    movimientos (ver stock_summary.py); se reconstruye con
+    scripts/rebuild_summaries.py.
+
+    Campos:
+    - total_products, total_stock: Cantidad de productos y suma de su stock
+    - low_stock_count: Productos con stock bajo el mínimo
+    - out_of_stock_count: Productos sin stock
+    - high_stock_count: Productos sobre el 90% del máximo
+    - total_movements: Movimientos registrados
+    """
+    __tablename__ = "stock_summary"
+
+    id = Column(Integer, primary_key=True)
+    total_products = Column(Integer, default=0, nullable=False)
+    total_stock = Column(BigInteger, default=0, nullable=False)
+    low_stock_count = Column(Integer, default=0, nullable=False)
+    out_of_stock_count = Column(Integer, default=0, nullable=False)
+    high_stock_count = Column(Integer, default=0, nullable=False)
+    total_movements = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StockSummary(products={self.total_products}, movements={self.total_movements})>"
+
+
+class DailyMovementCount(Base):
+    """
+    Movimientos por día (UTC), mantenidos junto con StockSummary: cantidad
+    de movimientos de cada tipo y cantidades que entraron y salieron.
+    """
+    __tablename__ = "daily_movement_counts"
+
+    day = Column(Date, primary_key=True)
+    movements = Column(Integer, default=0, nullable=False)
+    in_count = Column(Integer, default=0, nullable=False)
+    out_count = Column(Integer, default=0, nullable=False)
+    in_quantity = Column(BigInteger, default=0, nullable=False)
+    out_quantity = Column(BigInteger, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<DailyMovementCount(day={self.day}, movements={self.movements})>"
+
+
+class DailyProductMovement(Base):
+    """
+    Acumulado diario (UTC) de movimientos por producto.
+    Se mantiene con cada movimiento registrado (ver movement_rollup.py) y se
+    reconstruye por lotes con scripts/rebuild_summaries.py.
+
+    Campos:
+    - product_id, day: Clave del acumulado
+    - in_quantity, out_quantity: Cantidades que entraron y salieron en el día
+    - in_count, out_count: Cantidad de movimientos de cada tipo
+    - closing_stock: Stock al cierre del día (new_stock del último movimiento)
+    - last_movement_at: Fecha del último movimiento del día
+    """
+    __tablename__ = "product_daily_movements"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    in_quantity = Column(BigInteger, default=0, nullable=False)
+    out_quantity = Column(BigInteger, default=0, nullable=False)
+    in_count = Column(Integer, default=0, nullable=False)
+    out_count = Column(Integer, default=0, nullable=False)
+    closing_stock = Column(Integer, nullable=True)
+    last_movement_at = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<DailyProductMovement(product_id={self.product_id}, day={self.day}, closing_stock={self.closing_stock})>"
+
+
+# ==================== ARCHIVO HISTÓRICO ====================
+class MovementArchiveSegment(Base):
+    """
+    Segmento inmutable de movimientos archivados (un archivo SQLite por mes
+    y corrida; ver movement_archive.py). Las filas de un segmento ya no
+    están en inventory_movements.
+
+    Campos:
+    - month: Mes archivado ("YYYY-MM")
+    - file_name: Archivo dentro de ARCHIVE_DIR
+    - period_start, period_end: Rango [inicio, fin) del mes
+    - movements, first_id, last_id: Cantidad y rango de ids archivados
+    - checksum: SHA-256 del archivo (verificación de inmutabilidad)
+    """
+    __tablename__ = "movement_archive_segments"
+
+    id = Column(Integer, primary_key=True)
+    month = Column(String(7), nullable=False, index=True)
+    file_name = Column(String(255), unique=True, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    movements = Column(Integer, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=False)
+    archived_at = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<MovementArchiveSegment(month='{self.month}', movements={self.movements})>"
+
+
+class ProductOpeningBalance(Base):
+    """
+    Saldo de apertura de un producto en la tabla activa: stock al cierre del
+    último movimiento archivado. Junto con los movimientos activos mantiene
+    la continuidad del stock sin leer el archivo.
+
+    Campos:
+    - stock: new_stock del último movimiento archivado
+    - as_of: Movimientos anteriores a esta fecha están archivados
+    - last_movement_at: Fecha del último movimiento archivado
+    - archived_movements: Movimientos archivados del producto
+    """
+    __tablename__ = "product_opening_balances"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    stock = Column(Integer, nullable=True)
+    as_of = Column(DateTime, nullable=False)
+    last_movement_at = Column(DateTime, nullable=False)
+    archived_movements = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ProductOpeningBalance(product_id={self.product_id}, stock={self.stock}, as_of={self.as_of})>"
+
+
+# ==================== PUNTOS DE CONTROL DE STOCK ====================
+class StockCheckpoint(Base):
+    """
+    Stock de cada producto en un instante (incluye los movimientos con
+    created_at <= taken_at). Los escribe periódicamente
+    scripts/write_checkpoints.py; las consultas "stock al" parten del punto
+    de control más cercano (ver stock_checkpoints.py).
+    """
+    __tablename__ = "stock_checkpoints"
+
+    taken_at = Column(DateTime, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    stock = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StockCheckpoint(taken_at={self.taken_at}, product_id={self.product_id}, stock={self.stock})>"
+
+
+# ==================== FLUJO DE EVENTOS DE STOCK ====================
+class StockEvent(Base):
+    """
+    Evento de stock (append-only, ver event_stream.py): se escribe en la
+    misma transacción que el producto o el movimiento que lo origina y nunca
+    se modifica ni se elimina. Sin clave foránea: el flujo conserva la
+    historia de los productos eliminados.
+    """
+    __tablename__ = "stock_events"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)  # Posición del evento en el flujo del producto (1, 2, ...)
+    event_type = Column(String(30), nullable=False)
+    delta = Column(Integer, nullable=False)  # Cambio de stock (el stock inicial en StockInitialized)
+    old_stock = Column(Integer)
+    new_stock = Column(Integer)
+    movement_id = Column(Integer)
+    user_id = Column(Integer)
+    occurred_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ux_stock_events_product_version', 'product_id', 'version', unique=True),
+        # Cubre la reproducción agregada por producto (event_stream.replay)
+        Index('ix_stock_events_replay', 'product_id', 'version', 'delta', 'occurred_at'),
+        # Solo las eliminaciones (pocas filas)
+        Index('ix_stock_events_removed', 'product_id', 'version',
+              sqlite_where=text("event_type = 'ProductRemoved'"),
+              postgresql_where=text("event_type = 'ProductRemoved'")),
+    )
+
+    def __repr__(self) -> str:
+        return f"<StockEvent(seq={self.seq}, product_id={self.product_id}, type='{self.event_type}', delta={self.delta})>"
+
+
+class StockSnapshot(Base):
+    """
+    Estado de un producto después del evento `version` de su flujo. Cada
+    generación (scripts/replay_events.py --snapshot, periódico) guarda los
+    productos que cambiaron, todos con la misma posición del flujo (seq); la
+    reproducción parte de la última generación y aplica los eventos con
+    seq mayor.
+    """
+    __tablename__ = "stock_snapshots"
+
+    product_id = Column(Integer, primary_key=True)
+    version = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False, index=True)  # Posición del flujo de la generación
+    stock = Column(Integer, nullable=False)
+    quantity_in = Column(Integer, nullable=False, default=0)
+    quantity_out = Column(Integer, nullable=False, default=0)
+    movements = Column(Integer, nullable=False, default=0)
+    last_event_at = Column(DateTime)
+    removed = Column(Boolean, nullable=False, default=False)  # Producto eliminado antes de la generación
+    taken_at = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StockSnapshot(product_id={self.product_id}, version={self.version}, stock={self.stock})>"
+
+
+class EventSubscriberOffset(Base):
+    """
+    Posición de un suscriptor durable en stock_events (event_dispatcher.py):
+    seq del último evento entregado; avanza en la misma transacción que lo
+    que el suscriptor escribe.
+    """
+    __tablename__ = "event_subscriber_offsets"
+
+    subscriber = Column(String(100), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<EventSubscriberOffset(subscriber='{self.subscriber}', position={self.position})>"
+
+
+# ==================== SINCRONIZACIÓN DE CLIENTES ====================
+class SyncChange(Base):
+    """
+    Último cambio de cada producto o movimiento (delta_sync.py): un cambio
+    nuevo reemplaza la fila anterior con un seq mayor, así que la tabla
+    tiene una fila por entidad y GET /sync?since=<seq> lee solo lo que
+    cambió. Las eliminaciones quedan como marcas (operation='delete').
+    """
+    __tablename__ = "sync_changes"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)  # product, movement
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # upsert, delete
+    changed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ux_sync_changes_entity', 'entity', 'entity_id', unique=True),
+        # AUTOINCREMENT: SQLite no reutiliza el seq de una fila reemplazada
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self) -> str:
+        return f"<SyncChange(seq={self.seq}, entity='{self.entity}', id={self.entity_id}, op='{self.operation}')>"
+
+
+class SyncUpload(Base):
+    """
+    Movimiento subido por un cliente offline y ya aplicado (sync_upload.py):
+    un reintento con el mismo client_id devuelve el movimiento existente en
+    lugar de duplicarlo. Los rechazados no se guardan (pueden reintentarse).
+    """
+    __tablename__ = "sync_uploads"
+
+    client_id = Column(String(64), primary_key=True)  # Id generado por el dispositivo (UUID)
+    device_id = Column(String(64), nullable=False)
+    movement_id = Column(Integer, nullable=False)
+    occurred_at = Column(DateTime)  # Momento del registro en el dispositivo
+    received_at = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SyncUpload(client_id='{self.client_id}', movement_id={self.movement_id})>"
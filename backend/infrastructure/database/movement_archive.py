@@ -0,0 +1,387 @@
+"""
+Archivo histórico de movimientos (almacenamiento frío).
+
+archive_movements() mueve los movimientos anteriores al horizonte de
+retención (meses completos más antiguos que MOVEMENT_RETENTION_DAYS) a
+segmentos inmutables: un archivo SQLite por mes en ARCHIVE_DIR, de solo
+lectura y con su SHA-256 registrado en movement_archive_segments. En la
+misma transacción:
+- Se eliminan esas filas de inventory_movements, que queda acotada
+- Se actualiza product_opening_balances con el stock al cierre del último
+  movimiento archivado de cada producto (continuidad del stock)
+- Los resúmenes (stock_summary, daily_movement_counts,
+  product_daily_movements) no cambian: siguen contando la historia completa
+
+MovementArchive lee los segmentos; el repositorio de movimientos la usa
+cuando el rango de una consulta llega al archivo, así que la historia
+completa sigue disponible sin cambios para los casos de uso.
+
+Configuración (variables de entorno):
+- ARCHIVE_DIR: directorio de los segmentos (default database/archive)
+- MOVEMENT_RETENTION_DAYS: días que se mantienen en la tabla activa (default 365)
+
+Uso:
+    python scripts/archive_movements.py --retention-days 365
+"""
+import hashlib
+import os
+import sqlite3
+import stat
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from .models import InventoryMovement, MovementArchiveSegment, ProductOpeningBalance
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "database/archive")
+MOVEMENT_RETENTION_DAYS = int(os.getenv("MOVEMENT_RETENTION_DAYS", "365"))
+
+COLUMNS = (
+    "id", "product_id", "quantity", "movement_type", "reason",
+    "previous_stock", "new_stock", "user_id", "created_at",
+)
+# Filas leídas por lote al escribir un segmento y ids por DELETE
+BATCH_SIZE = 5000
+
+_SEGMENT_SCHEMA = """
+CREATE TABLE movements (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    movement_type TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    previous_stock INTEGER,
+    new_stock INTEGER,
+    user_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+_SEGMENT_INDEXES = (
+    "CREATE INDEX ix_movements_product_created ON movements (product_id, created_at)",
+    "CREATE INDEX ix_movements_created ON movements (created_at)",
+)
+
+_movements = InventoryMovement.__table__
+_segments = MovementArchiveSegment.__table__
+_balances = ProductOpeningBalance.__table__
+
+
+def format_timestamp(value: datetime) -> str:
+    """Mismo formato que DateTime de SQLAlchemy en SQLite (ordenable como texto)"""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def archive_cutoff(now: datetime, retention_days: int) -> datetime:
+    """Inicio del mes que contiene now - retention_days: solo se archivan meses completos"""
+    horizon = now - timedelta(days=retention_days)
+    return datetime(horizon.year, horizon.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def archived_until(connection) -> Optional[datetime]:
+    """Fin del último mes archivado (None si no hay archivo)"""
+    return connection.execute(select(func.max(_segments.c.period_end))).scalar()
+
+
+def archived_until_subquery():
+    """archived_until() como subquery escalar, para leerlo junto con otra consulta"""
+    return select(func.max(_segments.c.period_end)).scalar_subquery()
+
+
+# ==================== ARCHIVADO ====================
+
+@dataclass
+class ArchiveResult:
+    """Resultado de una corrida de archive_movements"""
+    cutoff: datetime
+    segments: int = 0
+    movements: int = 0
+    products: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "cutoff": self.cutoff.isoformat()}
+
+
+def _write_segment(path: Path, batches: Iterable[List[tuple]]) -> str:
+    """Escribir un segmento nuevo (archivo temporal + rename) y devolver su SHA-256"""
+    temporary = path.with_suffix(".tmp")
+    if temporary.exists():
+        temporary.unlink()
+    segment = sqlite3.connect(temporary)
+    try:
+        segment.execute("PRAGMA journal_mode=OFF")
+        segment.execute("PRAGMA synchronous=OFF")
+        segment.execute(_SEGMENT_SCHEMA)
+        for batch in batches:
+            segment.executemany(f"INSERT INTO movements VALUES ({', '.join('?' * len(COLUMNS))})", batch)
+        for statement in _SEGMENT_INDEXES:
+            segment.execute(statement)
+        segment.commit()
+    finally:
+        segment.close()
+
+    digest = hashlib.sha256()
+    with open(temporary, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    return digest.hexdigest()
+
+
+def _update_opening_balances(
+    connection: Connection,
+    latest: Dict[int, Tuple[datetime, Optional[int]]],
+    counts: Dict[int, int],
+    as_of: datetime
+) -> None:
+    product_ids = list(latest)
+    for offset in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[offset:offset + BATCH_SIZE]
+        existing = {
+            row.product_id: row for row in
+            connection.execute(select(_balances).where(_balances.c.product_id.in_(chunk)))
+        }
+        rows = []
+        for product_id in chunk:
+            last_movement_at, stock = latest[product_id]
+            previous = existing.get(product_id)
+            archived = counts[product_id]
+            balance_as_of = as_of
+            if previous is not None:
+                archived += previous.archived_movements
+                # Un mes tardío (más antiguo) no reemplaza el saldo más reciente
+                if previous.last_movement_at > last_movement_at:
+                    last_movement_at, stock = previous.last_movement_at, previous.stock
+                balance_as_of = max(as_of, previous.as_of)
+            rows.append({
+                "product_id": product_id, "stock": stock, "as_of": balance_as_of,
+                "last_movement_at": last_movement_at, "archived_movements": archived,
+            })
+        connection.execute(delete(_balances).where(_balances.c.product_id.in_(chunk)))
+        connection.execute(insert(_balances), rows)
+
+
+def _archive_month(engine: Engine, start: datetime, end: datetime, archive_dir: Path) -> Tuple[int, Set[int]]:
+    """Archivar los movimientos de [start, end) en un segmento nuevo: (movimientos, ids de productos)"""
+    month = start.strftime("%Y-%m")
+    with engine.begin() as connection:
+        in_month = (_movements.c.created_at >= start) & (_movements.c.created_at < end)
+        if connection.execute(select(func.count()).where(in_month)).scalar() == 0:
+            return 0, set()
+        part = connection.execute(select(func.count()).where(_segments.c.month == month)).scalar() + 1
+        file_name = f"movements-{month}.db" if part == 1 else f"movements-{month}-{part}.db"
+
+        ids: List[int] = []
+        latest: Dict[int, Tuple[datetime, Optional[int]]] = {}
+        counts: Dict[int, int] = {}
+
+        def batches():
+            result = connection.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(
+                select(*(_movements.c[name] for name in COLUMNS))
+                .where(in_month).order_by(_movements.c.created_at, _movements.c.id)
+            )
+            for partition in result.partitions():
+                batch = []
+                for row in partition:
+                    ids.append(row.id)
+                    # Ordenadas por fecha: el último movimiento de cada producto define su saldo
+                    latest[row.product_id] = (row.created_at, row.new_stock)
+                    counts[row.product_id] = counts.get(row.product_id, 0) + 1
+                    batch.append((*row[:-1], format_timestamp(row.created_at)))
+                yield batch
+
+        checksum = _write_segment(archive_dir / file_name, batches())
+        connection.execute(insert(_segments).values(
+            month=month, file_name=file_name, period_start=start, period_end=end, movements=len(ids),
+            first_id=min(ids), last_id=max(ids), checksum=checksum, archived_at=datetime.utcnow(),
+        ))
+        _update_opening_balances(connection, latest, counts, end)
+        # Core (sin ORM): los resúmenes siguen incluyendo los movimientos archivados
+        for offset in range(0, len(ids), BATCH_SIZE):
+            connection.execute(delete(_movements).where(_movements.c.id.in_(ids[offset:offset + BATCH_SIZE])))
+    return len(ids), set(latest)
+
+
+def archive_movements(
+    engine: Engine,
+    retention_days: int = MOVEMENT_RETENTION_DAYS,
+    archive_dir: str = ARCHIVE_DIR,
+    now: Optional[datetime] = None
+) -> ArchiveResult:
+    """
+    Archivar los meses completos anteriores al horizonte de retención,
+    una transacción por mes.
+
+    Args:
+        engine: Engine de la base de datos activa
+        retention_days: Días que se conservan en inventory_movements
+        archive_dir: Directorio de los segmentos
+        now: Fecha de referencia (default: ahora, UTC)
+    """
+    start_time = time.perf_counter()
+    result = ArchiveResult(cutoff=archive_cutoff(now or datetime.utcnow(), retention_days))
+    directory = Path(archive_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with engine.connect() as connection:
+        oldest = connection.execute(
+            select(func.min(_movements.c.created_at)).where(_movements.c.created_at < result.cutoff)
+        ).scalar()
+    month_start = datetime(oldest.year, oldest.month, 1) if oldest else result.cutoff
+    products: Set[int] = set()
+    while month_start < result.cutoff:
+        month_end = _next_month(month_start)
+        movements, month_products = _archive_month(engine, month_start, month_end, directory)
+        if movements:
+            result.segments += 1
+            result.movements += movements
+            products.update(month_products)
+        month_start = month_end
+    result.products = len(products)
+    result.seconds = round(time.perf_counter() - start_time, 2)
+    return result
+
+
+def verify_segments(connection, archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    """Segmentos faltantes o modificados (checksum distinto al registrado)"""
+    problems = []
+    for segment in connection.execute(select(_segments).order_by(_segments.c.period_start)):
+        path = Path(archive_dir) / segment.file_name
+        if not path.exists():
+            problems.append(f"{segment.file_name}: no existe")
+            continue
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        if digest.hexdigest() != segment.checksum:
+            problems.append(f"{segment.file_name}: checksum distinto")
+    return problems
+
+
+# ==================== LECTURA ====================
+
+class MovementArchive:
+    """
+    Consultas sobre los segmentos archivados. Los filtros son los del
+    repositorio de movimientos; las filas se devuelven como dicts con las
+    columnas de inventory_movements (created_at como datetime), de la más
+    reciente a la más antigua.
+    """
+
+    def __init__(self, db, archive_dir: str = ARCHIVE_DIR):
+        self.db = db
+        self.archive_dir = Path(archive_dir)
+
+    def horizon(self) -> Optional[datetime]:
+        return archived_until(self.db)
+
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Any]:
+        """Segmentos que se superponen con [start, end], del más reciente al más antiguo"""
+        query = select(_segments).order_by(_segments.c.period_start.desc(), _segments.c.id.desc())
+        if start is not None:
+            query = query.where(_segments.c.period_end > start)
+        if end is not None:
+            query = query.where(_segments.c.period_start <= end)
+        return list(self.db.execute(query))
+
+    def _connect(self, segment) -> sqlite3.Connection:
+        uri = (self.archive_dir / segment.file_name).resolve().as_uri()
+        return sqlite3.connect(f"{uri}?mode=ro&immutable=1", uri=True)
+
+    def _run(self, segment, sql: str, params: List[Any]) -> List[tuple]:
+        connection = self._connect(segment)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _where(
+        product_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        after: Optional[datetime] = None
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for clause, value in (
+            ("product_id = ?", product_id),
+            ("user_id = ?", user_id),
+            ("created_at >= ?", start_date and format_timestamp(start_date)),
+            ("created_at > ?", after and format_timestamp(after)),
+            ("created_at <= ?", end_date and format_timestamp(end_date)),
+            ("created_at < ?", before and format_timestamp(before)),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _to_dict(row: tuple) -> Dict[str, Any]:
+        movement = dict(zip(COLUMNS, row))
+        movement["created_at"] = datetime.fromisoformat(movement["created_at"])
+        return movement
+
+    def find(self, movement_id: int) -> Optional[Dict[str, Any]]:
+        segments = self.db.execute(
+            select(_segments).where(_segments.c.first_id <= movement_id, _segments.c.last_id >= movement_id)
+        )
+        for segment in segments:
+            rows = self._run(segment, f"SELECT {', '.join(COLUMNS)} FROM movements WHERE id = ?", [movement_id])
+            if rows:
+                return self._to_dict(rows[0])
+        return None
+
+    def query(self, segment, limit: Optional[int] = None, ascending: bool = False, **filters) -> List[Dict[str, Any]]:
+        where, params = self._where(**filters)
+        order = "ASC" if ascending else "DESC"
+        sql = f"SELECT {', '.join(COLUMNS)} FROM movements{where} ORDER BY created_at {order}, id {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [self._to_dict(row) for row in self._run(segment, sql, params)]
+
+    def totals(self, **filters) -> Tuple[int, int, int, int]:
+        """(movimientos, entradas, cantidad que entró, cantidad que salió) en todos los segmentos del rango"""
+        where, params = self._where(**filters)
+        sql = (
+            "SELECT COUNT(*), "
+            "COALESCE(SUM(movement_type = 'IN'), 0), "
+            "COALESCE(SUM(CASE WHEN movement_type = 'IN' THEN quantity ELSE 0 END), 0), "
+            "COALESCE(SUM(CASE WHEN movement_type = 'IN' THEN 0 ELSE quantity END), 0) "
+            f"FROM movements{where}"
+        )
+        totals = [0, 0, 0, 0]
+        end = filters.get("end_date") or filters.get("before")
+        for segment in self.segments(filters.get("start_date"), end):
+            for index, value in enumerate(self._run(segment, sql, params)[0]):
+                totals[index] += value
+        return tuple(totals)
+
+    def net_by_product(self, **filters) -> Dict[int, Tuple[int, int]]:
+        """(cambio neto de stock, movimientos) por producto en todos los segmentos del rango"""
+        where, params = self._where(**filters)
+        sql = (
+            "SELECT product_id, SUM(CASE WHEN movement_type = 'IN' THEN quantity ELSE -quantity END), COUNT(*) "
+            f"FROM movements{where} GROUP BY product_id"
+        )
+        net: Dict[int, Tuple[int, int]] = {}
+        start = filters.get("start_date") or filters.get("after")
+        for segment in self.segments(start, filters.get("end_date") or filters.get("before")):
+            for product_id, change, movements in self._run(segment, sql, params):
+                previous_change, previous_movements = net.get(product_id, (0, 0))
+                net[product_id] = (previous_change + change, previous_movements + movements)
+        return net
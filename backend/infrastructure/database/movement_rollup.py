@@ -0,0 +1,241 @@
+"""
+Acumulado diario de movimientos por producto (DailyProductMovement).
+
+Cada movimiento registrado por el ORM suma su cantidad y su tipo a la fila
+(product_id, día) en la misma transacción, y actualiza el stock de cierre
+del día. Las estadísticas por rango de fechas leen estas filas (unas pocas
+por producto y día) en vez de recorrer millones de movimientos; solo los
+días incompletos de los extremos del rango se calculan desde
+inventory_movements.
+
+Los movimientos son registros de auditoría: el acumulado considera
+inserciones y eliminaciones (las filas afectadas se recalculan), no
+modificaciones. Las escrituras fuera del ORM requieren
+backfill_movement_rollup() (scripts/rebuild_summaries.py).
+
+Uso:
+    from infrastructure.database.movement_rollup import backfill_movement_rollup
+
+    backfill_movement_rollup(engine, batch_products=1000)
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, or_, select, tuple_, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .models import DailyProductMovement, InventoryMovement, Product
+from .movement_archive import archived_until
+
+QUANTITY_COUNTERS = ("in_quantity", "out_quantity", "in_count", "out_count")
+
+# Clave en session.info entre before_flush y after_flush (por módulo, ver stock_summary.py)
+_STALE_KEY = (__name__, "stale_rows")
+
+_rollup = DailyProductMovement.__table__
+_movements = InventoryMovement.__table__
+_products = Product.__table__
+
+
+# ==================== RECONSTRUCCIÓN ====================
+
+def _aggregate(condition) -> select:
+    """SELECT con las filas del acumulado calculadas desde inventory_movements"""
+    day = func.date(_movements.c.created_at)
+    is_in = _movements.c.movement_type == "IN"
+    ranked = select(
+        _movements.c.product_id,
+        day.label("day"),
+        _movements.c.quantity,
+        is_in.label("is_in"),
+        _movements.c.new_stock,
+        _movements.c.created_at,
+        func.row_number().over(
+            partition_by=(_movements.c.product_id, day),
+            order_by=(_movements.c.created_at.desc(), _movements.c.id.desc()),
+        ).label("position"),
+    )
+    if condition is not None:
+        ranked = ranked.where(condition)
+    ranked = ranked.subquery()
+    return select(
+        ranked.c.product_id,
+        ranked.c.day,
+        func.sum(case((ranked.c.is_in, ranked.c.quantity), else_=0)),
+        func.sum(case((ranked.c.is_in, 0), else_=ranked.c.quantity)),
+        func.sum(case((ranked.c.is_in, 1), else_=0)),
+        func.sum(case((ranked.c.is_in, 0), else_=1)),
+        func.max(case((ranked.c.position == 1, ranked.c.new_stock))),
+        func.max(ranked.c.created_at),
+    ).group_by(ranked.c.product_id, ranked.c.day)
+
+
+_COLUMNS = ["product_id", "day", *QUANTITY_COUNTERS, "closing_stock", "last_movement_at"]
+
+
+def rebuild_movement_rollup(
+    connection: Connection,
+    first_product_id: Optional[int] = None,
+    last_product_id: Optional[int] = None
+) -> int:
+    """
+    Recalcular el acumulado de los productos en [first_product_id, last_product_id]
+    (todos si no se indica rango) dentro de la transacción de `connection`.
+    Los días ya archivados (movement_archive.py) se conservan tal cual.
+
+    Returns:
+        int: Filas del acumulado generadas
+    """
+    clear = delete(_rollup)
+    condition = None
+    horizon = archived_until(connection)
+    if horizon is not None:
+        clear = clear.where(_rollup.c.day >= horizon.date())
+        condition = _movements.c.created_at >= horizon
+    if first_product_id is not None:
+        clear = clear.where(_rollup.c.product_id >= first_product_id)
+        lower = _movements.c.product_id >= first_product_id
+        condition = lower if condition is None else and_(condition, lower)
+    if last_product_id is not None:
+        clear = clear.where(_rollup.c.product_id <= last_product_id)
+        upper = _movements.c.product_id <= last_product_id
+        condition = upper if condition is None else and_(condition, upper)
+    connection.execute(clear)
+    return connection.execute(insert(_rollup).from_select(_COLUMNS, _aggregate(condition))).rowcount
+
+
+def backfill_movement_rollup(
+    engine: Engine,
+    batch_products: int = 1000,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Reconstruir el acumulado completo por rangos de productos, una transacción
+    por lote (las escrituras concurrentes solo esperan al lote en curso).
+
+    Args:
+        engine: Engine de la base de datos
+        batch_products: Productos por lote
+        progress: Callback(último product_id procesado, id máximo)
+
+    Returns:
+        int: Filas del acumulado generadas
+    """
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.max(_products.c.id))).scalar() or 0
+    total = 0
+    for first in range(1, max_id + 1, batch_products):
+        last = min(first + batch_products - 1, max_id)
+        with engine.begin() as connection:
+            # El primer lote también elimina filas huérfanas de ids menores o inexistentes
+            total += rebuild_movement_rollup(connection, None if first == 1 else first, last)
+        if progress:
+            progress(last, max_id)
+    with engine.begin() as connection:
+        connection.execute(delete(_rollup).where(_rollup.c.product_id > max_id))
+    return total
+
+
+def _rebuild_rows(connection: Connection, rows: Iterable[Tuple[int, date]]) -> None:
+    """Recalcular filas puntuales (product_id, día), por ejemplo tras eliminar movimientos"""
+    rows = list(rows)
+    if not rows:
+        return
+    connection.execute(delete(_rollup).where(tuple_(_rollup.c.product_id, _rollup.c.day).in_(rows)))
+    condition = or_(*(
+        and_(
+            _movements.c.product_id == product_id,
+            _movements.c.created_at >= datetime.combine(day, time.min),
+            _movements.c.created_at < datetime.combine(day + timedelta(days=1), time.min),
+        )
+        for product_id, day in rows
+    ))
+    connection.execute(insert(_rollup).from_select(_COLUMNS, _aggregate(condition)))
+
+
+# ==================== MANTENIMIENTO INCREMENTAL ====================
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    deleted_products = set()
+    stale = set()
+    for obj in session.new:
+        if isinstance(obj, InventoryMovement) and obj.created_at is None:
+            obj.created_at = datetime.utcnow()
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            deleted_products.add(obj.id)
+        elif isinstance(obj, InventoryMovement) and obj.created_at is not None:
+            stale.add((obj.product_id, obj.created_at.date()))
+    session.info[_STALE_KEY] = (deleted_products, stale)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deleted_products, stale = session.info.pop(_STALE_KEY, (set(), set()))
+    added: Dict[Tuple[int, date], dict] = {}
+    for obj in sorted(
+        (obj for obj in session.new if isinstance(obj, InventoryMovement)),
+        key=lambda movement: (movement.created_at, movement.id)
+    ):
+        key = (obj.product_id, obj.created_at.date())
+        row = added.setdefault(key, dict.fromkeys(QUANTITY_COUNTERS, 0))
+        prefix = "in" if obj.movement_type == "IN" else "out"
+        row[f"{prefix}_quantity"] += obj.quantity
+        row[f"{prefix}_count"] += 1
+        # Ordenados por fecha: el último movimiento define el cierre
+        row["closing_stock"] = obj.new_stock
+        row["last_movement_at"] = obj.created_at
+
+    if not added and not stale and not deleted_products:
+        return
+    connection = session.connection()
+    if deleted_products:
+        # En SQLite las FK no se aplican por defecto: eliminar las filas explícitamente
+        connection.execute(delete(_rollup).where(_rollup.c.product_id.in_(deleted_products)))
+    _rebuild_rows(connection, (key for key in stale if key[0] not in deleted_products))
+    for (product_id, day), row in added.items():
+        _add_to_day(connection, product_id, day, row)
+
+
+def _add_to_day(connection: Connection, product_id: int, day: date, row: dict) -> None:
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        statement = upsert(_rollup).values(product_id=product_id, day=day, **row)
+        is_later = statement.excluded.last_movement_at >= _rollup.c.last_movement_at
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[_rollup.c.product_id, _rollup.c.day],
+            set_={
+                **{name: getattr(_rollup.c, name) + row[name] for name in QUANTITY_COUNTERS},
+                "closing_stock": case((is_later, statement.excluded.closing_stock), else_=_rollup.c.closing_stock),
+                "last_movement_at": case((is_later, statement.excluded.last_movement_at),
+                                         else_=_rollup.c.last_movement_at),
+            },
+        ))
+        return
+    current = connection.execute(
+        select(_rollup.c.last_movement_at)
+        .where(_rollup.c.product_id == product_id, _rollup.c.day == day)
+    ).first()
+    if current is None:
+        connection.execute(insert(_rollup).values(product_id=product_id, day=day, **row))
+        return
+    values = {name: getattr(_rollup.c, name) + row[name] for name in QUANTITY_COUNTERS}
+    if row["last_movement_at"] >= current.last_movement_at:
+        values.update(closing_stock=row["closing_stock"], last_movement_at=row["last_movement_at"])
+    connection.execute(
+        update(_rollup).where(_rollup.c.product_id == product_id, _rollup.c.day == day).values(**values)
+    )
+
+
+def install_movement_rollup_tracking() -> None:
+    """Mantener el acumulado en cada flush de cualquier sesión (idempotente)"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "after_flush", _after_flush)
+
+
+install_movement_rollup_tracking()
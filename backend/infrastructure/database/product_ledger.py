@@ -0,0 +1,164 @@
+"""
+Estado de cuenta de un producto: saldo inicial, cada movimiento del rango
+con su saldo acumulado y saldo final.
+
+- Saldo inicial: búsqueda por índice (product_id, created_at) del último
+  movimiento anterior al rango; si está archivado se usa
+  product_opening_balances o el segmento correspondiente
+- Saldos acumulados: una sola query con SUM(...) OVER (ORDER BY created_at, id)
+  sobre los movimientos del rango, leída por lotes (yield_per) para
+  transmitir rangos largos sin cargarlos en memoria
+- Los movimientos archivados del rango (movement_archive.py) se emiten
+  primero, con el saldo calculado al recorrerlos
+
+Cada fila incluye el new_stock registrado; si no coincide con el saldo
+calculado se cuenta como discrepancia (cadena de stock rota).
+
+Uso:
+    ledger = ProductLedger(db, product_id, start, end)
+    ledger.opening_balance
+    for row in ledger:
+        row["balance"]
+    ledger.closing_balance, ledger.discrepancies
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from .models import InventoryMovement, Product, ProductOpeningBalance, User
+from .movement_archive import ARCHIVE_DIR, MovementArchive
+from .stock_checkpoints import _net_changes, stock_as_of
+
+LEDGER_FIELDS = (
+    "id", "created_at", "movement_type", "quantity", "reason", "user_id", "username",
+    "previous_stock", "new_stock", "balance",
+)
+# Filas leídas por lote de la query con saldos
+YIELD_PER = 1000
+
+_movements = InventoryMovement.__table__
+_users = User.__table__
+
+
+def opening_balance(db: Session, product_id: int, start: datetime, archive: MovementArchive) -> int:
+    """Stock del producto justo antes de `start`"""
+    last = db.execute(
+        select(_movements.c.new_stock)
+        .where(_movements.c.product_id == product_id, _movements.c.created_at < start)
+        .order_by(_movements.c.created_at.desc(), _movements.c.id.desc())
+        .limit(1)
+    ).first()
+    if last is not None and last.new_stock is not None:
+        return last.new_stock
+
+    horizon = archive.horizon() if last is None else None
+    if horizon is not None and start >= horizon:
+        # El último movimiento anterior está archivado: su saldo quedó en product_opening_balances
+        balance = db.get(ProductOpeningBalance, product_id)
+        if balance is not None and balance.stock is not None:
+            return balance.stock
+    elif horizon is not None:
+        for segment in archive.segments(end=start):
+            rows = archive.query(segment, limit=1, product_id=product_id, before=start)
+            if rows:
+                if rows[0]["new_stock"] is not None:
+                    return rows[0]["new_stock"]
+                break
+
+    # Sin movimientos anteriores (o sin new_stock registrado): stock reconstruido al instante
+    before = start - timedelta(microseconds=1)
+    stock = stock_as_of(db, before, product_id, archive.archive_dir).stocks.get(product_id)
+    if stock is None:
+        # Producto creado dentro del rango: stock actual menos lo movido desde `start`
+        current = db.execute(select(Product.__table__.c.current_stock).where(Product.__table__.c.id == product_id)).scalar()
+        net, _ = _net_changes(db, archive, before, None, [product_id])
+        stock = (current or 0) - net.get(product_id, 0)
+    return stock
+
+
+class ProductLedger:
+    """Estado de cuenta iterable (ver docstring del módulo); los totales se completan al recorrerlo"""
+
+    def __init__(
+        self,
+        db: Session,
+        product_id: int,
+        start: datetime,
+        end: datetime,
+        archive_dir: str = ARCHIVE_DIR
+    ):
+        self.db = db
+        self.product_id = product_id
+        self.start = start
+        self.end = end
+        self.archive = MovementArchive(db, archive_dir)
+        self.opening_balance = opening_balance(db, product_id, start, self.archive)
+        self.closing_balance = self.opening_balance
+        self.movements = 0
+        self.quantity_in = 0
+        self.quantity_out = 0
+        self.discrepancies = 0
+
+    def _emit(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        self.movements += 1
+        if row["movement_type"] == "IN":
+            self.quantity_in += row["quantity"]
+        else:
+            self.quantity_out += row["quantity"]
+        if row["new_stock"] is not None and row["new_stock"] != row["balance"]:
+            self.discrepancies += 1
+        self.closing_balance = row["balance"]
+        row["created_at"] = row["created_at"].isoformat()
+        return row
+
+    def _archived(self) -> Iterator[Dict[str, Any]]:
+        horizon = self.archive.horizon()
+        if horizon is None or self.start >= horizon:
+            return
+        usernames: Dict[int, Optional[str]] = {}
+        for segment in reversed(self.archive.segments(self.start, self.end)):
+            rows = self.archive.query(
+                segment, ascending=True, product_id=self.product_id, start_date=self.start, end_date=self.end
+            )
+            missing = {row["user_id"] for row in rows} - set(usernames)
+            if missing:
+                usernames.update(dict(self.db.execute(
+                    select(_users.c.id, _users.c.username).where(_users.c.id.in_(missing))
+                ).all()))
+            for row in rows:
+                balance = self.closing_balance + (row["quantity"] if row["movement_type"] == "IN" else -row["quantity"])
+                yield self._emit({**row, "username": usernames.get(row["user_id"]), "balance": balance})
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield from self._archived()
+
+        signed = case((_movements.c.movement_type == "IN", _movements.c.quantity), else_=-_movements.c.quantity)
+        running = func.sum(signed).over(order_by=(_movements.c.created_at, _movements.c.id))
+        query = (
+            select(
+                _movements.c.id, _movements.c.created_at, _movements.c.movement_type, _movements.c.quantity,
+                _movements.c.reason, _movements.c.user_id, _users.c.username,
+                _movements.c.previous_stock, _movements.c.new_stock,
+                (literal(self.closing_balance) + running).label("balance"),
+            )
+            .select_from(_movements.outerjoin(_users, _users.c.id == _movements.c.user_id))
+            .where(
+                _movements.c.product_id == self.product_id,
+                _movements.c.created_at >= self.start,
+                _movements.c.created_at <= self.end,
+            )
+            .order_by(_movements.c.created_at, _movements.c.id)
+        )
+        for row in self.db.execute(query.execution_options(yield_per=YIELD_PER)):
+            yield self._emit(dict(row._mapping))
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            "movements": self.movements,
+            "quantity_in": self.quantity_in,
+            "quantity_out": self.quantity_out,
+            "net_change": self.quantity_in - self.quantity_out,
+            "discrepancies": self.discrepancies,
+        }
@@ -0,0 +1,124 @@
+"""
+Conteo de sentencias SQL por request y detección de N+1.
+
+Cada request (o bloque `with count_queries()`) acumula:
+- Número de sentencias ejecutadas
+- Tiempo total en base de datos
+- Repeticiones por "forma" de sentencia (SQL normalizado)
+
+Si una misma forma se repite más de DB_N_PLUS_ONE_THRESHOLD veces dentro de
+la misma request se registra una advertencia: es la firma típica de una
+relación lazy recorrida dentro de un loop.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from .instrumentation import QueryExecution, add_query_observer
+
+logger = logging.getLogger(__name__)
+
+# Repeticiones permitidas de una misma sentencia antes de advertir
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+
+
+@dataclass
+class QueryStats:
+    """Estadísticas de SQL acumuladas en un contexto (normalmente una request)"""
+    label: str = ""
+    count: int = 0
+    total_time: float = 0.0  # Segundos
+    shapes: Counter = field(default_factory=Counter)
+    scope: Optional[Dict[str, Any]] = field(default=None, repr=False)  # Scope ASGI de la request
+
+    @property
+    def total_time_ms(self) -> float:
+        return self.total_time * 1000
+
+    @property
+    def request(self) -> str:
+        """
+        Método y plantilla de la ruta (ej: GET /products/{product_id}).
+        El router completa scope["route"] al resolver la ruta; antes de eso
+        (o fuera de una request) se usa el label.
+        """
+        route = getattr((self.scope or {}).get("route"), "path", None)
+        if route is None:
+            return self.label
+        return f"{self.scope['method']} {route}"
+
+    def most_repeated(self, limit: int = 5) -> list:
+        """Sentencias más repetidas: [(sql, repeticiones), ...]"""
+        return self.shapes.most_common(limit)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalizar una sentencia para agrupar ejecuciones equivalentes.
+    Colapsa espacios y listas IN (?, ?, ...) de largo variable.
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (...)", shape)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Estadísticas del contexto actual o None si no se están contando"""
+    return _current_stats.get()
+
+
+@contextmanager
+def count_queries(label: str = "", scope: Optional[Dict[str, Any]] = None) -> Iterator[QueryStats]:
+    """
+    Contar las sentencias SQL ejecutadas dentro del bloque.
+
+    Uso:
+        with count_queries() as stats:
+            repo.find_all()
+        assert stats.count == 1
+    """
+    stats = QueryStats(label=label, scope=scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _observe_query(execution: QueryExecution) -> None:
+    stats = _current_stats.get()
+    if stats is None:
+        return
+
+    stats.count += 1
+    stats.total_time += execution.elapsed
+
+    shape = statement_shape(execution.statement)
+    stats.shapes[shape] += 1
+
+    # Advertir una sola vez por forma, al cruzar el umbral
+    if stats.shapes[shape] == N_PLUS_ONE_THRESHOLD + 1:
+        logger.warning(
+            f"Posible N+1: sentencia repetida más de {N_PLUS_ONE_THRESHOLD} veces en {stats.request or 'la request'}",
+            extra={
+                "extra_data": {
+                    "action": "n_plus_one_detected",
+                    "request": stats.request,
+                    "statement": shape[:500],
+                    "threshold": N_PLUS_ONE_THRESHOLD,
+                }
+            }
+        )
+
+
+add_query_observer(_observe_query)
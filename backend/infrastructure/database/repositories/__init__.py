@@ -0,0 +1,8 @@
+"""
+Implementaciones SQLAlchemy de los puertos de repositorio (app/application/ports).
+"""
+from .movement_repository import SQLAlchemyMovementRepository
+from .product_repository import SQLAlchemyProductRepository
+from .user_repository import SQLAlchemyUserRepository
+
+__all__ = ['SQLAlchemyProductRepository', 'SQLAlchemyMovementRepository', 'SQLAlchemyUserRepository']
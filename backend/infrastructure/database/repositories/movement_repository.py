@@ -0,0 +1,223 @@
+"""
+Implementación SQLAlchemy del puerto MovementRepository.
+Los movimientos son registros de auditoría: solo se insertan y consultan.
+Las estadísticas por rango leen los acumulados diarios (DailyProductMovement
+por producto, DailyMovementCount global) para los días completos y la tabla
+de movimientos solo para los días incompletos de los extremos.
+Las consultas que llegan a meses archivados incluyen los segmentos del
+archivo histórico (ver movement_archive.py).
+"""
+from datetime import datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.application.ports.movement_repository import MovementRepository
+from app.domain.entities.inventory_movement import InventoryMovement
+from ..models import DailyMovementCount, DailyProductMovement, InventoryMovement as MovementModel
+from .. import movement_rollup, stock_summary  # noqa: F401  (mantienen los acumulados diarios)
+from ..movement_archive import ARCHIVE_DIR, MovementArchive
+
+
+class SQLAlchemyMovementRepository(MovementRepository):
+    """Repositorio de movimientos sobre una sesión SQLAlchemy"""
+
+    def __init__(self, db: Session, archive_dir: Optional[str] = None):
+        self.db = db
+        self.archive = MovementArchive(db, archive_dir or ARCHIVE_DIR)
+
+    @staticmethod
+    def _to_entity(model: MovementModel) -> InventoryMovement:
+        return InventoryMovement(
+            id=model.id,
+            product_id=model.product_id,
+            quantity=model.quantity,
+            movement_type=model.movement_type,
+            reason=model.reason,
+            previous_stock=model.previous_stock,
+            new_stock=model.new_stock,
+            user_id=model.user_id,
+            created_at=model.created_at,
+        )
+
+    def _filtered(
+        self,
+        query,
+        product_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        if product_id is not None:
+            query = query.filter(MovementModel.product_id == product_id)
+        if user_id is not None:
+            query = query.filter(MovementModel.user_id == user_id)
+        if start_date is not None:
+            query = query.filter(MovementModel.created_at >= start_date)
+        if end_date is not None:
+            query = query.filter(MovementModel.created_at <= end_date)
+        return query
+
+    def save(self, movement: InventoryMovement) -> InventoryMovement:
+        model = MovementModel(
+            product_id=movement.product_id,
+            quantity=movement.quantity,
+            movement_type=movement.movement_type,
+            reason=movement.reason,
+            previous_stock=movement.previous_stock,
+            new_stock=movement.new_stock,
+            user_id=movement.user_id,
+            created_at=movement.created_at or datetime.utcnow(),
+        )
+        self.db.add(model)
+        self.db.commit()
+        movement.id = model.id
+        movement.created_at = model.created_at
+        return movement
+
+    def _newest(self, query, skip: int, limit: int, **filters) -> List[InventoryMovement]:
+        """Página del más reciente al más antiguo; se completa con el archivo si la alcanza"""
+        query = query.order_by(MovementModel.created_at.desc(), MovementModel.id.desc())
+        horizon = self.archive.horizon()
+        if horizon is None:
+            return [self._to_entity(model) for model in query.offset(skip).limit(limit).all()]
+
+        wanted = skip + limit
+        movements = [self._to_entity(model) for model in query.limit(wanted).all()]
+        for segment in self.archive.segments():
+            if len(movements) >= wanted and movements[wanted - 1].created_at >= segment.period_end:
+                break
+            movements.extend(InventoryMovement(**row) for row in self.archive.query(segment, limit=wanted, **filters))
+            movements.sort(key=lambda movement: (movement.created_at, movement.id), reverse=True)
+            del movements[wanted:]
+        return movements[skip:]
+
+    def find_by_id(self, movement_id: int) -> Optional[InventoryMovement]:
+        model = self.db.get(MovementModel, movement_id)
+        if model:
+            return self._to_entity(model)
+        archived = self.archive.find(movement_id)
+        return InventoryMovement(**archived) if archived else None
+
+    def find_by_product(self, product_id: int, skip: int = 0, limit: int = 100) -> List[InventoryMovement]:
+        query = self.db.query(MovementModel).filter(MovementModel.product_id == product_id)
+        return self._newest(query, skip, limit, product_id=product_id)
+
+    def find_by_user(self, user_id: int, skip: int = 0, limit: int = 100) -> List[InventoryMovement]:
+        query = self.db.query(MovementModel).filter(MovementModel.user_id == user_id)
+        return self._newest(query, skip, limit, user_id=user_id)
+
+    def find_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        product_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> List[InventoryMovement]:
+        query = self._filtered(self.db.query(MovementModel), product_id, user_id, start_date, end_date)
+        movements = [self._to_entity(model) for model in query.order_by(MovementModel.created_at.desc()).all()]
+        if self._reaches_archive(start_date):
+            for segment in self.archive.segments(start_date, end_date):
+                movements.extend(InventoryMovement(**row) for row in self.archive.query(
+                    segment, product_id=product_id, user_id=user_id, start_date=start_date, end_date=end_date
+                ))
+            movements.sort(key=lambda movement: (movement.created_at, movement.id), reverse=True)
+        return movements
+
+    def count_movements(
+        self,
+        product_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        query = self._filtered(self.db.query(func.count(MovementModel.id)), product_id, user_id, start_date, end_date)
+        count = query.scalar() or 0
+        if self._reaches_archive(start_date):
+            count += self.archive.totals(
+                product_id=product_id, user_id=user_id, start_date=start_date, end_date=end_date
+            )[0]
+        return count
+
+    def _reaches_archive(self, start_date: Optional[datetime]) -> bool:
+        horizon = self.archive.horizon()
+        return horizon is not None and (start_date is None or start_date < horizon)
+
+    def _raw_totals(
+        self,
+        product_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        before: Optional[datetime] = None
+    ) -> Tuple[int, int, int, int]:
+        """(movimientos, entradas, cantidad que entró, cantidad que salió) desde los movimientos y el archivo"""
+        is_in = MovementModel.movement_type == "IN"
+        query = self._filtered(self.db.query(
+            func.count(MovementModel.id),
+            func.sum(case((is_in, 1), else_=0)),
+            func.sum(case((is_in, MovementModel.quantity), else_=0)),
+            func.sum(case((is_in, 0), else_=MovementModel.quantity)),
+        ), product_id=product_id, start_date=start_date, end_date=end_date)
+        if before is not None:
+            query = query.filter(MovementModel.created_at < before)
+        totals = tuple(int(value or 0) for value in query.one())
+        if self._reaches_archive(start_date):
+            archived = self.archive.totals(product_id=product_id, start_date=start_date, end_date=end_date, before=before)
+            totals = tuple(value + extra for value, extra in zip(totals, archived))
+        return totals
+
+    def _rollup_totals(self, product_id: Optional[int], first_day, last_day) -> Tuple[int, int, int, int]:
+        """
+        Los mismos totales para los días [first_day, last_day]: del acumulado
+        por producto, o del acumulado global por día si no se filtra producto
+        """
+        rollup = DailyProductMovement if product_id is not None else DailyMovementCount
+        query = self.db.query(
+            func.sum(rollup.in_count + rollup.out_count),
+            func.sum(rollup.in_count),
+            func.sum(rollup.in_quantity),
+            func.sum(rollup.out_quantity),
+        )
+        if product_id is not None:
+            query = query.filter(DailyProductMovement.product_id == product_id)
+        if first_day is not None:
+            query = query.filter(rollup.day >= first_day)
+        if last_day is not None:
+            query = query.filter(rollup.day <= last_day)
+        return tuple(int(value or 0) for value in query.one())
+
+    def get_movement_stats(
+        self,
+        product_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> dict:
+        if start_date is not None and end_date is not None and start_date.date() >= end_date.date():
+            parts = [self._raw_totals(product_id, start_date, end_date)]
+        else:
+            parts = []
+            first_day = last_day = None
+            if start_date is not None:
+                first_day = start_date.date()
+                if start_date.time() != time.min:
+                    # Día inicial incompleto
+                    first_day += timedelta(days=1)
+                    parts.append(self._raw_totals(
+                        product_id, start_date, None, before=datetime.combine(first_day, time.min)
+                    ))
+            if end_date is not None:
+                # Día final (el límite es inclusivo): siempre desde los movimientos
+                last_day = end_date.date() - timedelta(days=1)
+                parts.append(self._raw_totals(product_id, datetime.combine(end_date.date(), time.min), end_date))
+            parts.append(self._rollup_totals(product_id, first_day, last_day))
+
+        total, total_in, quantity_in, quantity_out = (sum(values) for values in zip(*parts))
+        return {
+            "total_movements": total,
+            "total_in": total_in,
+            "total_out": total - total_in,
+            "quantity_in": quantity_in,
+            "quantity_out": quantity_out,
+            "net_change": quantity_in - quantity_out,
+        }
@@ -0,0 +1,144 @@
+"""
+Implementación SQLAlchemy del puerto ProductRepository.
+Traduce entre el modelo de persistencia y la entidad de dominio Product.
+"""
+from typing import List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.application.ports.product_repository import ProductRepository
+from app.domain.entities.product import Product
+from ..models import Product as ProductModel
+from ..stock_summary import HIGH_STOCK_THRESHOLD, PRODUCT_COUNTERS, read_stock_summary
+
+
+class SQLAlchemyProductRepository(ProductRepository):
+    """Repositorio de productos sobre una sesión SQLAlchemy"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== MAPEO ====================
+
+    @staticmethod
+    def _to_entity(model: ProductModel) -> Product:
+        return Product(
+            id=model.id,
+            code=model.code,
+            name=model.name,
+            description=model.description,
+            current_stock=model.current_stock,
+            min_stock=model.min_stock,
+            max_stock=model.max_stock,
+            unit=model.unit,
+            created_at=model.created_at,
+            updated_at=model.updated_at,
+        )
+
+    @staticmethod
+    def _apply(model: ProductModel, product: Product) -> None:
+        model.code = product.code
+        model.name = product.name
+        model.description = product.description
+        model.current_stock = product.current_stock
+        model.min_stock = product.min_stock
+        model.max_stock = product.max_stock
+        model.unit = product.unit
+        if product.updated_at:
+            model.updated_at = product.updated_at
+
+    # ==================== ESCRITURA ====================
+
+    def save(self, product: Product) -> Product:
+        model = self.db.get(ProductModel, product.id) if product.id else None
+        if model is None:
+            model = ProductModel()
+            self.db.add(model)
+        self._apply(model, product)
+        self.db.commit()
+        self.db.refresh(model)
+        product.id = model.id
+        product.created_at = model.created_at
+        product.updated_at = model.updated_at
+        return product
+
+    def delete(self, product_id: int) -> bool:
+        model = self.db.get(ProductModel, product_id)
+        if model is None:
+            return False
+        self.db.delete(model)
+        self.db.commit()
+        return True
+
+    # ==================== CONSULTAS ====================
+
+    def find_by_id(self, product_id: int) -> Optional[Product]:
+        model = self.db.get(ProductModel, product_id)
+        return self._to_entity(model) if model else None
+
+    def find_by_id_with_lock(self, product_id: int) -> Optional[Product]:
+        # SQLite ignora FOR UPDATE; en PostgreSQL bloquea la fila hasta el commit
+        model = (
+            self.db.query(ProductModel)
+            .filter(ProductModel.id == product_id)
+            .with_for_update()
+            .first()
+        )
+        return self._to_entity(model) if model else None
+
+    def find_by_code(self, code: str) -> Optional[Product]:
+        model = self.db.query(ProductModel).filter(ProductModel.code == code).first()
+        return self._to_entity(model) if model else None
+
+    def find_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        min_stock: Optional[int] = None,
+        max_stock: Optional[int] = None,
+        search: Optional[str] = None
+    ) -> List[Product]:
+        query = self.db.query(ProductModel)
+        if min_stock is not None:
+            query = query.filter(ProductModel.current_stock >= min_stock)
+        if max_stock is not None:
+            query = query.filter(ProductModel.current_stock <= max_stock)
+        if search:
+            pattern = f"%{search}%"
+            query = query.filter(or_(ProductModel.code.ilike(pattern), ProductModel.name.ilike(pattern)))
+        models = query.order_by(ProductModel.id).offset(skip).limit(limit).all()
+        return [self._to_entity(model) for model in models]
+
+    def count(self) -> int:
+        return read_stock_summary(self.db)["total_products"]
+
+    def get_low_stock_products(self, threshold_percentage: float = 0.3) -> List[Product]:
+        # Bajo el mínimo o por debajo del umbral respecto al máximo
+        models = (
+            self.db.query(ProductModel)
+            .filter(or_(
+                ProductModel.current_stock < ProductModel.min_stock,
+                ProductModel.current_stock < ProductModel.max_stock * threshold_percentage
+            ))
+            .order_by(ProductModel.current_stock)
+            .all()
+        )
+        return [self._to_entity(model) for model in models]
+
+    def get_high_stock_products(self, threshold_percentage: float = 0.9) -> List[Product]:
+        if threshold_percentage == HIGH_STOCK_THRESHOLD and not read_stock_summary(self.db)["high_stock_count"]:
+            return []
+        models = (
+            self.db.query(ProductModel)
+            .filter(ProductModel.max_stock > 0)
+            .filter(ProductModel.current_stock >= ProductModel.max_stock * threshold_percentage)
+            .order_by(ProductModel.current_stock.desc())
+            .all()
+        )
+        return [self._to_entity(model) for model in models]
+
+    def get_stock_summary(self) -> dict:
+        # Resumen materializado: lectura por clave primaria (ver stock_summary.py)
+        summary = read_stock_summary(self.db)
+        return {key: int(summary[key]) for key in PRODUCT_COUNTERS}
@@ -0,0 +1,96 @@
+"""
+Implementación SQLAlchemy del puerto UserRepository.
+Los roles se guardan con el Enum de persistencia y se exponen con el del dominio.
+"""
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.application.ports.user_repository import UserRepository
+from app.domain.entities.user import User, UserRole
+from ..models import User as UserModel, UserRole as UserRoleModel
+
+
+class SQLAlchemyUserRepository(UserRepository):
+    """Repositorio de usuarios sobre una sesión SQLAlchemy"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def _to_entity(model: UserModel) -> User:
+        return User(
+            id=model.id,
+            username=model.username,
+            email=model.email,
+            hashed_password=model.hashed_password,
+            full_name=model.full_name,
+            role=UserRole(model.role.value),
+            is_active=model.is_active,
+            created_at=model.created_at,
+            updated_at=model.updated_at,
+        )
+
+    def save(self, user: User) -> User:
+        model = self.db.get(UserModel, user.id) if user.id else None
+        if model is None:
+            model = UserModel()
+            self.db.add(model)
+        model.username = user.username
+        model.email = user.email
+        model.hashed_password = user.hashed_password
+        model.full_name = user.full_name
+        model.role = UserRoleModel(UserRole(user.role).value)
+        model.is_active = user.is_active
+        if user.updated_at:
+            model.updated_at = user.updated_at
+        self.db.commit()
+        self.db.refresh(model)
+        user.id = model.id
+        user.created_at = model.created_at
+        user.updated_at = model.updated_at
+        return user
+
+    def find_by_id(self, user_id: int) -> Optional[User]:
+        model = self.db.get(UserModel, user_id)
+        return self._to_entity(model) if model else None
+
+    def find_by_username(self, username: str) -> Optional[User]:
+        model = self.db.query(UserModel).filter(UserModel.username == username).first()
+        return self._to_entity(model) if model else None
+
+    def find_by_email(self, email: str) -> Optional[User]:
+        model = self.db.query(UserModel).filter(UserModel.email == email).first()
+        return self._to_entity(model) if model else None
+
+    def find_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        is_active: Optional[bool] = None,
+        role: Optional[str] = None
+    ) -> List[User]:
+        query = self.db.query(UserModel)
+        if is_active is not None:
+            query = query.filter(UserModel.is_active == is_active)
+        if role:
+            query = query.filter(UserModel.role == UserRoleModel(UserRole.from_string(role).value))
+        models = query.order_by(UserModel.id).offset(skip).limit(limit).all()
+        return [self._to_entity(model) for model in models]
+
+    def authenticate(self, username: str, password_verifier) -> Optional[User]:
+        """password_verifier recibe el hash guardado y devuelve si la contraseña coincide"""
+        user = self.find_by_username(username)
+        if user is None or not user.is_active or not password_verifier(user.hashed_password):
+            return None
+        return user
+
+    def exists_by_username(self, username: str) -> bool:
+        return self.db.query(UserModel.id).filter(UserModel.username == username).first() is not None
+
+    def exists_by_email(self, email: str) -> bool:
+        return self.db.query(UserModel.id).filter(UserModel.email == email).first() is not None
+
+    def count(self) -> int:
+        return self.db.query(func.count(UserModel.id)).scalar() or 0
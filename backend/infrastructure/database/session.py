@@ -7,11 +7,19 @@ Responsabilidades:
 - Configurar session factory
 - Proveer dependencia para FastAPI
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Generator, List, Optional
 import os
 
+from .instrumentation import install_query_instrumentation
+from . import stock_summary  # Mantiene el resumen materializado en cada flush (y crea su fila)
+from . import movement_rollup  # noqa: F401  (mantiene el acumulado diario por producto)
+from . import event_stream  # noqa: F401  (registra los eventos de stock en cada flush)
+from . import event_dispatcher  # noqa: F401  (despierta al despachador al confirmar eventos)
+from . import delta_sync  # noqa: F401  (registra los cambios para GET /sync)
+
 # Configuración de base de datos
 # En producción, usar variable de entorno DATABASE_URL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database/scis.db")
@@ -28,6 +36,9 @@ engine = create_engine(
     pool_recycle=3600,  # Reciclar conexiones cada hora
 )
 
+# Medir cada sentencia SQL (métricas, trazas, logs de queries lentas)
+install_query_instrumentation(engine)
+
 # Factory para crear sesiones
 SessionLocal = sessionmaker(
     autocommit=False,  
@@ -69,12 +80,45 @@ def create_tables():
     
     Nota: En producción usar migraciones (Alembic).
     """
+    print("Creando tablas en la base de datos...")
+    upgrade_schema()
+    print(" Tablas creadas exitosamente")
+
+def upgrade_schema(bind: Optional[Engine] = None) -> List[str]:
+    """
+    Llevar una base existente al esquema actual (idempotente; se ejecuta al
+    iniciar la app). Los listeners de flush importados arriba escriben en
+    tablas que una base anterior no tiene, así que antes de servir requests:
+    - Crea las tablas que faltan y los índices nuevos de tablas existentes
+      (create_all no agrega índices a una tabla que ya existe)
+    - Crea la fila de stock_summary (y daily_movement_counts)
+    - Carga product_daily_movements desde inventory_movements si se acaba
+      de crear (incluye ix_inventory_movements_product_created)
+    - Crea el flujo inicial de stock_events si se acaba de crear
+      (sync_changes empieza vacía: los clientes hacen una sincronización completa)
+    
+    Returns:
+        List[str]: Tablas creadas
+    """
     from .base import Base
     from . import models  # Importar todos los modelos
     
-    print("Creando tablas en la base de datos...")
-    Base.metadata.create_all(bind=engine)
-    print(" Tablas creadas exitosamente")
+    bind = bind or engine
+    existing = set(inspect(bind).get_table_names())
+    created = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(bind=bind, checkfirst=True)
+    
+    with bind.begin() as connection:
+        stock_summary.ensure_stock_summary(connection)
+    if existing and models.DailyProductMovement.__tablename__ in created:
+        movement_rollup.backfill_movement_rollup(bind)
+    if existing and models.StockEvent.__tablename__ in created:
+        event_stream.backfill_event_stream(bind)
+    return created
     
 def drop_tables():
     """
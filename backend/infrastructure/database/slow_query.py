@@ -0,0 +1,143 @@
+"""
+Registro de queries lentas.
+
+Alternativa a DATABASE_ECHO para producción: solo se registran las sentencias
+que superan SLOW_QUERY_THRESHOLD_MS, en JSON (StructuredFormatter), con:
+- Parámetros redactados (se conserva el tipo y la forma, no el valor)
+- La ruta que originó la query (método y plantilla, como en las métricas)
+- Opcionalmente el plan de ejecución (EXPLAIN QUERY PLAN en SQLite)
+
+Configuración (variables de entorno):
+- SLOW_QUERY_THRESHOLD_MS: umbral en milisegundos (default 200, 0 = desactivado)
+- SLOW_QUERY_EXPLAIN: true para adjuntar el plan de ejecución
+"""
+import logging
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional
+
+from .instrumentation import QueryExecution, add_query_observer
+from .query_counter import current_query_stats
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+
+logger = logging.getLogger("slow_query")
+
+# Tipos cuyo valor no es sensible y ayuda a entender el plan
+_SAFE_TYPES = (bool, int, float, Decimal, datetime, date, type(None))
+
+
+def redact_value(value: Any) -> Any:
+    """
+    Redactar un parámetro conservando su forma.
+    Los textos se reemplazan por su longitud, manteniendo comodines de LIKE
+    (un '%' inicial impide usar índices y es justo lo que se quiere ver).
+    """
+    if isinstance(value, _SAFE_TYPES):
+        return value
+    if isinstance(value, str):
+        prefix = "%" if value.startswith("%") else ""
+        suffix = "%" if value.endswith("%") and len(value) > 1 else ""
+        inner = len(value) - len(prefix) - len(suffix)
+        return f"{prefix}<str:{inner}>{suffix}"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any, executemany: bool = False) -> Any:
+    """Redactar parámetros posicionales, nombrados o de executemany"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return {
+            "batch_size": len(parameters),
+            "first": redact_parameters(parameters[0]) if parameters else None,
+        }
+    if isinstance(parameters, dict):
+        return {key: redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_value(value) for value in parameters]
+    return redact_value(parameters)
+
+
+def explain_query(execution: QueryExecution) -> Optional[List[str]]:
+    """
+    Obtener el plan de ejecución de un SELECT.
+
+    Se ejecuta en un cursor aparte sobre la misma conexión DBAPI para no
+    interferir con el cursor original, cuyos resultados aún no se leyeron.
+    """
+    if execution.executemany or not execution.statement.lstrip().upper().startswith("SELECT"):
+        return None
+
+    dialect = execution.connection.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    try:
+        cursor = execution.connection.connection.cursor()
+        try:
+            cursor.execute(prefix + execution.statement, execution.parameters)
+            return [" | ".join(str(column) for column in row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"EXPLAIN no disponible: {e}"]
+
+
+class SlowQueryLogger:
+    """Observador de sentencias que registra las que superan el umbral"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS, explain: bool = SLOW_QUERY_EXPLAIN):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+
+    def __call__(self, execution: QueryExecution) -> None:
+        elapsed_ms = execution.elapsed * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        stats = current_query_stats()
+        slow_query_info = {
+            "action": "slow_query",
+            "duration_ms": round(elapsed_ms, 2),
+            "threshold_ms": self.threshold_ms,
+            "statement": " ".join(execution.statement.split())[:2000],
+            "parameters": redact_parameters(execution.parameters, execution.executemany),
+            "request": stats.request if stats else None,
+        }
+        if self.explain:
+            slow_query_info["query_plan"] = explain_query(execution)
+
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f} ms)",
+            extra={"extra_data": slow_query_info}
+        )
+
+
+def install_slow_query_log(
+    threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+    explain: bool = SLOW_QUERY_EXPLAIN
+) -> Optional[SlowQueryLogger]:
+    """
+    Activar el registro de queries lentas.
+
+    Si setup_logging() no configuró el logger "slow_query", se agrega un
+    handler a stderr con StructuredFormatter para que la salida siga en JSON.
+
+    Returns:
+        SlowQueryLogger registrado o None si el umbral es 0
+    """
+    if threshold_ms <= 0:
+        return None
+
+    if not logger.handlers and not logging.getLogger().handlers:
+        from ..logging.structured_logger import StructuredFormatter
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(StructuredFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+    slow_query_logger = SlowQueryLogger(threshold_ms, explain)
+    add_query_observer(slow_query_logger)
+    return slow_query_logger
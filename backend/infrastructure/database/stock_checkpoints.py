@@ -0,0 +1,172 @@
+"""
+Stock de cada producto en un instante ("stock al 31 de enero").
+
+stock_as_of() parte de la base más cercana al instante pedido y aplica
+solo los movimientos entre ambos:
+- Un punto de control anterior (StockCheckpoint): base + movimientos posteriores
+- Un punto de control posterior: base - movimientos intermedios
+- El stock actual de products: current_stock - movimientos posteriores
+
+Así el costo es O(productos + movimientos desde la base) en vez de recorrer
+toda la historia. Los movimientos archivados (movement_archive.py) se leen
+de sus segmentos cuando el rango llega al archivo.
+
+El instante es inclusivo: incluye los movimientos con created_at <= timestamp.
+Los productos creados después del instante no se incluyen.
+
+Uso:
+    from infrastructure.database.stock_checkpoints import stock_as_of, write_checkpoint
+
+    result = stock_as_of(db, datetime(2025, 2, 1))
+    result.stocks[product_id]
+
+    write_checkpoint(db)  # scripts/write_checkpoints.py (cron)
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .models import InventoryMovement, Product, StockCheckpoint
+from .movement_archive import ARCHIVE_DIR, MovementArchive
+
+# Productos por consulta IN al aplicar bases parciales
+_CHUNK = 5000
+
+_movements = InventoryMovement.__table__
+_products = Product.__table__
+_checkpoints = StockCheckpoint.__table__
+
+
+@dataclass
+class StockAsOf:
+    """Resultado de stock_as_of"""
+    timestamp: datetime
+    baseline: str                       # "checkpoint" o "current"
+    baseline_at: Optional[datetime]     # taken_at del punto de control (None para el stock actual)
+    stocks: Dict[int, int] = field(default_factory=dict)
+    movements_applied: int = 0
+
+
+def _net_changes(
+    db: Session,
+    archive: MovementArchive,
+    after: datetime,
+    until: Optional[datetime],
+    product_ids: Optional[List[int]] = None
+) -> Tuple[Dict[int, int], int]:
+    """Cambio neto por producto de los movimientos con after < created_at <= until"""
+    signed = case((_movements.c.movement_type == "IN", _movements.c.quantity), else_=-_movements.c.quantity)
+    query = (
+        select(_movements.c.product_id, func.sum(signed), func.count())
+        .where(_movements.c.created_at > after)
+        .group_by(_movements.c.product_id)
+    )
+    if until is not None:
+        query = query.where(_movements.c.created_at <= until)
+
+    net: Dict[int, int] = {}
+    count = 0
+    chunks: Iterable[Optional[List[int]]] = (
+        [product_ids[i:i + _CHUNK] for i in range(0, len(product_ids), _CHUNK)] if product_ids is not None else [None]
+    )
+    for chunk in chunks:
+        chunk_query = query if chunk is None else query.where(_movements.c.product_id.in_(chunk))
+        for product_id, change, movements in db.execute(chunk_query):
+            net[product_id] = change
+            count += movements
+
+    horizon = archive.horizon()
+    if horizon is not None and after < horizon:
+        single = product_ids[0] if product_ids is not None and len(product_ids) == 1 else None
+        wanted = set(product_ids) if product_ids is not None else None
+        for product_id, (change, movements) in archive.net_by_product(
+            product_id=single, after=after, end_date=until
+        ).items():
+            if wanted is None or product_id in wanted:
+                net[product_id] = net.get(product_id, 0) + change
+                count += movements
+    return net, count
+
+
+def _checkpoint_stocks(db: Session, taken_at: datetime, product_id: Optional[int]) -> Dict[int, int]:
+    query = select(_checkpoints.c.product_id, _checkpoints.c.stock).where(_checkpoints.c.taken_at == taken_at)
+    if product_id is not None:
+        query = query.where(_checkpoints.c.product_id == product_id)
+    return dict(db.execute(query).all())
+
+
+def stock_as_of(
+    db: Session,
+    timestamp: datetime,
+    product_id: Optional[int] = None,
+    archive_dir: str = ARCHIVE_DIR
+) -> StockAsOf:
+    """
+    Stock de todos los productos (o de uno) al instante `timestamp` (UTC).
+
+    Args:
+        db: Sesión de base de datos
+        timestamp: Instante consultado (inclusivo)
+        product_id: Limitar a un producto
+        archive_dir: Directorio del archivo histórico
+    """
+    archive = MovementArchive(db, archive_dir)
+    now = datetime.utcnow()
+
+    products_query = select(_products.c.id, _products.c.current_stock).where(_products.c.created_at <= timestamp)
+    if product_id is not None:
+        products_query = products_query.where(_products.c.id == product_id)
+    current = dict(db.execute(products_query).all())
+
+    previous = db.execute(select(func.max(_checkpoints.c.taken_at)).where(_checkpoints.c.taken_at <= timestamp)).scalar()
+    following = db.execute(select(func.min(_checkpoints.c.taken_at)).where(_checkpoints.c.taken_at >= timestamp)).scalar()
+    # La base más cercana en el tiempo (proxy de la cantidad de movimientos a aplicar)
+    candidates = [(max(now - timestamp, timedelta(0)), "current", None)]
+    if previous is not None:
+        candidates.append((timestamp - previous, "previous", previous))
+    if following is not None:
+        candidates.append((following - timestamp, "following", following))
+    _, kind, taken_at = min(candidates, key=lambda candidate: candidate[0])
+
+    result = StockAsOf(timestamp=timestamp, baseline="current" if kind == "current" else "checkpoint",
+                       baseline_at=taken_at)
+    single = [product_id] if product_id is not None else None
+    if kind == "previous":
+        base = _checkpoint_stocks(db, taken_at, product_id)
+        net, result.movements_applied = _net_changes(db, archive, taken_at, timestamp, single)
+        result.stocks = {pid: base[pid] + net.get(pid, 0) for pid in current if pid in base}
+    elif kind == "following":
+        base = _checkpoint_stocks(db, taken_at, product_id)
+        net, result.movements_applied = _net_changes(db, archive, timestamp, taken_at, single)
+        result.stocks = {pid: base[pid] - net.get(pid, 0) for pid in current if pid in base}
+    missing = [pid for pid in current if pid not in result.stocks]
+
+    if missing:
+        # Sin punto de control (productos creados después de él, o sin puntos de control): desde el stock actual
+        partial = len(missing) < len(current) or product_id is not None
+        net, applied = _net_changes(db, archive, timestamp, None, missing if partial else None)
+        result.movements_applied += applied
+        result.stocks.update({pid: current[pid] - net.get(pid, 0) for pid in missing})
+    result.stocks = dict(sorted(result.stocks.items()))
+    return result
+
+
+def write_checkpoint(db: Session, taken_at: Optional[datetime] = None, archive_dir: str = ARCHIVE_DIR) -> int:
+    """
+    Guardar el stock de todos los productos al instante `taken_at` (default:
+    ahora). Reemplaza un punto de control existente en el mismo instante.
+
+    Returns:
+        int: Productos guardados
+    """
+    taken_at = taken_at or datetime.utcnow()
+    stocks = stock_as_of(db, taken_at, archive_dir=archive_dir).stocks
+    db.execute(delete(_checkpoints).where(_checkpoints.c.taken_at == taken_at))
+    rows = [{"taken_at": taken_at, "product_id": pid, "stock": stock} for pid, stock in stocks.items()]
+    for offset in range(0, len(rows), _CHUNK):
+        db.execute(insert(_checkpoints), rows[offset:offset + _CHUNK])
+    db.commit()
+    return len(rows)
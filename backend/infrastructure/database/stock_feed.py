@@ -0,0 +1,206 @@
+"""
+Difusión en tiempo real de los cambios de stock (GET /inventory/stream, SSE).
+
+Es un suscriptor local del despachador de eventos (event_dispatcher.py):
+cada lote de eventos se traduce una sola vez a mensajes SSE ya
+serializados y se pasa al event loop con un único call_soon_threadsafe;
+ahí se reparte a las colas de los clientes conectados según su filtro.
+
+Mensajes:
+- stock: stock nuevo de un producto (alta, movimiento o eliminación)
+- movement: movimiento registrado
+- low_stock: el producto cruza su stock mínimo (below=true al quedar por
+  debajo, below=false al recuperarse)
+- resync: el cliente no consumió a tiempo y se descartaron mensajes; debe
+  volver a pedir el estado (GET /products/) antes de seguir
+
+Cada cliente tiene una cola acotada (STOCK_STREAM_CLIENT_QUEUE): un cliente
+lento no retiene memoria ni frena a los demás, solo pierde sus mensajes
+pendientes y recibe resync.
+
+Configuración (variables de entorno):
+- STOCK_STREAM_CLIENT_QUEUE: mensajes pendientes por cliente (default 256)
+- STOCK_STREAM_MAX_CLIENTS: conexiones simultáneas por worker (default 1000)
+- STOCK_STREAM_HEARTBEAT_SECONDS: comentario SSE para mantener viva la conexión (default 15)
+"""
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .event_dispatcher import event_dispatcher
+from .event_stream import PRODUCT_REMOVED, STOCK_MOVEMENT_APPLIED
+from .models import Product
+
+STOCK_STREAM_CLIENT_QUEUE = int(os.getenv("STOCK_STREAM_CLIENT_QUEUE", "256"))
+STOCK_STREAM_MAX_CLIENTS = int(os.getenv("STOCK_STREAM_MAX_CLIENTS", "1000"))
+STOCK_STREAM_HEARTBEAT_SECONDS = float(os.getenv("STOCK_STREAM_HEARTBEAT_SECONDS", "15"))
+
+MESSAGE_TYPES = frozenset({"stock", "movement", "low_stock"})
+
+_products = Product.__table__
+
+# (tipo, product_id, texto SSE)
+Message = Tuple[str, Optional[int], str]
+
+
+class StockFeedFull(Exception):
+    """Se alcanzó STOCK_STREAM_MAX_CLIENTS"""
+
+
+def _sse(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def build_messages(events: List[Dict[str, Any]], minimums: Dict[int, Optional[int]]) -> List[Message]:
+    """Traducir un lote de stock_events a mensajes SSE (minimums: stock mínimo por producto)"""
+    messages: List[Message] = []
+    for item in events:
+        product_id, seq = item["product_id"], item["seq"]
+        removed = item["event_type"] == PRODUCT_REMOVED
+        stock = 0 if removed else item["new_stock"]
+        messages.append(("stock", product_id, _sse("stock", {
+            "product_id": product_id, "stock": stock, "version": item["version"], "removed": removed,
+        }, seq)))
+        if item["event_type"] != STOCK_MOVEMENT_APPLIED:
+            continue
+        messages.append(("movement", product_id, _sse("movement", {
+            "movement_id": item["movement_id"], "product_id": product_id,
+            "movement_type": "IN" if item["delta"] > 0 else "OUT", "quantity": abs(item["delta"]),
+            "previous_stock": item["old_stock"], "new_stock": item["new_stock"],
+            "user_id": item["user_id"], "occurred_at": item["occurred_at"].isoformat(),
+        }, seq)))
+        minimum = minimums.get(product_id)
+        if minimum is None or item["old_stock"] is None or item["new_stock"] is None:
+            continue
+        was_below, below = item["old_stock"] < minimum, item["new_stock"] < minimum
+        if was_below != below:
+            messages.append(("low_stock", product_id, _sse("low_stock", {
+                "product_id": product_id, "stock": item["new_stock"], "min_stock": minimum, "below": below,
+            }, seq)))
+    return messages
+
+
+@dataclass(eq=False)
+class FeedClient:
+    """Conexión SSE: filtro y cola acotada de mensajes pendientes"""
+    product_ids: Optional[FrozenSet[int]] = None
+    types: FrozenSet[str] = MESSAGE_TYPES
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=STOCK_STREAM_CLIENT_QUEUE))
+    sent: int = 0
+    dropped: int = 0
+
+    def wants(self, message_type: str, product_id: Optional[int]) -> bool:
+        return message_type in self.types and (self.product_ids is None or product_id in self.product_ids)
+
+    def offer(self, text: str) -> None:
+        """Encolar sin esperar; si la cola está llena se descarta lo pendiente y se pide resync"""
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_sse("resync", {"dropped": self.dropped}))
+
+
+class StockFeed:
+    """
+    Clientes conectados de un worker.
+
+    Uso (dentro del loop, por ejemplo en el lifespan de la app):
+        stock_feed.start()
+        client = stock_feed.connect(product_ids={1, 2})
+        ...
+        stock_feed.disconnect(client)
+    """
+
+    def __init__(self, max_clients: int = STOCK_STREAM_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.clients: "set[FeedClient]" = set()
+        self.published = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Asociar el feed al event loop en curso"""
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self) -> None:
+        self._loop = None
+        for client in list(self.clients):
+            client.offer(_sse("close", {}))
+        self.clients.clear()
+
+    def connect(
+        self,
+        product_ids: Optional[FrozenSet[int]] = None,
+        types: FrozenSet[str] = MESSAGE_TYPES
+    ) -> FeedClient:
+        if len(self.clients) >= self.max_clients:
+            raise StockFeedFull(f"Máximo de {self.max_clients} conexiones alcanzado")
+        client = FeedClient(product_ids=product_ids, types=types)
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: FeedClient) -> None:
+        self.clients.discard(client)
+
+    def publish(self, events: List[Dict[str, Any]], db: Session) -> None:
+        """Handler del despachador (su hilo): preparar los mensajes y pasarlos al loop"""
+        loop = self._loop
+        if loop is None or not self.clients:
+            return
+        product_ids = {item["product_id"] for item in events if item["event_type"] == STOCK_MOVEMENT_APPLIED}
+        minimums = dict(db.execute(
+            select(_products.c.id, _products.c.min_stock).where(_products.c.id.in_(product_ids))
+        ).all()) if product_ids else {}
+        messages = build_messages(events, minimums)
+        try:
+            loop.call_soon_threadsafe(self._fan_out, messages)
+        except RuntimeError:
+            # Loop cerrado durante el apagado
+            self._loop = None
+
+    def _fan_out(self, messages: List[Message]) -> None:
+        self.published += len(messages)
+        for client in self.clients:
+            for message_type, product_id, text in messages:
+                if client.wants(message_type, product_id):
+                    client.offer(text)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "max_clients": self.max_clients,
+            "published": self.published,
+            "dropped": sum(client.dropped for client in self.clients),
+        }
+
+
+stock_feed = StockFeed()
+event_dispatcher.subscribe("stock_feed", stock_feed.publish, durable=False)
+
+
+async def sse_stream(client: FeedClient, is_disconnected, heartbeat: float = STOCK_STREAM_HEARTBEAT_SECONDS):
+    """Generador de la respuesta SSE de un cliente (se desconecta al terminar)"""
+    try:
+        yield ": conectado\n\n"
+        while True:
+            try:
+                text = await asyncio.wait_for(client.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield text
+            client.sent += 1
+            if text.startswith("event: close"):
+                break
+    finally:
+        stock_feed.disconnect(client)
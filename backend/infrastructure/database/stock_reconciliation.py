@@ -0,0 +1,306 @@
+"""
+Conciliación de products.current_stock con la cadena de movimientos.
+
+current_stock es un valor desnormalizado que escriben caminos distintos
+(main.py y los casos de uso) y que puede editarse a mano. Para cada
+producto se verifica:
+- chain_break: el previous_stock de un movimiento no continúa el new_stock
+  del anterior (el primero continúa el saldo de product_opening_balances
+  si el producto tiene movimientos archivados)
+- arithmetic: new_stock != previous_stock ± quantity
+- stock_mismatch: current_stock distinto del stock esperado, que es el saldo
+  inicial (archivo o previous_stock del primer movimiento) más la suma de
+  las cantidades de todos sus movimientos
+
+Cada rango de ids de productos se verifica con una sola query con funciones
+de ventana (LAG / ROW_NUMBER / SUM OVER) sobre el índice
+(product_id, created_at); Python solo recibe la primera fila de cada
+producto y las filas con problemas. Los rangos se reparten entre procesos
+y el avance se guarda en un archivo de estado (JSON) después de cada rango,
+así que una corrida interrumpida continúa donde quedó.
+
+Con repair=True el proceso principal corrige current_stock de los
+stock_mismatch (solo si no cambió desde la lectura) y al final recalcula
+stock_summary. Los movimientos no se modifican: las filas con chain_break o
+arithmetic solo se reportan.
+
+Configuración (variables de entorno):
+- RECONCILE_WORKERS: procesos en paralelo (default: CPUs disponibles)
+- RECONCILE_STATE_PATH: archivo de estado para reanudar (default database/reconcile_state.json)
+
+Uso:
+    python scripts/reconcile_stock.py --workers 8 --repair
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, case, create_engine, func, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from .delta_sync import PRODUCT, UPSERT, record_changes
+from .models import InventoryMovement, Product, ProductOpeningBalance
+
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "0")) or os.cpu_count() or 1
+RECONCILE_STATE_PATH = os.getenv("RECONCILE_STATE_PATH", "database/reconcile_state.json")
+
+# Ancho (en ids de productos) de cada rango asignado a un proceso
+BATCH_PRODUCTS = 2000
+
+_movements = InventoryMovement.__table__
+_products = Product.__table__
+_balances = ProductOpeningBalance.__table__
+
+
+@dataclass
+class RangeResult:
+    """Resultado de conciliar los productos con first_id <= id <= last_id"""
+    first_id: int
+    last_id: int
+    products: int = 0
+    movements: int = 0
+    discrepancies: List[Dict[str, Any]] = field(default_factory=list)
+    repaired: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ReconcileReport:
+    """Resultado de una corrida completa (incluye los rangos de corridas anteriores reanudadas)"""
+    ranges: int = 0
+    resumed_ranges: int = 0
+    products: int = 0
+    movements: int = 0
+    discrepancies: Dict[str, int] = field(default_factory=dict)
+    repaired: int = 0
+    seconds: float = 0.0
+    details: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add(self, result: RangeResult) -> None:
+        self.ranges += 1
+        self.products += result.products
+        self.movements += result.movements
+        self.repaired += result.repaired
+        for discrepancy in result.discrepancies:
+            kind = discrepancy["kind"]
+            self.discrepancies[kind] = self.discrepancies.get(kind, 0) + 1
+        self.details.extend(result.discrepancies)
+
+    def to_dict(self, details: bool = False) -> Dict[str, Any]:
+        data = asdict(self)
+        if not details:
+            del data["details"]
+        return data
+
+
+# ==================== VERIFICACIÓN DE UN RANGO ====================
+
+def _chain_query(first_id: int, last_id: int) -> select:
+    """Primera fila de cada producto y filas con problemas, con los totales por producto"""
+    window = {
+        "partition_by": _movements.c.product_id,
+        "order_by": (_movements.c.created_at, _movements.c.id),
+    }
+    signed = case((_movements.c.movement_type == "IN", _movements.c.quantity), else_=-_movements.c.quantity)
+    chain = select(
+        _movements.c.id,
+        _movements.c.product_id,
+        _movements.c.created_at,
+        _movements.c.previous_stock,
+        _movements.c.new_stock,
+        signed.label("signed"),
+        func.lag(_movements.c.new_stock).over(**window).label("prior_stock"),
+        func.row_number().over(**window).label("position"),
+        func.sum(signed).over(partition_by=_movements.c.product_id).label("net"),
+        func.count().over(partition_by=_movements.c.product_id).label("movements"),
+    ).where(_movements.c.product_id.between(first_id, last_id)).subquery()
+    return select(chain).where(or_(
+        chain.c.position == 1,
+        chain.c.previous_stock.is_distinct_from(chain.c.prior_stock),
+        chain.c.new_stock.is_distinct_from(chain.c.previous_stock + chain.c.signed),
+    )).order_by(chain.c.product_id, chain.c.position)
+
+
+def _issue(kind: str, product_id: int, **values: Any) -> Dict[str, Any]:
+    return {"kind": kind, "product_id": product_id, **values}
+
+
+def reconcile_range(connection: Connection, first_id: int, last_id: int) -> RangeResult:
+    """Verificar los productos del rango (una transacción de lectura: vista consistente)"""
+    start = time.perf_counter()
+    result = RangeResult(first_id=first_id, last_id=last_id)
+    in_range = _products.c.id.between(first_id, last_id)
+    stocks = dict(connection.execute(select(_products.c.id, _products.c.current_stock).where(in_range)).all())
+    openings = dict(connection.execute(
+        select(_balances.c.product_id, _balances.c.stock).where(_balances.c.product_id.between(first_id, last_id))
+    ).all())
+    result.products = len(stocks)
+
+    expected: Dict[int, int] = {product_id: stock for product_id, stock in openings.items() if stock is not None}
+    for row in connection.execute(_chain_query(first_id, last_id)):
+        movement = {"movement_id": row.id, "created_at": row.created_at.isoformat()}
+        if row.position == 1:
+            result.movements += row.movements
+            opening = openings.get(row.product_id)
+            if opening is not None and row.previous_stock != opening:
+                result.discrepancies.append(_issue(
+                    "chain_break", row.product_id, **movement, previous_stock=row.previous_stock, expected=opening
+                ))
+            base = opening if opening is not None else (row.previous_stock or 0)
+            expected[row.product_id] = base + (row.net or 0)
+        elif row.previous_stock != row.prior_stock:
+            result.discrepancies.append(_issue(
+                "chain_break", row.product_id, **movement, previous_stock=row.previous_stock, expected=row.prior_stock
+            ))
+        if row.new_stock != (row.previous_stock or 0) + row.signed:
+            result.discrepancies.append(_issue(
+                "arithmetic", row.product_id, **movement,
+                new_stock=row.new_stock, expected=(row.previous_stock or 0) + row.signed,
+            ))
+
+    for product_id, stock in expected.items():
+        if product_id in stocks and stocks[product_id] != stock:
+            result.discrepancies.append(_issue(
+                "stock_mismatch", product_id, current_stock=stocks[product_id], expected=stock
+            ))
+    result.seconds = round(time.perf_counter() - start, 3)
+    return result
+
+
+_worker_engines: Dict[str, Engine] = {}
+
+
+def _reconcile_in_worker(database_url: str, first_id: int, last_id: int) -> RangeResult:
+    """Punto de entrada de cada proceso: un engine por proceso y por base"""
+    engine = _worker_engines.get(database_url)
+    if engine is None:
+        engine = _worker_engines[database_url] = create_engine(database_url)
+    with engine.connect() as connection, connection.begin():
+        return reconcile_range(connection, first_id, last_id)
+
+
+# ==================== CORRIDA COMPLETA ====================
+
+def id_ranges(last_product_id: int, batch_products: int) -> List[Tuple[int, int]]:
+    """Rangos de ancho fijo (los mismos en cada corrida, para poder reanudar)"""
+    return [(first, first + batch_products - 1) for first in range(1, last_product_id + 1, batch_products)]
+
+
+def _load_state(path: Path, batch_products: int, repair: bool) -> Dict[str, Any]:
+    if path.exists():
+        state = json.loads(path.read_text())
+        if state.get("batch_products") == batch_products and state.get("repair") == repair:
+            return state
+    return {"started_at": datetime.utcnow().isoformat(), "batch_products": batch_products, "repair": repair,
+            "completed": {}}
+
+
+def _save_state(path: Path, state: Dict[str, Any]) -> None:
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(state))
+    os.replace(temporary, path)
+
+
+def _repair(engine: Engine, result: RangeResult) -> None:
+    """Corregir current_stock de los stock_mismatch si no cambió desde la lectura"""
+    mismatches = [item for item in result.discrepancies if item["kind"] == "stock_mismatch"]
+    if not mismatches:
+        return
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        for item in mismatches:
+            updated = connection.execute(
+                update(_products)
+                .where(and_(_products.c.id == item["product_id"], _products.c.current_stock == item["current_stock"]))
+                .values(current_stock=item["expected"], updated_at=now)
+            ).rowcount
+            item["repaired"] = bool(updated)
+            result.repaired += updated
+        record_changes(connection, [(PRODUCT, item["product_id"], UPSERT) for item in mismatches if item["repaired"]])
+
+
+def _run_ranges(
+    database_url: str,
+    ranges: List[Tuple[int, int]],
+    workers: int
+) -> Iterator[RangeResult]:
+    if workers <= 1:
+        for first_id, last_id in ranges:
+            yield _reconcile_in_worker(database_url, first_id, last_id)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_reconcile_in_worker, database_url, first, last) for first, last in ranges]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def reconcile_stock(
+    database_url: str,
+    workers: int = RECONCILE_WORKERS,
+    batch_products: int = BATCH_PRODUCTS,
+    repair: bool = False,
+    state_path: Optional[str] = RECONCILE_STATE_PATH,
+    resume: bool = True,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> ReconcileReport:
+    """
+    Conciliar todos los productos, repartiendo los rangos de ids entre
+    `workers` procesos.
+
+    Args:
+        database_url: Base de datos (cada proceso abre su propio engine)
+        workers: Procesos en paralelo (1 = en este proceso)
+        batch_products: Ancho de cada rango de ids
+        repair: Corregir current_stock de los stock_mismatch
+        state_path: Archivo de estado (None = sin reanudación)
+        resume: Continuar la corrida guardada en state_path si es compatible
+        progress: Callback (rangos terminados, rangos totales)
+    """
+    from .stock_summary import rebuild_stock_summary
+
+    start = time.perf_counter()
+    engine = create_engine(database_url)
+    report = ReconcileReport()
+    try:
+        with engine.connect() as connection:
+            last_product_id = connection.execute(select(func.max(_products.c.id))).scalar() or 0
+        ranges = id_ranges(last_product_id, batch_products)
+
+        path = Path(state_path) if state_path else None
+        state = {"completed": {}}
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not resume and path.exists():
+                path.unlink()
+            state = _load_state(path, batch_products, repair)
+        for data in state["completed"].values():
+            report.add(RangeResult(**data))
+        report.resumed_ranges = report.ranges
+        pending = [(first, last) for first, last in ranges if f"{first}-{last}" not in state["completed"]]
+
+        for result in _run_ranges(database_url, pending, workers):
+            if repair:
+                _repair(engine, result)
+            report.add(result)
+            state["completed"][f"{result.first_id}-{result.last_id}"] = asdict(result)
+            if path is not None:
+                _save_state(path, state)
+            if progress:
+                progress(report.ranges, len(ranges))
+
+        if repair and report.repaired:
+            # Las correcciones son Core (sin ORM): recalcular el resumen global
+            with engine.begin() as connection:
+                rebuild_stock_summary(connection)
+        if path is not None:
+            # Corrida terminada: la próxima empieza de cero
+            path.unlink(missing_ok=True)
+    finally:
+        engine.dispose()
+    report.seconds = round(time.perf_counter() - start, 2)
+    return report
@@ -0,0 +1,326 @@
+"""
+Resumen de inventario materializado (StockSummary y DailyMovementCount).
+
+Los contadores del dashboard (productos, stock total, stock bajo, sin stock,
+sobre stock, movimientos totales y por día, con las cantidades que entraron
+y salieron cada día) se mantienen incrementalmente:
+un listener de la sesión calcula el delta de cada flush que crea, modifica
+o elimina productos y movimientos, y lo aplica con UPDATE ... SET x = x + delta
+en la misma transacción. Leer el resumen es una búsqueda por clave primaria,
+sin importar el tamaño del catálogo o del historial.
+
+Las escrituras que no pasan por el ORM (cargas masivas, SQL manual) no
+actualizan el resumen: después de ellas se ejecuta rebuild_stock_summary()
+(scripts/rebuild_summaries.py).
+
+La fila del resumen se crea al iniciar la app y en create_tables()
+(ensure_stock_summary); la lectura nunca escribe: si la fila falta, se
+calcula el resumen sin guardarlo.
+
+Nota: todas las escrituras actualizan la misma fila; en PostgreSQL eso
+serializa los commits que registran movimientos (el bloqueo de fila dura
+hasta el commit, que ya es corto en estos endpoints).
+
+Uso:
+    from infrastructure.database.stock_summary import read_stock_summary
+
+    summary = read_stock_summary(db)
+    summary["low_stock_count"]
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import DailyMovementCount, InventoryMovement, Product, StockSummary
+from .movement_archive import archived_until
+
+SUMMARY_ID = 1
+# Mismo umbral que ProductRepository.get_high_stock_products
+HIGH_STOCK_THRESHOLD = 0.9
+
+PRODUCT_COUNTERS = ("total_products", "total_stock", "low_stock_count", "out_of_stock_count", "high_stock_count")
+DAY_COUNTERS = ("movements", "in_count", "out_count", "in_quantity", "out_quantity")
+
+# Claves en session.info entre before_flush y after_flush (por módulo: otros
+# listeners de flush, como movement_rollup.py, guardan las suyas en la misma Session)
+_OLD_VALUES_KEY = (__name__, "old_values")
+_CASCADE_KEY = (__name__, "cascaded_movements")
+
+_summary = StockSummary.__table__
+_daily = DailyMovementCount.__table__
+_products = Product.__table__
+_movements = InventoryMovement.__table__
+
+
+def product_counters(current_stock: int, min_stock: int, max_stock: int) -> Tuple[int, ...]:
+    """Aporte de un producto a cada contador de PRODUCT_COUNTERS"""
+    return (
+        1,
+        current_stock,
+        int(current_stock < min_stock),
+        int(current_stock == 0),
+        int(max_stock > 0 and current_stock >= max_stock * HIGH_STOCK_THRESHOLD),
+    )
+
+
+# ==================== LECTURA ====================
+
+def read_stock_summary(db: Session) -> Dict[str, Any]:
+    """
+    Resumen actual (solo lectura).
+    Si la fila no existe todavía se calcula sin guardarla: la crean
+    ensure_stock_summary() al iniciar la app y create_tables().
+    """
+    row = db.execute(select(_summary).where(_summary.c.id == SUMMARY_ID)).mappings().first()
+    if row is None:
+        return _compute_stock_summary(db.connection())[0]
+    return {key: row[key] for key in PRODUCT_COUNTERS + ("total_movements",)}
+
+
+def movements_on(db: Session, day: date) -> int:
+    """Movimientos registrados en un día (UTC)"""
+    return db.execute(select(_daily.c.movements).where(_daily.c.day == day)).scalar() or 0
+
+
+# ==================== RECONSTRUCCIÓN ====================
+
+def _compute_stock_summary(connection: Connection) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[datetime]]:
+    """Calcular (resumen, filas diarias, horizonte de archivo) sin escribir nada"""
+    horizon = archived_until(connection)
+    low = case((_products.c.current_stock < _products.c.min_stock, 1), else_=0)
+    out = case((_products.c.current_stock == 0, 1), else_=0)
+    high = case((
+        (_products.c.max_stock > 0)
+        & (_products.c.current_stock >= _products.c.max_stock * HIGH_STOCK_THRESHOLD), 1
+    ), else_=0)
+    totals = connection.execute(select(
+        func.count(_products.c.id), func.coalesce(func.sum(_products.c.current_stock), 0),
+        func.coalesce(func.sum(low), 0), func.coalesce(func.sum(out), 0), func.coalesce(func.sum(high), 0),
+    )).one()
+
+    day = func.date(_movements.c.created_at)
+    daily_query = select(
+        day,
+        func.count(),
+        func.sum(case((_movements.c.movement_type == "IN", 1), else_=0)),
+        func.sum(case((_movements.c.movement_type == "OUT", 1), else_=0)),
+        func.sum(case((_movements.c.movement_type == "IN", _movements.c.quantity), else_=0)),
+        func.sum(case((_movements.c.movement_type == "OUT", _movements.c.quantity), else_=0)),
+    ).group_by(day)
+    archived_movements = 0
+    if horizon is not None:
+        daily_query = daily_query.where(_movements.c.created_at >= horizon)
+        archived_movements = connection.execute(
+            select(func.coalesce(func.sum(_daily.c.movements), 0)).where(_daily.c.day < horizon.date())
+        ).scalar()
+    daily_rows = [
+        {
+            "day": value if isinstance(value, date) else date.fromisoformat(value),
+            "movements": movements,
+            "in_count": int(in_count),
+            "out_count": int(out_count),
+            "in_quantity": int(in_quantity),
+            "out_quantity": int(out_quantity),
+        }
+        for value, movements, in_count, out_count, in_quantity, out_quantity in connection.execute(daily_query)
+    ]
+
+    summary = dict(zip(PRODUCT_COUNTERS, (int(value) for value in totals)))
+    summary["total_movements"] = archived_movements + sum(row["movements"] for row in daily_rows)
+    return summary, daily_rows, horizon
+
+
+def rebuild_stock_summary(connection: Connection) -> Dict[str, Any]:
+    """
+    Recalcular el resumen completo desde products e inventory_movements.
+    Reemplaza las filas existentes dentro de la transacción de `connection`;
+    los días ya archivados (movement_archive.py) se conservan tal cual.
+    """
+    summary, daily_rows, horizon = _compute_stock_summary(connection)
+    connection.execute(delete(_summary))
+    connection.execute(insert(_summary).values(id=SUMMARY_ID, updated_at=datetime.utcnow(), **summary))
+    connection.execute(delete(_daily).where(_daily.c.day >= horizon.date()) if horizon else delete(_daily))
+    if daily_rows:
+        connection.execute(insert(_daily), daily_rows)
+    return {**summary, "days": len(daily_rows)}
+
+
+def ensure_stock_summary(connection: Connection) -> bool:
+    """
+    Crear la fila del resumen si todavía no existe (inicio de la app,
+    create_tables). Así la lectura del dashboard nunca escribe.
+
+    Returns:
+        bool: True si se creó la fila
+    """
+    if not inspect(connection).has_table(_summary.name):
+        return False
+    if connection.execute(select(_summary.c.id).where(_summary.c.id == SUMMARY_ID)).first() is not None:
+        return False
+    rebuild_stock_summary(connection)
+    return True
+
+
+# ==================== MANTENIMIENTO INCREMENTAL ====================
+
+def _old_value(obj, attribute: str, stash: Dict) -> Any:
+    """Valor antes de los cambios pendientes (historial del atributo o el leído en before_flush)"""
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added and (id(obj), attribute) in stash:
+        return stash[(id(obj), attribute)]
+    return getattr(obj, attribute)
+
+
+def _changed_without_history(obj) -> bool:
+    attrs = inspect(obj).attrs
+    return any(
+        attrs[attribute].history.added and not attrs[attribute].history.deleted
+        for attribute in ("current_stock", "min_stock", "max_stock")
+    )
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    products_to_load = []
+    deleted_products = []
+    deleted_movement_ids = set()
+    for obj in session.new:
+        # Fijar la fecha aquí para que la fila y su día en el resumen coincidan
+        if isinstance(obj, InventoryMovement) and obj.created_at is None:
+            obj.created_at = datetime.utcnow()
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            deleted_products.append(obj.id)
+        elif isinstance(obj, InventoryMovement):
+            deleted_movement_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Product) and _changed_without_history(obj):
+            products_to_load.append(obj)
+
+    stash: Dict = {}
+    if products_to_load or deleted_products:
+        connection = session.connection()
+    if products_to_load:
+        # Atributos modificados sin valor anterior cargado: se lee la fila actual
+        by_id = {obj.id: obj for obj in products_to_load}
+        rows = connection.execute(
+            select(_products.c.id, _products.c.current_stock, _products.c.min_stock, _products.c.max_stock)
+            .where(_products.c.id.in_(by_id))
+        )
+        for product_id, current_stock, min_stock, max_stock in rows:
+            obj = by_id[product_id]
+            stash.update({
+                (id(obj), "current_stock"): current_stock,
+                (id(obj), "min_stock"): min_stock,
+                (id(obj), "max_stock"): max_stock,
+            })
+    session.info[_OLD_VALUES_KEY] = stash
+
+    # Movimientos que se eliminan en cascada con sus productos
+    cascaded: Dict[Tuple[Optional[date], str], list] = defaultdict(lambda: [0, 0])
+    if deleted_products:
+        day = func.date(_movements.c.created_at)
+        query = (
+            select(day, _movements.c.movement_type, func.count(), func.sum(_movements.c.quantity))
+            .where(_movements.c.product_id.in_(deleted_products))
+            .group_by(day, _movements.c.movement_type)
+        )
+        if deleted_movement_ids:
+            query = query.where(_movements.c.id.not_in(deleted_movement_ids))
+        for value, movement_type, count, quantity in connection.execute(query):
+            totals = cascaded[(value if isinstance(value, date) else date.fromisoformat(value), movement_type)]
+            totals[0] += count
+            totals[1] += quantity
+    session.info[_CASCADE_KEY] = cascaded
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    stash = session.info.pop(_OLD_VALUES_KEY, {})
+    cascaded = session.info.pop(_CASCADE_KEY, {})
+    product_delta = [0] * len(PRODUCT_COUNTERS)
+    day_delta: Dict[date, list] = defaultdict(lambda: [0] * len(DAY_COUNTERS))
+
+    def add(counters, sign: int) -> None:
+        for index, value in enumerate(counters):
+            product_delta[index] += sign * value
+
+    def add_movement(day: date, movement_type: str, quantity: int, sign: int, count: int = 1) -> None:
+        counters = day_delta[day]
+        counters[0] += sign * count
+        counters[1 if movement_type == "IN" else 2] += sign * count
+        counters[3 if movement_type == "IN" else 4] += sign * quantity
+
+    for obj in session.new:
+        if isinstance(obj, Product):
+            add(product_counters(obj.current_stock, obj.min_stock, obj.max_stock), 1)
+        elif isinstance(obj, InventoryMovement):
+            add_movement(obj.created_at.date(), obj.movement_type, obj.quantity, 1)
+    for obj in session.dirty:
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False):
+            old = [_old_value(obj, attribute, stash) for attribute in ("current_stock", "min_stock", "max_stock")]
+            add(product_counters(*old), -1)
+            add(product_counters(obj.current_stock, obj.min_stock, obj.max_stock), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            old = [_old_value(obj, attribute, stash) for attribute in ("current_stock", "min_stock", "max_stock")]
+            add(product_counters(*old), -1)
+        elif isinstance(obj, InventoryMovement) and obj.created_at is not None:
+            add_movement(obj.created_at.date(), obj.movement_type, obj.quantity, -1)
+    for (day, movement_type), (count, quantity) in cascaded.items():
+        add_movement(day, movement_type, quantity, -1, count)
+
+    day_delta = {day: counters for day, counters in day_delta.items() if any(counters)}
+    if not any(product_delta) and not day_delta:
+        return
+
+    connection = session.connection()
+    values = {name: getattr(_summary.c, name) + delta for name, delta in zip(PRODUCT_COUNTERS, product_delta) if delta}
+    movements_delta = sum(counters[0] for counters in day_delta.values())
+    if movements_delta:
+        values["total_movements"] = _summary.c.total_movements + movements_delta
+    result = connection.execute(
+        update(_summary).where(_summary.c.id == SUMMARY_ID).values(updated_at=datetime.utcnow(), **values)
+    )
+    if result.rowcount == 0:
+        # Primera escritura sin resumen: la reconstrucción ya incluye este flush
+        rebuild_stock_summary(connection)
+        return
+    for day, counters in day_delta.items():
+        _add_to_day(connection, day, counters)
+
+
+def _add_to_day(connection: Connection, day: date, counters) -> None:
+    deltas = dict(zip(DAY_COUNTERS, counters))
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        statement = upsert(_daily).values(day=day, **deltas)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[_daily.c.day],
+            set_={name: getattr(_daily.c, name) + delta for name, delta in deltas.items()},
+        ))
+        return
+    result = connection.execute(
+        update(_daily).where(_daily.c.day == day)
+        .values(**{name: getattr(_daily.c, name) + delta for name, delta in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_daily).values(day=day, **deltas))
+
+
+def install_stock_summary_tracking() -> None:
+    """Mantener el resumen en cada flush de cualquier sesión (idempotente)"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "after_flush", _after_flush)
+
+
+install_stock_summary_tracking()
@@ -0,0 +1,129 @@
+"""
+Subida en lote de los movimientos registrados offline (POST /sync/movements).
+
+El dispositivo envía su cola de movimientos en orden, cada uno con un
+client_id propio. Todo el lote se aplica en una transacción: una sola
+lectura de los productos y de los client_id ya subidos, los movimientos en
+el orden recibido sobre el stock en memoria, y un solo flush de los
+movimientos (una actualización por producto). Resultado de cada ítem:
+- applied: movimiento creado
+- already_applied: el client_id ya se subió antes (o se repite en el lote);
+  se devuelve el movimiento original
+- rejected: stock insuficiente, producto inexistente o movimiento inválido;
+  los demás ítems siguen aplicándose y el rechazado puede reenviarse
+
+Los movimientos quedan con la hora del servidor (la cadena de stock se
+ordena por created_at); la hora del dispositivo se guarda en
+sync_uploads.occurred_at.
+
+Configuración (variables de entorno):
+- SYNC_UPLOAD_MAX_ITEMS: movimientos por lote (default 500)
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .delta_sync import product_states
+from .models import InventoryMovement, Product, SyncUpload
+
+SYNC_UPLOAD_MAX_ITEMS = int(os.getenv("SYNC_UPLOAD_MAX_ITEMS", "500"))
+
+APPLIED = "applied"
+ALREADY_APPLIED = "already_applied"
+REJECTED = "rejected"
+
+_uploads = SyncUpload.__table__
+
+
+def _rejected(client_id: str, reason: str, detail: str) -> Dict[str, Any]:
+    return {"client_id": client_id, "status": REJECTED, "reason": reason, "detail": detail}
+
+
+def apply_uploaded_movements(
+    db: Session,
+    user_id: int,
+    device_id: str,
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Aplicar la cola de un dispositivo y confirmar la transacción.
+
+    Args:
+        items: Diccionarios con client_id, product_id, movement_type,
+            quantity, reason y occurred_at (opcional)
+
+    Returns:
+        dict: results (uno por ítem, en orden), products (estado actual de
+        los productos del lote) y el conteo por resultado
+
+    Raises:
+        IntegrityError: Otro lote subió el mismo client_id al mismo tiempo
+            (la transacción se revierte; reintentar da already_applied)
+    """
+    now = datetime.utcnow()
+    client_ids = {item["client_id"] for item in items}
+    uploaded = dict(db.execute(
+        select(_uploads.c.client_id, _uploads.c.movement_id).where(_uploads.c.client_id.in_(client_ids))
+    ).all())
+    product_ids = {item["product_id"] for item in items}
+    products = {
+        product.id: product for product in
+        db.query(Product).filter(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+    }
+
+    results: List[Dict[str, Any]] = []
+    created: Dict[str, InventoryMovement] = {}
+    occurred: Dict[str, Optional[datetime]] = {}
+    for item in items:
+        client_id = item["client_id"]
+        if client_id in uploaded or client_id in created:
+            results.append({"client_id": client_id, "status": ALREADY_APPLIED, "movement_id": uploaded.get(client_id)})
+            continue
+        movement_type, quantity = item["movement_type"], item["quantity"]
+        if movement_type not in ("IN", "OUT") or quantity <= 0:
+            results.append(_rejected(client_id, "invalid_movement", "Tipo IN/OUT y cantidad mayor a 0"))
+            continue
+        product = products.get(item["product_id"])
+        if product is None:
+            results.append(_rejected(client_id, "product_not_found", f"Producto {item['product_id']} no encontrado"))
+            continue
+        previous_stock = product.current_stock
+        if movement_type == "OUT" and previous_stock < quantity:
+            results.append(_rejected(
+                client_id, "insufficient_stock", f"Disponible: {previous_stock}, Requerido: {quantity}"
+            ))
+            continue
+        product.current_stock = previous_stock + (quantity if movement_type == "IN" else -quantity)
+        movement = InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type=movement_type, reason=item["reason"],
+            previous_stock=previous_stock, new_stock=product.current_stock, user_id=user_id, created_at=now,
+        )
+        db.add(movement)
+        created[client_id] = movement
+        occurred_at = item.get("occurred_at")
+        if occurred_at is not None and occurred_at.tzinfo:
+            occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+        occurred[client_id] = occurred_at
+        results.append({"client_id": client_id, "status": APPLIED})
+
+    movement_ids: Dict[str, int] = {}
+    if created:
+        db.flush()
+        movement_ids = {client_id: movement.id for client_id, movement in created.items()}
+        db.add_all([
+            SyncUpload(client_id=client_id, device_id=device_id, movement_id=movement_ids[client_id],
+                       occurred_at=occurred[client_id], received_at=now)
+            for client_id in created
+        ])
+    db.commit()
+
+    for result in results:
+        if result["client_id"] in movement_ids:
+            result["movement_id"] = movement_ids[result["client_id"]]
+    counts = {status: 0 for status in (APPLIED, ALREADY_APPLIED, REJECTED)}
+    for result in results:
+        counts[result["status"]] += 1
+    return {"results": results, "counts": counts, "products": product_states(db, products)}
@@ -0,0 +1,25 @@
+"""
+Contexto de la request para los logs.
+
+El id de correlación se fija al inicio de cada request (ver
+monitoring/tracing.py) y StructuredFormatter lo agrega a cada línea, así los
+logs de una misma request se pueden unir entre sí y con sus spans.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+_correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+
+def get_correlation_id() -> Optional[str]:
+    """Id de correlación de la request en curso o None fuera de una request"""
+    return _correlation_id.get()
+
+
+def set_correlation_id(correlation_id: Optional[str]):
+    """Fijar el id de correlación; devuelve el token para restaurarlo"""
+    return _correlation_id.set(correlation_id)
+
+
+def reset_correlation_id(token) -> None:
+    _correlation_id.reset(token)
@@ -0,0 +1,112 @@
+"""
+Logging estructurado de requests y responses.
+
+Cada request completada deja un registro JSON (action=request_complete o
+request_error) con método, path, plantilla de ruta, status y tiempo de
+proceso: es la entrada de scripts/analyze_logs.py. Requiere setup_logging()
+para que los registros lleguen a logs/app.log.
+"""
+import time
+import logging
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class LoggingMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware para logging estructurado de requests y responses.
+    """
+    
+    async def dispatch(self, request: Request, call_next):
+        # Obtener información de la request
+        start_time = time.time()
+        client_ip = request.client.host if request.client else "unknown"
+        user_agent = request.headers.get("user-agent", "unknown")
+        
+        # Información de autenticación
+        auth_info = "anonymous"
+        user_id = None
+        
+        # Intentar extraer información del token si existe
+        auth_header = request.headers.get("authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            try:
+                from ..auth.jwt_handler import JWTHandler
+                token = auth_header.split(" ")[1]
+                payload = JWTHandler.extract_user_from_token(token)
+                auth_info = payload.get("username", "authenticated")
+                user_id = payload.get("user_id")
+            except:
+                auth_info = "invalid_token"
+        
+        # Log de request
+        request_info = {
+            "method": request.method,
+            "url": str(request.url),
+            "client_ip": client_ip,
+            "user_agent": user_agent[:100],  # Limitar longitud
+            "user": auth_info,
+            "user_id": user_id,
+            "action": "request_start"
+        }
+        
+        logger.info(f"Request: {request.method} {request.url.path}", extra={"extra_data": request_info})
+        
+        try:
+            # Procesar request
+            response = await call_next(request)
+            
+            # Calcular tiempo de respuesta
+            process_time = time.time() - start_time
+            
+            # Log de response
+            route = request.scope.get("route")
+            response_info = {
+                "method": request.method,
+                "url": str(request.url),
+                "path": request.url.path,
+                "route": getattr(route, "path", None),  # Plantilla, ej: /products/{product_id}
+                "status_code": response.status_code,
+                "process_time": round(process_time, 4),
+                "client_ip": client_ip,
+                "user": auth_info,
+                "user_id": user_id,
+                "action": "request_complete"
+            }
+            
+            log_level = "info" if response.status_code < 400 else "warning" if response.status_code < 500 else "error"
+            getattr(logger, log_level)(
+                f"Response: {request.method} {request.url.path} - {response.status_code} ({process_time:.3f}s)",
+                extra={"extra_data": response_info}
+            )
+            
+            # Agregar header de tiempo de procesamiento
+            response.headers["X-Process-Time"] = str(process_time)
+            
+            return response
+            
+        except Exception as e:
+            # Log de error no manejado
+            process_time = time.time() - start_time
+            error_info = {
+                "method": request.method,
+                "url": str(request.url),
+                "path": request.url.path,
+                "client_ip": client_ip,
+                "user": auth_info,
+                "user_id": user_id,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "process_time": round(process_time, 4),
+                "action": "request_error"
+            }
+            
+            logger.error(
+                f"Unhandled error: {request.method} {request.url.path} - {str(e)}",
+                extra={"extra_data": error_info},
+                exc_info=True
+            )
+            
+            raise
@@ -16,6 +16,12 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from logging.handlers import RotatingFileHandler
 
+from .context import get_correlation_id
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+AUDIT_LOG_FILE = os.getenv("AUDIT_LOG_FILE", "logs/audit.log")
+
 
 class StructuredFormatter(logging.Formatter):
     """
@@ -37,6 +43,11 @@ class StructuredFormatter(logging.Formatter):
             "process": record.process if hasattr(record, 'process') else os.getpid()
         }
         
+        # Id de correlación de la request (une logs y spans de tracing)
+        correlation_id = get_correlation_id()
+        if correlation_id:
+            log_object["correlation_id"] = correlation_id
+        
         # Agregar extras si existen
         if hasattr(record, 'extra_data'):
             log_object.update(record.extra_data)
@@ -53,9 +64,9 @@ class StructuredFormatter(logging.Formatter):
 
 
 def setup_logging(
-    log_level: str = "INFO",
-    log_file: str = "logs/app.log",
-    audit_log_file: str = "logs/audit.log",
+    log_level: str = LOG_LEVEL,
+    log_file: str = LOG_FILE,
+    audit_log_file: str = AUDIT_LOG_FILE,
     max_file_size: int = 10 * 1024 * 1024,  # 10 MB
     backup_count: int = 5
 ) -> logging.Logger:
@@ -64,7 +75,8 @@ def setup_logging(
     
     Args:
         log_level: Nivel de log (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        log_file: Archivo para logs generales
+        log_file: Archivo para logs generales (security.log y slow_queries.log
+            se crean en el mismo directorio)
         audit_log_file: Archivo para logs de auditoría
         max_file_size: Tamaño máximo de archivo antes de rotar
         backup_count: Número de archivos de backup a mantener
@@ -117,7 +129,7 @@ def setup_logging(
     # Logger específico para seguridad
     security_logger = logging.getLogger("security")
     security_handler = RotatingFileHandler(
-        "logs/security.log",
+        os.path.join(os.path.dirname(log_file), "security.log"),
         maxBytes=max_file_size,
         backupCount=backup_count,
         encoding='utf-8'
@@ -127,6 +139,19 @@ def setup_logging(
     security_logger.addHandler(security_handler)
     security_logger.propagate = False
     
+    # Logger específico para queries lentas (ver database/slow_query.py)
+    slow_query_logger = logging.getLogger("slow_query")
+    slow_query_handler = RotatingFileHandler(
+        os.path.join(os.path.dirname(log_file), "slow_queries.log"),
+        maxBytes=max_file_size,
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+    slow_query_handler.setFormatter(StructuredFormatter())
+    slow_query_handler.setLevel(logging.WARNING)
+    slow_query_logger.addHandler(slow_query_handler)
+    slow_query_logger.propagate = False
+    
     # Configurar log level para dependencias externas
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
@@ -0,0 +1,214 @@
+"""
+Monitor de retraso (lag) del event loop y detector de llamadas bloqueantes.
+
+- Una tarea asyncio duerme EVENT_LOOP_MONITOR_INTERVAL y mide cuánto tarde
+  despierta: ese retraso es el tiempo que el loop estuvo ocupado sin ceder.
+- Un hilo vigilante revisa el último latido de esa tarea; si el loop lleva más
+  de EVENT_LOOP_BLOCK_THRESHOLD_MS sin latir, captura el stack del hilo del
+  loop (lo que está bloqueando en ese momento) y la ruta que lo ejecuta.
+
+Métricas (ver metrics.py):
+- scis_event_loop_lag_seconds: histograma del retraso
+- scis_event_loop_lag_quantile_seconds{quantile}: p50/p90/p99/max recientes
+- scis_event_loop_blocks_total{route}: bloqueos detectados por ruta
+
+Configuración (variables de entorno):
+- EVENT_LOOP_MONITOR_ENABLED: iniciar con la aplicación (default true)
+- EVENT_LOOP_MONITOR_INTERVAL: segundos entre latidos (default 0.1)
+- EVENT_LOOP_BLOCK_THRESHOLD_MS: umbral de bloqueo en ms (default 100)
+"""
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import EVENT_LOOP_BLOCKS, EVENT_LOOP_LAG, EVENT_LOOP_LAG_QUANTILE
+
+EVENT_LOOP_MONITOR_ENABLED = os.getenv("EVENT_LOOP_MONITOR_ENABLED", "true").lower() == "true"
+EVENT_LOOP_MONITOR_INTERVAL = float(os.getenv("EVENT_LOOP_MONITOR_INTERVAL", "0.1"))
+EVENT_LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+# Muestras de lag usadas para los percentiles publicados
+LAG_WINDOW_SIZE = 1000
+# Bloqueos recientes conservados para /admin/event-loop
+BLOCK_HISTORY_SIZE = 50
+# Frames del stack bloqueante que se registran (los más internos)
+BLOCK_STACK_LIMIT = 40
+
+QUANTILES = ("0.5", "0.9", "0.99", "1")
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(quantile * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class EventLoopMonitor:
+    """
+    Mide el lag del event loop en curso y registra qué lo bloquea.
+
+    Uso (dentro del loop, por ejemplo en el lifespan de la app):
+        monitor.start(app)
+        ...
+        await monitor.stop()
+    """
+
+    def __init__(
+        self,
+        interval: float = EVENT_LOOP_MONITOR_INTERVAL,
+        block_threshold_ms: float = EVENT_LOOP_BLOCK_THRESHOLD_MS
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold_ms / 1000
+        self._lags: Deque[float] = deque(maxlen=LAG_WINDOW_SIZE)
+        self._blocks: Deque[Dict[str, Any]] = deque(maxlen=BLOCK_HISTORY_SIZE)
+        self._endpoint_routes: Dict[Any, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._total_blocks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, app=None) -> None:
+        """Iniciar el monitor en el event loop actual (requiere un loop en ejecución)"""
+        if self.running:
+            return
+        if app is not None:
+            self._endpoint_routes = self._map_endpoints(app)
+        for quantile in QUANTILES:
+            EVENT_LOOP_LAG_QUANTILE.labels(quantile).set_function(
+                lambda q=float(quantile): self.lag_quantile(q)
+            )
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._task = loop.create_task(self._measure(loop))
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Detener la tarea de medición y el hilo vigilante"""
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    # ==================== MEDICIÓN ====================
+
+    async def _measure(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self._heartbeat = time.monotonic()
+            self._lags.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def lag_quantile(self, quantile: float) -> float:
+        """Percentil del lag (segundos) sobre las últimas LAG_WINDOW_SIZE muestras"""
+        return _percentile(sorted(self._lags), quantile)
+
+    # ==================== DETECCIÓN DE BLOQUEOS ====================
+
+    def _watch(self) -> None:
+        # Un bloqueo se registra una sola vez (identificado por su último latido)
+        reported_heartbeat = None
+        check_every = max(self.block_threshold / 2, 0.01)
+
+        while not self._stop_event.wait(check_every):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.block_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            self._report_block(stalled_for)
+
+    def _report_block(self, stalled_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame, limit=BLOCK_STACK_LIMIT)
+        route = self._find_route(frame)
+        del frame
+
+        self._total_blocks += 1
+        EVENT_LOOP_BLOCKS.labels(route).inc()
+
+        block_info = {
+            "action": "event_loop_blocked",
+            "detected_at": datetime.utcnow().isoformat(),
+            "blocked_ms": round(stalled_for * 1000, 1),
+            "threshold_ms": round(self.block_threshold * 1000, 1),
+            "route": route,
+            "stack": [f"{entry.filename}:{entry.lineno} {entry.name}" for entry in stack],
+        }
+        self._blocks.append(block_info)
+        logger.warning(
+            f"Event loop bloqueado {block_info['blocked_ms']} ms en {route}",
+            extra={"extra_data": block_info}
+        )
+
+    @staticmethod
+    def _map_endpoints(app) -> Dict[Any, str]:
+        """Code object de cada endpoint -> plantilla de ruta"""
+        routes = {}
+        for route in getattr(app, "routes", []):
+            endpoint = getattr(route, "endpoint", None)
+            path = getattr(route, "path", None)
+            if endpoint is None or path is None:
+                continue
+            code = getattr(inspect.unwrap(endpoint), "__code__", None)
+            if code is not None:
+                methods = ",".join(sorted(getattr(route, "methods", None) or []))
+                routes[code] = f"{methods} {path}".strip()
+        return routes
+
+    def _find_route(self, frame) -> str:
+        while frame is not None:
+            route = self._endpoint_routes.get(frame.f_code)
+            if route is not None:
+                return route
+            frame = frame.f_back
+        return "unknown"
+
+    def status(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "block_threshold_ms": self.block_threshold * 1000,
+            "samples": len(lags),
+            "lag_ms": {
+                f"p{int(float(q) * 100)}" if q != "1" else "max": round(_percentile(lags, float(q)) * 1000, 3)
+                for q in QUANTILES
+            },
+            "total_blocks": self._total_blocks,
+            "recent_blocks": list(self._blocks),
+        }
+
+
+event_loop_monitor = EventLoopMonitor()
@@ -0,0 +1,119 @@
+"""
+Middleware ASGI de métricas HTTP.
+
+Se implementa como middleware ASGI puro (sin BaseHTTPMiddleware) para no
+agregar una tarea extra ni copiar el body por request.
+"""
+import os
+import time
+
+from ..database.query_counter import count_queries
+from .metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+from .request_profiler import ProfilingRoute
+from .tracing import TracingRoute
+
+# En modo debug se exponen headers de diagnóstico (X-DB-Query-Count, ...)
+APP_DEBUG = os.getenv("APP_DEBUG", "false").lower() == "true"
+
+
+class InstrumentedRoute(TracingRoute, ProfilingRoute):
+    """
+    Clase de ruta con tracing (spans de ruta, dependencias y endpoint)
+    y perfilado bajo demanda (X-Profile).
+
+    Uso:
+        app.router.route_class = InstrumentedRoute  # antes de declarar rutas
+    """
+    pass
+
+
+def route_template(scope) -> str:
+    """
+    Plantilla de la ruta que atendió la request (ej: /products/{product_id}).
+    Las rutas no encontradas se agrupan para no crear series por cada URL.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Registra latencia por ruta y clase de status, y requests en proceso.
+
+    Las respuestas text/event-stream (GET /inventory/stream) duran lo que
+    dure la conexión: se registra el tiempo hasta el primer byte y dejan de
+    contar como en proceso desde ahí, para no distorsionar los percentiles.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        event_stream = False
+        observed = False
+
+        def observe() -> None:
+            nonlocal observed
+            observed = True
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                route_template(scope),
+                f"{status_code // 100}xx",
+            ).observe(time.perf_counter() - start_time)
+
+        async def send_with_status(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = any(
+                    key == b"content-type" and value.startswith(b"text/event-stream")
+                    for key, value in message.get("headers", [])
+                )
+            await send(message)
+            if event_stream and not observed and message["type"] == "http.response.body":
+                observe()
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not observed:
+                observe()
+
+
+class QueryCountMiddleware:
+    """
+    Cuenta sentencias SQL y tiempo en base de datos por request.
+    En modo debug agrega los headers X-DB-Query-Count y X-DB-Query-Time (ms).
+    """
+
+    def __init__(self, app, expose_headers: bool = APP_DEBUG):
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries(f"{scope['method']} {scope['path']}", scope) as stats:
+            if not self.expose_headers:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-query-time", f"{stats.total_time_ms:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
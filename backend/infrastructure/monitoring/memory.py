@@ -0,0 +1,257 @@
+"""
+Diagnóstico de memoria de los workers.
+
+- tracemalloc bajo demanda: iniciar/detener, tomar snapshots, comparar dos
+  snapshots y listar los sitios de asignación con más memoria o bloques
+- Conteo en vivo de sesiones SQLAlchemy y objetos en sus identity maps
+  (sesiones sin cerrar y listas grandes de entidades cargadas)
+
+tracemalloc agrega costo a cada asignación mientras está activo: se inicia
+solo para investigar y se detiene al terminar.
+
+Configuración (variables de entorno):
+- MEMORY_MAX_SNAPSHOTS: snapshots conservados en memoria (default 5)
+"""
+import gc
+import os
+import threading
+import tracemalloc
+import weakref
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List
+
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "5"))
+
+# Frames del propio tracemalloc e importlib no aportan al diagnóstico
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+
+class MemoryDiagnosticsError(Exception):
+    """Operación de diagnóstico inválida (tracemalloc inactivo, snapshot inexistente, ...)"""
+    pass
+
+
+# ==================== TRACEMALLOC ====================
+
+class SnapshotStore:
+    """Snapshots de tracemalloc recientes, identificados por número"""
+
+    def __init__(self, max_size: int = MEMORY_MAX_SNAPSHOTS):
+        self.max_size = max_size
+        self._snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def take(self, label: str = "") -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            raise MemoryDiagnosticsError("tracemalloc no está activo")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            entry = {
+                "id": self._next_id,
+                "label": label,
+                "taken_at": datetime.utcnow().isoformat(),
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "snapshot": snapshot,
+            }
+            self._snapshots[self._next_id] = entry
+            self._next_id += 1
+            while len(self._snapshots) > self.max_size:
+                self._snapshots.popitem(last=False)
+        return _public(entry)
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise MemoryDiagnosticsError(f"Snapshot {snapshot_id} no encontrado")
+        return entry["snapshot"]
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_public(entry) for entry in self._snapshots.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in entry.items() if key != "snapshot"}
+
+
+snapshot_store = SnapshotStore()
+
+
+def start_tracing(frames: int = 10) -> Dict[str, Any]:
+    """Iniciar tracemalloc guardando `frames` niveles de traceback por asignación"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracing_status()
+
+
+def stop_tracing() -> Dict[str, Any]:
+    """Detener tracemalloc y descartar los snapshots (liberan su memoria)"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    snapshot_store.clear()
+    return tracing_status()
+
+
+def tracing_status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "traceback_frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        "snapshots": snapshot_store.list(),
+    }
+
+
+def _check_key_type(key_type: str) -> None:
+    if key_type not in KEY_TYPES:
+        raise MemoryDiagnosticsError(f"key_type inválido. Use uno de: {', '.join(KEY_TYPES)}")
+
+
+def _format_traceback(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def top_allocations(
+    snapshot_id: int,
+    key_type: str = "lineno",
+    limit: int = 20,
+    sort_by: str = "size"
+) -> List[Dict[str, Any]]:
+    """Sitios de asignación con más memoria (sort_by='size') o más bloques ('count')"""
+    _check_key_type(key_type)
+    stats = snapshot_store.get(snapshot_id).statistics(key_type)
+    if sort_by == "count":
+        stats.sort(key=lambda stat: stat.count, reverse=True)
+    return [
+        {
+            "site": _format_traceback(stat.traceback),
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "average_bytes": stat.size // stat.count if stat.count else 0,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def compare_snapshots(
+    base_id: int,
+    current_id: int,
+    key_type: str = "lineno",
+    limit: int = 20,
+    sort_by: str = "size"
+) -> List[Dict[str, Any]]:
+    """Diferencias entre dos snapshots: dónde creció (o bajó) la memoria"""
+    _check_key_type(key_type)
+    base = snapshot_store.get(base_id)
+    current = snapshot_store.get(current_id)
+    stats = current.compare_to(base, key_type)
+    if sort_by == "count":
+        stats.sort(key=lambda stat: abs(stat.count_diff), reverse=True)
+    return [
+        {
+            "site": _format_traceback(stat.traceback),
+            "size_bytes": stat.size,
+            "size_diff_bytes": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+# ==================== SESIONES Y IDENTITY MAP ====================
+
+# Sesiones que iniciaron una transacción (referencias débiles: no las retienen)
+_tracked_sessions: "weakref.WeakSet" = weakref.WeakSet()
+_tracked_sessions_lock = threading.Lock()
+_tracking_installed = False
+
+
+def _track_session(session, transaction, connection) -> None:
+    with _tracked_sessions_lock:
+        _tracked_sessions.add(session)
+
+
+def install_session_tracking() -> None:
+    """Registrar las sesiones SQLAlchemy al iniciar su primera transacción"""
+    global _tracking_installed
+    if _tracking_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    event.listen(Session, "after_begin", _track_session)
+    _tracking_installed = True
+
+
+def orm_statistics(limit: int = 20) -> Dict[str, Any]:
+    """
+    Sesiones vivas y objetos ORM retenidos en sus identity maps.
+
+    Una sesión en transacción retiene una conexión del pool; una sesión
+    cerrada vacía su identity map. Muchas sesiones abiertas entre requests
+    indican sesiones que nunca se cierran.
+    """
+    with _tracked_sessions_lock:
+        sessions = list(_tracked_sessions)
+    objects_by_class: Counter = Counter()
+    in_transaction = 0
+    with_objects = 0
+
+    for session in sessions:
+        if session.in_transaction():
+            in_transaction += 1
+        try:
+            # Otras threads pueden estar usando la sesión: se lee una copia
+            instances = list(session.identity_map.values())
+        except RuntimeError:
+            continue
+        if instances:
+            with_objects += 1
+        for instance in instances:
+            objects_by_class[type(instance).__name__] += 1
+
+    return {
+        "tracking_installed": _tracking_installed,
+        "live_sessions": len(sessions),
+        "sessions_in_transaction": in_transaction,
+        "sessions_with_objects": with_objects,
+        "identity_map_objects": sum(objects_by_class.values()),
+        "identity_map_by_class": dict(objects_by_class.most_common(limit)),
+    }
+
+
+def memory_overview() -> Dict[str, Any]:
+    """Resumen: memoria del proceso, GC, tracemalloc y ORM"""
+    overview: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "gc_counts": gc.get_count(),
+        "gc_objects": len(gc.get_objects()),
+        "tracemalloc": tracing_status(),
+        "orm": orm_statistics(),
+    }
+    try:
+        import resource
+        # ru_maxrss está en KB en Linux
+        overview["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass  # Windows
+    return overview
@@ -0,0 +1,345 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Implementación mínima sin dependencias externas:
+- Counter, Gauge e Histogram con etiquetas
+- Registro global que se serializa en GET /metrics
+- Thread-safe (las rutas síncronas corren en el threadpool)
+
+El costo de registrar una observación es un lock y una búsqueda binaria,
+y el costo de un scrape es proporcional al número de series, no al tráfico.
+"""
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto de Prometheus (en segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ==================== TIPOS DE MÉTRICA ====================
+
+class _Metric:
+    """Base para métricas con etiquetas"""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values: str):
+        """Obtener la serie hija para los valores de etiqueta dados"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        """Serie sin etiquetas"""
+        return self.labels()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for key, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self, name, labelnames, labelvalues):
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self._value)}"]
+
+
+class Counter(_Metric):
+    """Contador monotónico"""
+
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Calcular el valor al momento del scrape"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function else self._value
+
+    def render(self, name, labelnames, labelvalues):
+        try:
+            value = self.value
+        except Exception:
+            return []
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    """Valor que puede subir y bajar"""
+
+    TYPE = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def render(self, name, labelnames, labelvalues):
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._upper_bounds + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+        labels = _format_labels(labelnames, labelvalues)
+        lines.append(f"{name}_sum{labels} {_format_value(total_sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histograma con buckets acumulativos"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+
+# ==================== REGISTRO ====================
+
+class MetricsRegistry:
+    """Registro de métricas que se exponen en /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Serializar todas las métricas en formato de texto de Prometheus"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ==================== MÉTRICAS DE LA APLICACIÓN ====================
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "scis_http_request_duration_seconds",
+    "Latencia de requests HTTP por plantilla de ruta y clase de status",
+    ["method", "route", "status_class"],
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "scis_http_requests_in_flight",
+    "Requests HTTP en proceso",
+)
+DB_QUERIES = REGISTRY.counter(
+    "scis_db_queries_total",
+    "Sentencias SQL ejecutadas por tipo",
+    ["statement"],
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "scis_db_query_duration_seconds",
+    "Duración de sentencias SQL por tipo",
+    ["statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_POOL_SIZE = REGISTRY.gauge("scis_db_pool_size", "Tamaño configurado del pool de conexiones")
+DB_POOL_CHECKED_OUT = REGISTRY.gauge("scis_db_pool_checked_out", "Conexiones del pool en uso")
+DB_POOL_OVERFLOW = REGISTRY.gauge("scis_db_pool_overflow", "Conexiones abiertas por encima de pool_size")
+DB_POOL_CHECKOUTS = REGISTRY.counter("scis_db_pool_checkouts_total", "Conexiones obtenidas del pool")
+DB_POOL_SATURATED = REGISTRY.counter(
+    "scis_db_pool_saturated_checkouts_total",
+    "Checkouts que dejaron el pool sin conexiones libres (los siguientes deben esperar)",
+)
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "scis_event_loop_lag_seconds",
+    "Retraso del event loop respecto al tick programado",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_QUANTILE = REGISTRY.gauge(
+    "scis_event_loop_lag_quantile_seconds",
+    "Percentiles del retraso del event loop en la ventana reciente",
+    ["quantile"],
+)
+EVENT_LOOP_BLOCKS = REGISTRY.counter(
+    "scis_event_loop_blocks_total",
+    "Bloqueos del event loop por encima del umbral, por ruta en ejecución",
+    ["route"],
+)
+
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def statement_kind(statement: str) -> str:
+    """Tipo de sentencia SQL (SELECT, INSERT, UPDATE, DELETE u OTHER)"""
+    head = statement.lstrip()[:6].upper()
+    return head if head in _STATEMENT_KINDS else "OTHER"
+
+
+def _observe_query(execution) -> None:
+    kind = statement_kind(execution.statement)
+    DB_QUERIES.labels(kind).inc()
+    DB_QUERY_DURATION.labels(kind).observe(execution.elapsed)
+
+
+def instrument_database(engine) -> None:
+    """
+    Registrar métricas de base de datos para un engine.
+
+    Args:
+        engine: Engine de SQLAlchemy (ver infrastructure/database/session.py)
+    """
+    from sqlalchemy import event
+    from ..database.instrumentation import add_query_observer
+
+    add_query_observer(_observe_query)
+
+    pool = engine.pool
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    if hasattr(pool, "size") and hasattr(pool, "checkedout"):
+        DB_POOL_SIZE.set_function(pool.size)
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        if hasattr(pool, "checkedout") and pool.checkedout() >= pool.size() + max_overflow:
+            DB_POOL_SATURATED.inc()
+
+
+def render_metrics() -> str:
+    """Texto de todas las métricas registradas"""
+    return REGISTRY.render()
@@ -0,0 +1,339 @@
+"""
+Perfilado bajo demanda de una request individual (solo administradores).
+
+Un administrador agrega el header `X-Profile: 1` (o el parámetro
+`?profile=1`) a una request y esta se ejecuta bajo cProfile. El resultado (funciones con mayor tiempo acumulado,
+tiempo SQL vs tiempo Python) se guarda en memoria y se consulta en
+GET /admin/profiles/{profile_id}. La respuesta incluye los headers
+X-Profile-Id, X-Profile-Total-Ms y X-Profile-SQL-Ms.
+
+cProfile es global al proceso (en Python 3.12+ usa sys.monitoring y solo
+admite un perfilador activo): se perfila una request a la vez. Si ya hay
+otra en curso, o si otra herramienta ocupa el perfilador, la request se
+ejecuta sin perfilar y responde X-Profile-Skipped con el motivo.
+
+Diseño:
+- ProfilingMiddleware valida el header y el rol de administrador (en el
+  threadpool: consulta la base de datos).
+- ProfilingRoute envuelve cada endpoint: el perfilador se activa en el hilo
+  que realmente ejecuta el endpoint (las rutas síncronas corren en el
+  threadpool, fuera del hilo del event loop).
+- Sin el header el costo es leer un ContextVar por request.
+
+Configuración:
+- PROFILE_STORE_SIZE: perfiles guardados en memoria (default 20)
+- PROFILE_OUTPUT_DIR: si se define, guarda también el .prof (pstats) en disco
+"""
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from ..database.query_counter import current_query_stats
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+_ENABLED_VALUES = ("1", "true")
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "20"))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR")
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+# Una request perfilada a la vez (cProfile no admite perfiladores concurrentes)
+_profiling_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Perfil de una request: estadísticas de cProfile y tiempos"""
+
+    def __init__(self, method: str, path: str, username: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.username = username
+        self.created_at = datetime.utcnow()
+        self.total_time = 0.0
+        self.sql_time = 0.0
+        self.sql_queries = 0
+        # Motivo por el que no se pudo perfilar (X-Profile-Skipped)
+        self.skipped: Optional[str] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def add(self, profiler: cProfile.Profile) -> None:
+        """Agregar las estadísticas de una ejecución perfilada"""
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler, stream=io.StringIO())
+            else:
+                self._stats.add(profiler)
+
+    def top_functions(self, limit: int = 30, sort_by: str = "cumulative") -> List[Dict[str, Any]]:
+        """Funciones con mayor tiempo acumulado (o propio, sort_by='tottime')"""
+        if self._stats is None:
+            return []
+        index = 3 if sort_by == "cumulative" else 2
+        rows = sorted(self._stats.stats.items(), key=lambda item: item[1][index], reverse=True)
+        return [
+            {
+                "function": function_name,
+                "file": f"{filename}:{line}",
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "own_ms": round(own_time * 1000, 3),
+                "cumulative_ms": round(cumulative_time * 1000, 3),
+            }
+            for (filename, line, function_name), (primitive_calls, calls, own_time, cumulative_time, _)
+            in rows[:limit]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "username": self.username,
+            "created_at": self.created_at.isoformat(),
+            "total_ms": round(self.total_time * 1000, 3),
+            "sql_ms": round(self.sql_time * 1000, 3),
+            "python_ms": round(max(self.total_time - self.sql_time, 0) * 1000, 3),
+            "sql_queries": self.sql_queries,
+        }
+
+    def to_dict(self, limit: int = 30, sort_by: str = "cumulative") -> Dict[str, Any]:
+        return {**self.summary(), "top_functions": self.top_functions(limit, sort_by)}
+
+    def dump(self, directory: str) -> Optional[str]:
+        """Guardar el perfil en formato pstats (.prof) para snakeviz, etc."""
+        if self._stats is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.created_at:%Y%m%dT%H%M%S}_{self.id}.prof")
+        self._stats.dump_stats(path)
+        return path
+
+
+class ProfileStore:
+    """Perfiles recientes en memoria (los más antiguos se descartan)"""
+
+    def __init__(self, max_size: int = PROFILE_STORE_SIZE):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.summary() for profile in reversed(profiles)]
+
+
+profile_store = ProfileStore()
+
+
+# ==================== ENVOLTURA DE ENDPOINTS ====================
+
+def _start_profiler(profile: RequestProfile) -> Optional[cProfile.Profile]:
+    """Activar cProfile; None si otra herramienta ya tiene un perfilador activo"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+: "Another profiling tool is already active"
+        profile.skipped = "profiler-in-use"
+        return None
+    return profiler
+
+
+def profiled_endpoint(endpoint: Callable) -> Callable:
+    """
+    Envolver un endpoint para perfilarlo cuando la request lo solicita.
+    Conserva la firma (FastAPI la lee vía __wrapped__) y el tipo sync/async.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            # En el event loop cProfile también ve otras tareas concurrentes
+            profiler = _start_profiler(profile)
+            if profiler is None:
+                return await endpoint(*args, **kwargs)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+                profile.add(profiler)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profiler = _start_profiler(profile)
+        if profiler is None:
+            return endpoint(*args, **kwargs)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add(profiler)
+    return sync_wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """
+    Clase de ruta que permite perfilar endpoints bajo demanda.
+
+    Uso:
+        app.router.route_class = ProfilingRoute  # antes de declarar rutas
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+
+# ==================== MIDDLEWARE ====================
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def _profile_requested(scope) -> bool:
+    """La request pide perfilado por header o por parámetro de query"""
+    header = _header(scope, PROFILE_HEADER)
+    if header is not None and header.decode("latin-1").lower() in _ENABLED_VALUES:
+        return True
+    query_string = scope.get("query_string", b"")
+    if PROFILE_QUERY_PARAM.encode() not in query_string:
+        return False
+    values = parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+    return any(value.lower() in _ENABLED_VALUES for value in values)
+
+
+def _admin_username(scope) -> Optional[str]:
+    """
+    Validar que la request venga de un administrador activo.
+    Aplica la misma regla que require_admin (rol admin en base de datos),
+    porque el middleware corre antes de la inyección de dependencias.
+    """
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.startswith(b"Bearer "):
+        return None
+
+    from ..auth.jwt_handler import JWTHandler
+    from ..database.models import User, UserRole
+    from ..database.session import SessionLocal
+
+    try:
+        payload = JWTHandler.verify_token(authorization[7:].decode())
+    except Exception:
+        return None
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == payload.get("user_id")).first()
+        if user is None or not user.is_active or not user.has_permission(UserRole.ADMIN):
+            return None
+        return user.username
+    finally:
+        db.close()
+
+
+def _with_headers(send, extra_headers: List[Tuple[bytes, bytes]]):
+    """Envolver send para agregar headers al inicio de la respuesta"""
+    async def send_with_headers(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), *extra_headers]}
+        await send(message)
+    return send_with_headers
+
+
+class ProfilingMiddleware:
+    """
+    Activa el perfilado de la request si trae X-Profile (o ?profile=1)
+    y es de un administrador; cualquier otra request pasa sin cambios.
+    Si ya se está perfilando otra request, esta pasa sin perfilar con
+    X-Profile-Skipped: busy.
+    Debe registrarse dentro de QueryCountMiddleware para separar el tiempo SQL;
+    la consulta que valida al administrador queda fuera del perfil.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        username = await run_in_threadpool(_admin_username, scope)
+        if username is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not _profiling_lock.acquire(blocking=False):
+            await self.app(scope, receive, _with_headers(send, [(b"x-profile-skipped", b"busy")]))
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], username)
+        # La consulta del administrador ya se contó: el SQL del perfil empieza aquí
+        stats = current_query_stats()
+        sql_baseline = (stats.count, stats.total_time) if stats is not None else (0, 0.0)
+        token = _active_profile.set(profile)
+        start_time = time.perf_counter()
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if profile.skipped is not None:
+                    headers.append((b"x-profile-skipped", profile.skipped.encode()))
+                else:
+                    self._finish(profile, start_time, sql_baseline)
+                    headers.append((b"x-profile-id", profile.id.encode()))
+                    headers.append((b"x-profile-total-ms", f"{profile.total_time * 1000:.2f}".encode()))
+                    headers.append((b"x-profile-sql-ms", f"{profile.sql_time * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _active_profile.reset(token)
+            _profiling_lock.release()
+
+    @staticmethod
+    def _finish(profile: RequestProfile, start_time: float, sql_baseline: Tuple[int, float]) -> None:
+        profile.total_time = time.perf_counter() - start_time
+        stats = current_query_stats()
+        if stats is not None:
+            profile.sql_queries = stats.count - sql_baseline[0]
+            profile.sql_time = stats.total_time - sql_baseline[1]
+        profile_store.add(profile)
+        if PROFILE_OUTPUT_DIR:
+            profile.dump(PROFILE_OUTPUT_DIR)
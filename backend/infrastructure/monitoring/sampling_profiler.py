@@ -0,0 +1,354 @@
+"""
+Profiler por muestreo continuo (todas las threads del proceso).
+
+Un hilo daemon toma el stack de cada thread con sys._current_frames() a una
+frecuencia fija y acumula los stacks colapsados en ventanas de tiempo.
+Pensado para correr siempre en los workers de uvicorn:
+- Costo proporcional a la frecuencia, no al tráfico
+- Memoria acotada: ventanas limitadas y stacks distintos limitados por ventana
+- Las threads en espera (threadpool ocioso, selector del event loop) se omiten
+
+Exportación por ventana:
+- Formato "collapsed" (flamegraph.pl, speedscope, inferno)
+- Formato speedscope JSON (https://www.speedscope.app)
+
+Configuración (variables de entorno):
+- SAMPLING_PROFILER_ENABLED: true para iniciarlo con la aplicación
+- SAMPLING_PROFILER_HZ: muestras por segundo (default 100)
+- SAMPLING_PROFILER_WINDOW_SECONDS: duración de cada ventana (default 60)
+- SAMPLING_PROFILER_MAX_WINDOWS: ventanas cerradas en memoria (default 10)
+- SAMPLING_PROFILER_MAX_STACKS: stacks distintos por ventana (default 5000)
+- SAMPLING_PROFILER_OUTPUT_DIR: si se define, cada ventana cerrada se guarda en disco
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+SAMPLING_PROFILER_ENABLED = os.getenv("SAMPLING_PROFILER_ENABLED", "false").lower() == "true"
+SAMPLING_PROFILER_HZ = float(os.getenv("SAMPLING_PROFILER_HZ", "100"))
+SAMPLING_PROFILER_WINDOW_SECONDS = float(os.getenv("SAMPLING_PROFILER_WINDOW_SECONDS", "60"))
+SAMPLING_PROFILER_MAX_WINDOWS = int(os.getenv("SAMPLING_PROFILER_MAX_WINDOWS", "10"))
+SAMPLING_PROFILER_MAX_STACKS = int(os.getenv("SAMPLING_PROFILER_MAX_STACKS", "5000"))
+SAMPLING_PROFILER_OUTPUT_DIR = os.getenv("SAMPLING_PROFILER_OUTPUT_DIR")
+
+# Profundidad máxima de stack registrada (los frames más profundos se cortan)
+MAX_STACK_DEPTH = 128
+
+# Stacks que superan MAX_STACKS en una ventana se agrupan aquí
+TRUNCATED_STACK = "[stacks truncados]"
+
+# Funciones hoja que indican una thread en espera (no consume CPU)
+IDLE_FUNCTIONS = frozenset({
+    "Condition.wait",
+    "Event.wait",
+    "Queue.get",
+    "SimpleQueue.get",
+    "EpollSelector.select",
+    "KqueueSelector.select",
+    "PollSelector.select",
+    "SelectSelector.select",
+    "DevpollSelector.select",
+})
+
+
+class ProfileWindow:
+    """Muestras acumuladas en un intervalo de tiempo"""
+
+    def __init__(self, window_id: int, interval: float, max_stacks: int):
+        self.id = window_id
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.samples: Counter = Counter()
+        self.total_samples = 0
+        self.truncated_samples = 0
+
+    def add(self, stack: str) -> None:
+        if stack not in self.samples and len(self.samples) >= self.max_stacks:
+            stack = TRUNCATED_STACK
+            self.truncated_samples += 1
+        self.samples[stack] += 1
+        self.total_samples += 1
+
+    @property
+    def duration(self) -> float:
+        return (self.ended_at or time.time()) - self.started_at
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "started_at": datetime.utcfromtimestamp(self.started_at).isoformat(),
+            "ended_at": datetime.utcfromtimestamp(self.ended_at).isoformat() if self.ended_at else None,
+            "duration_seconds": round(self.duration, 3),
+            "samples": self.total_samples,
+            "distinct_stacks": len(self.samples),
+            "truncated_samples": self.truncated_samples,
+        }
+
+    def to_collapsed(self) -> str:
+        """Formato collapsed: 'frame;frame;frame cantidad' por línea"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """Formato speedscope (perfil "sampled" con pesos en segundos)"""
+        frame_index: Dict[str, int] = {}
+        frames: List[Dict[str, Any]] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        for stack, count in self.samples.items():
+            indices = []
+            for name in stack.split(";"):
+                index = frame_index.get(name)
+                if index is None:
+                    index = frame_index[name] = len(frames)
+                    frames.append(_speedscope_frame(name))
+                indices.append(index)
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        name = f"scis-api ventana {self.id} ({self.summary()['started_at']})"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "scis-sampling-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _speedscope_frame(name: str) -> Dict[str, Any]:
+    # "Clase.metodo (archivo.py:linea)" -> name, file, line
+    if name.endswith(")") and " (" in name:
+        function, location = name[:-1].rsplit(" (", 1)
+        file, _, line = location.rpartition(":")
+        if line.isdigit():
+            return {"name": function, "file": file, "line": int(line)}
+    return {"name": name}
+
+
+class SamplingProfiler:
+    """
+    Muestreador de stacks de todas las threads.
+
+    Uso:
+        profiler = SamplingProfiler(hz=100)
+        profiler.start()
+        ...
+        print(profiler.latest_window().to_collapsed())
+    """
+
+    def __init__(
+        self,
+        hz: float = SAMPLING_PROFILER_HZ,
+        window_seconds: float = SAMPLING_PROFILER_WINDOW_SECONDS,
+        max_windows: int = SAMPLING_PROFILER_MAX_WINDOWS,
+        max_stacks: int = SAMPLING_PROFILER_MAX_STACKS,
+        output_dir: Optional[str] = SAMPLING_PROFILER_OUTPUT_DIR,
+        include_idle: bool = False
+    ):
+        self.interval = 1.0 / hz
+        self.window_seconds = window_seconds
+        self.max_stacks = max_stacks
+        self.output_dir = output_dir
+        self.include_idle = include_idle
+
+        self._windows: Deque[ProfileWindow] = deque(maxlen=max_windows)
+        self._current: Optional[ProfileWindow] = None
+        self._next_window_id = 1
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Nombres de frame por code object (evita formatear en cada muestra)
+        self._frame_names: Dict[Any, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._sampling_time = 0.0
+        self._started_monotonic: Optional[float] = None
+
+    # ==================== CICLO DE VIDA ====================
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Iniciar el muestreo en un hilo daemon (idempotente)"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._sampling_time = 0.0
+        self._started_monotonic = time.monotonic()
+        with self._lock:
+            self._current = self._new_window()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detener el muestreo y cerrar la ventana en curso"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        with self._lock:
+            self._rotate(open_new=False)
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        window_deadline = time.monotonic() + self.window_seconds
+        next_sample = time.monotonic()
+
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            self._sample(own_ident)
+            self._sampling_time += time.perf_counter() - started
+
+            now = time.monotonic()
+            if now >= window_deadline:
+                with self._lock:
+                    self._rotate(open_new=True)
+                window_deadline = now + self.window_seconds
+
+            # Frecuencia fija; si el muestreo se atrasa no se acumulan muestras
+            next_sample = max(next_sample + self.interval, now)
+            self._stop_event.wait(next_sample - now)
+
+    # ==================== MUESTREO ====================
+
+    def _sample(self, own_ident: int) -> None:
+        frames = sys._current_frames()
+        stacks = []
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+            stack = self._collapse(ident, frame)
+            if stack is not None:
+                stacks.append(stack)
+        del frames
+
+        with self._lock:
+            window = self._current
+            if window is None:
+                return
+            for stack in stacks:
+                window.add(stack)
+
+    def _collapse(self, ident: int, frame) -> Optional[str]:
+        names = []
+        depth = 0
+        while frame is not None and depth < MAX_STACK_DEPTH:
+            code = frame.f_code
+            name = self._frame_names.get(code)
+            if name is None:
+                name = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                self._frame_names[code] = name
+            names.append(name)
+            frame = frame.f_back
+            depth += 1
+
+        if not names:
+            return None
+        if not self.include_idle and names[0].split(" (", 1)[0] in IDLE_FUNCTIONS:
+            return None
+
+        names.append(self._thread_name(ident))
+        names.reverse()
+        return ";".join(names)
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(ident, f"thread-{ident}")
+        # Agrupar threads equivalentes del threadpool (AnyIO worker thread, ThreadPoolExecutor-0_3, ...)
+        return name.rstrip("0123456789").rstrip("-_ ") or name
+
+    # ==================== VENTANAS ====================
+
+    def _new_window(self) -> ProfileWindow:
+        window = ProfileWindow(self._next_window_id, self.interval, self.max_stacks)
+        self._next_window_id += 1
+        return window
+
+    def _rotate(self, open_new: bool) -> None:
+        """Cerrar la ventana en curso (requiere self._lock)"""
+        window = self._current
+        self._current = self._new_window() if open_new else None
+        if window is None:
+            return
+        window.ended_at = time.time()
+        self._windows.append(window)
+        # Las threads terminadas dejan de existir: reconstruir en la próxima muestra
+        self._thread_names = {}
+        if self.output_dir and window.total_samples:
+            self._write(window)
+
+    def _write(self, window: ProfileWindow) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.utcfromtimestamp(window.started_at).strftime("%Y%m%dT%H%M%S")
+            path = os.path.join(self.output_dir, f"{stamp}_{os.getpid()}_{window.id}.collapsed")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(window.to_collapsed())
+        except OSError as e:
+            print(f"  Error al guardar ventana de profiling: {e}")
+
+    def windows(self) -> List[ProfileWindow]:
+        """Ventanas cerradas (más antigua primero) y la ventana en curso"""
+        with self._lock:
+            windows = list(self._windows)
+            if self._current is not None:
+                windows.append(self._current)
+        return windows
+
+    def get_window(self, window_id: Optional[int] = None) -> Optional[ProfileWindow]:
+        """Ventana por id; sin id, la última cerrada (o la en curso si no hay)"""
+        with self._lock:
+            if window_id is None:
+                if self._windows:
+                    return self._windows[-1]
+                return self._current
+            if self._current is not None and self._current.id == window_id:
+                return self._current
+            for window in self._windows:
+                if window.id == window_id:
+                    return window
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started_monotonic if self._started_monotonic else 0.0
+        return {
+            "running": self.running,
+            "hz": round(1.0 / self.interval, 2),
+            "window_seconds": self.window_seconds,
+            "max_stacks": self.max_stacks,
+            "output_dir": self.output_dir,
+            # Fracción del tiempo de pared dedicada a muestrear (con el GIL tomado)
+            "overhead_ratio": round(self._sampling_time / elapsed, 5) if elapsed else 0.0,
+            "windows": [window.summary() for window in self.windows()],
+        }
+
+
+sampling_profiler = SamplingProfiler()
+
+
+def export_window(window: ProfileWindow, fmt: str = "collapsed") -> Tuple[str, str]:
+    """Serializar una ventana: (contenido, media type)"""
+    if fmt == "speedscope":
+        return json.dumps(window.to_speedscope()), "application/json"
+    return window.to_collapsed(), "text/plain; charset=utf-8"
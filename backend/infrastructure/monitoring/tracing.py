@@ -0,0 +1,507 @@
+"""
+Tracing local por spans con exportación a archivo JSONL.
+
+Cada request recibe un id de correlación (X-Request-ID entrante o uno nuevo)
+que aparece en los logs (StructuredFormatter) y en la respuesta. Una fracción
+de las requests (TRACE_SAMPLE_RATE) se traza completa:
+
+    HTTP POST /movements/
+    └── middleware CORSMiddleware
+        └── middleware QueryCountMiddleware
+            └── route /movements/
+                ├── dependencies            (resolución de Depends + body)
+                └── endpoint create_movement
+                    └── use_case create_movement
+                        ├── repository Product.find_by_id
+                        │   └── sql SELECT
+                        └── repository InventoryMovement.save
+                            └── sql INSERT / UPDATE
+
+Las trazas muestreadas se escriben en TRACE_EXPORT_PATH, una línea JSON por
+span, desde un hilo aparte para no bloquear el event loop. Sin muestreo, el
+costo por span es leer un ContextVar.
+
+Configuración (variables de entorno):
+- TRACE_SAMPLE_RATE: fracción de requests trazadas (default 0 = ninguna; por ejemplo 0.01)
+- TRACE_EXPORT_PATH: archivo JSONL de salida (default logs/traces.jsonl)
+- TRACE_MAX_SPANS: spans por traza antes de descartar (default 500)
+"""
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from ..database.instrumentation import QueryExecution, add_query_observer
+from ..logging.context import reset_correlation_id, set_correlation_id
+from .metrics import statement_kind
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "logs/traces.jsonl")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+
+CORRELATION_HEADER = b"x-request-id"
+# Ids entrantes aceptados (evita inyectar texto arbitrario en los logs)
+_VALID_CORRELATION_ID = re.compile(r"^[A-Za-z0-9._\-]{1,64}$")
+
+
+class Trace:
+    """Spans de una request y su decisión de muestreo"""
+
+    def __init__(self, correlation_id: str, sampled: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.correlation_id = correlation_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.dropped_spans = 0
+
+    def add(self, span: "Span") -> None:
+        # list.append es atómico: los spans llegan también desde el threadpool
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append(span)
+
+
+class Span:
+    """Operación con nombre, duración y atributos"""
+
+    __slots__ = ("trace", "name", "kind", "span_id", "parent_id", "start_time",
+                 "_start", "duration", "attributes", "status")
+
+    def __init__(self, trace: Trace, name: str, kind: str, parent_id: Optional[str],
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.trace.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "correlation_id": self.trace.correlation_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round(self.start_time * 1000, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+# Inicio del handler de la ruta: el span "dependencies" va de aquí al endpoint
+_handler_started: ContextVar[Optional[float]] = ContextVar("handler_started", default=None)
+
+
+def is_recording() -> bool:
+    """Hay una traza muestreada en el contexto actual"""
+    trace = _current_trace.get()
+    return trace is not None and trace.sampled
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+# ==================== EXPORTACIÓN ====================
+
+class JsonlWriter:
+    """
+    Escribe lotes de registros en un archivo JSONL (un registro por línea).
+    La escritura ocurre en un hilo daemon; si la cola se llena se descartan
+    lotes en lugar de frenar las requests.
+    """
+
+    # Separadores de json.dumps (None = los de por defecto)
+    separators: Optional[tuple] = None
+    max_batches_per_write = 500
+
+    def __init__(self, path: str, max_queue: int = 1000, thread_name: str = "jsonl-writer"):
+        self.path = path
+        self.dropped = 0
+        self._thread_name = thread_name
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, records: List[Dict[str, Any]]) -> bool:
+        """Encolar un lote; False si se descartó por cola llena"""
+        try:
+            self._queue.put_nowait(records)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self._ensure_thread()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Esperar a que se escriban los lotes encolados"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            # Agrupar los lotes pendientes en una sola escritura
+            batches = [self._queue.get()]
+            while len(batches) < self.max_batches_per_write:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                lines = "".join(
+                    json.dumps(record, ensure_ascii=False, default=str, separators=self.separators) + "\n"
+                    for records in batches for record in records
+                )
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError as e:
+                print(f"  Error al escribir {self.path}: {e}")
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+
+class JsonlSpanExporter(JsonlWriter):
+    """Exporta las trazas terminadas, una línea por span"""
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH, max_queue: int = 1000):
+        super().__init__(path, max_queue, thread_name="trace-exporter")
+
+    @property
+    def dropped_traces(self) -> int:
+        return self.dropped
+
+    def export(self, trace: Trace) -> None:
+        spans = [span.to_dict() for span in trace.spans]
+        if trace.dropped_spans and spans:
+            spans[-1]["attributes"]["dropped_spans"] = trace.dropped_spans
+        self.write(spans)
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+
+
+def get_exporter() -> JsonlSpanExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = JsonlSpanExporter()
+    return _exporter
+
+
+def set_exporter(exporter: Optional[JsonlSpanExporter]) -> None:
+    """Reemplazar el exportador (útil en tests o para otro archivo)"""
+    global _exporter
+    _exporter = exporter
+
+
+# ==================== API DE SPANS ====================
+
+def _new_correlation_id(incoming: Optional[str]) -> str:
+    if incoming and _VALID_CORRELATION_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def start_trace(
+    name: str,
+    correlation_id: Optional[str] = None,
+    sampled: Optional[bool] = None,
+    **attributes
+) -> Iterator[Trace]:
+    """
+    Iniciar una traza (normalmente una por request) con su span raíz.
+    El id de correlación queda disponible para los logs aunque no se muestree.
+    """
+    if sampled is None:
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+    trace = Trace(_new_correlation_id(correlation_id), sampled)
+    trace_token = _current_trace.set(trace)
+    correlation_token = set_correlation_id(trace.correlation_id)
+    try:
+        if not sampled:
+            yield trace
+            return
+        with span(name, kind="server", **attributes):
+            yield trace
+    finally:
+        reset_correlation_id(correlation_token)
+        _current_trace.reset(trace_token)
+        if sampled:
+            get_exporter().export(trace)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """
+    Medir un bloque como span hijo del span actual.
+    Fuera de una traza muestreada no hace nada (y entrega None).
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(trace, name, kind, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+def record_span(name: str, kind: str, duration: float, **attributes) -> None:
+    """Registrar un span ya terminado (que acaba ahora y duró `duration` segundos)"""
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return
+    parent = _current_span.get()
+    finished = Span(trace, name, kind, parent.span_id if parent else None, attributes)
+    finished.start_time -= duration
+    finished.duration = duration
+    trace.add(finished)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal") -> Callable:
+    """
+    Decorador que mide cada llamada como span (funciones sync o async).
+
+    Uso:
+        @traced("use_case RegisterMovementUseCase.execute", kind="use_case")
+        def execute(self, request): ...
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not is_recording():
+                    return await func(*args, **kwargs)
+                with span(span_name, kind=kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            if not is_recording():
+                return func(*args, **kwargs)
+            with span(span_name, kind=kind):
+                return func(*args, **kwargs)
+        return sync_wrapper
+    return decorator
+
+
+class TracedProxy:
+    """
+    Envuelve un objeto (repositorio, logger de auditoría, caso de uso) para
+    medir cada llamada a sus métodos públicos sin modificar su clase.
+
+    Uso:
+        repository = TracedProxy(SQLProductRepository(db), "repository")
+    """
+
+    def __init__(self, target: Any, kind: str = "internal", name: Optional[str] = None):
+        self._target = target
+        self._kind = kind
+        self._name = name or type(target).__name__
+
+    def __getattr__(self, attribute: str):
+        value = getattr(self._target, attribute)
+        if attribute.startswith("_") or not callable(value) or not is_recording():
+            return value
+        return traced(f"{self._kind} {self._name}.{attribute}", kind=self._kind)(value)
+
+
+def _observe_query(execution: QueryExecution) -> None:
+    if not is_recording():
+        return
+    record_span(
+        f"sql {statement_kind(execution.statement)}",
+        "sql",
+        execution.elapsed,
+        statement=" ".join(execution.statement.split())[:500],
+        executemany=execution.executemany,
+    )
+
+
+add_query_observer(_observe_query)
+
+
+# ==================== INTEGRACIÓN ASGI / FASTAPI ====================
+
+def traced_middleware(middleware_class: type, name: Optional[str] = None) -> type:
+    """
+    Envolver una clase de middleware para medirla como span.
+
+    Uso:
+        app.add_middleware(traced_middleware(CORSMiddleware), allow_origins=["*"])
+    """
+    span_name = f"middleware {name or middleware_class.__name__}"
+
+    class TracedMiddleware:
+        def __init__(self, app, *args, **kwargs):
+            self.app = middleware_class(app, *args, **kwargs)
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] != "http" or not is_recording():
+                await self.app(scope, receive, send)
+                return
+            with span(span_name, kind="middleware"):
+                await self.app(scope, receive, send)
+
+    TracedMiddleware.__name__ = TracedMiddleware.__qualname__ = f"Traced{middleware_class.__name__}"
+    return TracedMiddleware
+
+
+class TracingMiddleware:
+    """
+    Inicia la traza de cada request (debe ser el middleware más externo).
+    Devuelve el id de correlación en el header X-Request-ID.
+    """
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        # None: TRACE_SAMPLE_RATE en cada request (se puede cambiar en caliente)
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope.get("headers", []):
+            if key == CORRELATION_HEADER:
+                incoming = value.decode("latin-1")
+                break
+
+        sample_rate = TRACE_SAMPLE_RATE if self.sample_rate is None else self.sample_rate
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        with start_trace(f"HTTP {scope['method']}", incoming, sampled,
+                         method=scope["method"], path=scope["path"]) as trace:
+            root = _current_span.get()
+
+            async def send_with_correlation(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((CORRELATION_HEADER, trace.correlation_id.encode()))
+                    message = {**message, "headers": headers}
+                    if root is not None:
+                        root.set_attribute("status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_correlation)
+            finally:
+                if root is not None:
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        root.name = f"HTTP {scope['method']} {route}"
+                        root.set_attribute("route", route)
+
+
+def traced_endpoint(endpoint: Callable) -> Callable:
+    """
+    Envolver un endpoint: registra el span "dependencies" (desde el inicio
+    del handler hasta aquí) y mide el endpoint. Conserva firma y tipo sync/async.
+    """
+    span_name = f"endpoint {endpoint.__name__}"
+
+    def record_dependencies() -> None:
+        started = _handler_started.get()
+        if started is not None:
+            record_span("dependencies", "dependency", time.perf_counter() - started)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            if not is_recording():
+                return await endpoint(*args, **kwargs)
+            record_dependencies()
+            with span(span_name, kind="endpoint"):
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        if not is_recording():
+            return endpoint(*args, **kwargs)
+        record_dependencies()
+        with span(span_name, kind="endpoint"):
+            return endpoint(*args, **kwargs)
+    return sync_wrapper
+
+
+class TracingRoute(APIRoute):
+    """
+    Clase de ruta que agrega spans de ruta, dependencias y endpoint.
+
+    Uso:
+        app.router.route_class = TracingRoute  # antes de declarar rutas
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, traced_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        span_name = f"route {self.path}"
+
+        async def traced_handler(request):
+            if not is_recording():
+                return await handler(request)
+            with span(span_name, kind="route"):
+                token = _handler_started.set(time.perf_counter())
+                try:
+                    return await handler(request)
+                finally:
+                    _handler_started.reset(token)
+
+        return traced_handler
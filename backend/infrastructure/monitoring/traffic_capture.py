@@ -0,0 +1,238 @@
+"""
+Captura de tráfico real para reproducirlo en pruebas de carga.
+
+Con TRAFFIC_CAPTURE_ENABLED=true, TrafficCaptureMiddleware escribe una línea
+JSON compacta por request en TRAFFIC_CAPTURE_PATH con metadatos saneados:
+
+    {"ts":1760812345.123,"method":"POST","route":"/inventory/movement",
+     "path":"/inventory/movement","query":{},"body_type":"json",
+     "body":{"product_id":12,"quantity":5,"movement_type":"OUT","reason":"<str:19>"},
+     "status":201,"duration_ms":18.4,"role":"operator","in_flight":3}
+
+Saneamiento:
+- Nunca se guardan headers (Authorization, cookies) ni el cuerpo de la respuesta
+- Del cuerpo se guarda la forma: números y booleanos se conservan (ids,
+  cantidades), los textos se reemplazan por su largo ("<str:19>") salvo los
+  campos enumerados de TRAFFIC_CAPTURE_KEEP_FIELDS
+- La query sigue la misma regla: se conservan los valores numéricos
+  ("?skip=20") y los de TRAFFIC_CAPTURE_KEEP_FIELDS; el resto, "<str:N>"
+- Campos sensibles (password, token, secret...) se guardan como "<redacted>",
+  también en la query
+- El rol sale de los claims del JWT (sin consultar la base de datos)
+
+ts y in_flight (requests en curso al iniciar) permiten reproducir el ritmo y
+la concurrencia originales con benchmarks/replay_traffic.py. La escritura se
+hace en un hilo aparte (ver JsonlWriter).
+
+Configuración (variables de entorno):
+- TRAFFIC_CAPTURE_ENABLED: activar la captura (default false)
+- TRAFFIC_CAPTURE_PATH: archivo de salida (default logs/traffic.jsonl)
+- TRAFFIC_CAPTURE_SAMPLE_RATE: fracción de requests capturadas (default 1.0)
+- TRAFFIC_CAPTURE_EXCLUDE: prefijos de ruta excluidos, separados por coma
+- TRAFFIC_CAPTURE_KEEP_FIELDS: campos de texto cuyo valor se conserva
+- TRAFFIC_CAPTURE_MAX_BODY_BYTES: cuerpos más grandes se registran solo por tamaño
+"""
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+from .tracing import JsonlWriter
+
+TRAFFIC_CAPTURE_ENABLED = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "logs/traffic.jsonl")
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0"))
+TRAFFIC_CAPTURE_EXCLUDE = tuple(
+    prefix.strip() for prefix in
+    os.getenv("TRAFFIC_CAPTURE_EXCLUDE", "/metrics,/health,/admin,/docs,/redoc,/openapi.json").split(",")
+    if prefix.strip()
+)
+TRAFFIC_CAPTURE_KEEP_FIELDS = frozenset(
+    field.strip() for field in
+    os.getenv("TRAFFIC_CAPTURE_KEEP_FIELDS", "movement_type,unit,role,grant_type,sort_by,key_type,format").split(",")
+    if field.strip()
+)
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "65536"))
+
+REDACTED = "<redacted>"
+_SENSITIVE_MARKERS = ("password", "token", "secret", "authorization", "api_key", "apikey", "cookie")
+# Elementos de una lista que se conservan (el resto se descarta)
+MAX_LIST_ITEMS = 20
+
+
+def is_sensitive(field: str) -> bool:
+    lowered = field.lower()
+    return any(marker in lowered for marker in _SENSITIVE_MARKERS)
+
+
+def body_shape(value: Any, field: Optional[str] = None) -> Any:
+    """Forma saneada de un valor JSON (ver docstring del módulo)"""
+    if field is not None and is_sensitive(field):
+        return REDACTED
+    if isinstance(value, dict):
+        return {key: body_shape(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [body_shape(item, field) for item in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, str):
+        return value if field in TRAFFIC_CAPTURE_KEEP_FIELDS else f"<str:{len(value)}>"
+    return value
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def query_shape(key: str, value: str) -> str:
+    """Forma saneada de un parámetro de query (los valores siempre son texto)"""
+    if is_sensitive(key):
+        return REDACTED
+    if key in TRAFFIC_CAPTURE_KEEP_FIELDS or value.lower() in ("true", "false") or _is_number(value):
+        return value[:200]
+    return f"<str:{len(value)}>"
+
+
+def sanitize_query(query_string: bytes) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True):
+        value = query_shape(key, value)
+        if key in query:
+            previous = query[key]
+            query[key] = (previous if isinstance(previous, list) else [previous]) + [value]
+        else:
+            query[key] = value
+    return query
+
+
+def describe_body(content_type: str, body: bytes, size: int) -> Dict[str, Any]:
+    """Tipo y forma del cuerpo de la request (`body` solo se inspecciona si está completo)"""
+    if not size:
+        return {"body_type": None, "body": None}
+    if size > len(body):
+        return {"body_type": "bytes", "body": {"_bytes": size, "_truncated": True}}
+    if "application/json" in content_type:
+        try:
+            return {"body_type": "json", "body": body_shape(json.loads(body))}
+        except ValueError:
+            return {"body_type": "bytes", "body": {"_bytes": len(body)}}
+    if "application/x-www-form-urlencoded" in content_type:
+        fields = dict(parse_qsl(body.decode("latin-1"), keep_blank_values=True))
+        return {"body_type": "form", "body": body_shape(fields)}
+    return {"body_type": "bytes", "body": {"_bytes": len(body)}}
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def _role(scope) -> Optional[str]:
+    """Rol del token (solo claims; la autorización real la hacen las dependencias)"""
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.startswith(b"Bearer "):
+        return None
+    from ..auth.jwt_handler import JWTHandler
+    try:
+        return JWTHandler.verify_token(authorization[7:].decode()).get("role")
+    except Exception:
+        return "invalid_token"
+
+
+class TrafficCaptureWriter(JsonlWriter):
+    """Archivo de captura: una línea JSON compacta por request"""
+
+    separators = (",", ":")
+
+    def __init__(self, path: str = TRAFFIC_CAPTURE_PATH, max_queue: int = 10000):
+        super().__init__(path, max_queue, thread_name="traffic-capture")
+        self.captured = 0
+
+    def capture(self, record: Dict[str, Any]) -> None:
+        if self.write([record]):
+            self.captured += 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": TRAFFIC_CAPTURE_ENABLED,
+            "path": self.path,
+            "sample_rate": TRAFFIC_CAPTURE_SAMPLE_RATE,
+            "captured": self.captured,
+            "dropped": self.dropped,
+        }
+
+
+traffic_writer = TrafficCaptureWriter()
+
+
+class TrafficCaptureMiddleware:
+    """
+    Registra los metadatos saneados de cada request (muestreadas según
+    sample_rate) al terminar la respuesta. Debe ir cerca del exterior de la
+    pila para que duration_ms sea el tiempo total en el servidor.
+    """
+
+    def __init__(self, app, writer: Optional[TrafficCaptureWriter] = None, sample_rate: Optional[float] = None,
+                 exclude: Optional[List[str]] = None):
+        self.app = app
+        self.writer = writer or traffic_writer
+        self.sample_rate = TRAFFIC_CAPTURE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.exclude = tuple(TRAFFIC_CAPTURE_EXCLUDE if exclude is None else exclude)
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"].startswith(self.exclude)
+                or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        start = time.perf_counter()
+        in_flight = self.in_flight
+        self.in_flight += 1
+        chunks: List[bytes] = []
+        received = 0
+        status_code = 500
+
+        async def receive_and_keep():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received <= TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                    chunks.append(body)
+                else:
+                    chunks.clear()
+            return message
+
+        async def send_and_keep_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_keep_status)
+        finally:
+            self.in_flight -= 1
+            duration = time.perf_counter() - start
+            content_type = (_header(scope, b"content-type") or b"").decode("latin-1")
+            self.writer.capture({
+                "ts": round(started_at, 3),
+                "method": scope["method"],
+                "route": getattr(scope.get("route"), "path", None),
+                "path": scope["path"],
+                "query": sanitize_query(scope.get("query_string", b"")),
+                **describe_body(content_type, b"".join(chunks), received),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "role": _role(scope),
+                "in_flight": in_flight,
+            })
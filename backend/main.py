@@ -1,20 +1,27 @@
 """
 main.py - SCIS API con autenticación JWT completa y movimientos persistentes
 """
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager, nullcontext
+import csv
+import io
+import json
 import uvicorn
 
 # Importar nuestros módulos
 try:
-    from sqlalchemy.orm import Session
-    from infrastructure.database.session import get_db, SessionLocal, create_tables
+    from sqlalchemy.orm import Session, contains_eager, joinedload
+    from infrastructure.database.session import get_db, SessionLocal, create_tables, engine, upgrade_schema
     from infrastructure.database.models import User, Product, UserRole, InventoryMovement
     from infrastructure.auth.jwt_handler import JWTHandler, AuthenticationException
+    from infrastructure.database.event_dispatcher import event_dispatcher, EVENT_DISPATCHER_ENABLED
+    from infrastructure.database.stock_feed import stock_feed, sse_stream, StockFeedFull, MESSAGE_TYPES
     DATABASE_AVAILABLE = True
     AUTH_AVAILABLE = True
 except ImportError as e:
@@ -64,24 +71,108 @@ except ImportError as e:
     class AuthenticationException(Exception):
         pass
 
+# Logging estructurado: JSON en consola y en LOG_FILE (logs/app.log), con un
+# registro por request que procesa scripts/analyze_logs.py
+try:
+    from infrastructure.logging.structured_logger import setup_logging
+    from infrastructure.logging.request_logging import LoggingMiddleware
+    setup_logging()
+    LOGGING_AVAILABLE = True
+except ImportError as e:
+    LOGGING_AVAILABLE = False
+    print(f"  Advertencia: Logging estructurado no disponible - {e}")
+
+# Importar monitoreo (métricas Prometheus)
+try:
+    from infrastructure.monitoring.metrics import render_metrics, instrument_database, CONTENT_TYPE_LATEST
+    from infrastructure.monitoring.http import MetricsMiddleware, QueryCountMiddleware, InstrumentedRoute
+    from infrastructure.monitoring.request_profiler import ProfilingMiddleware, profile_store
+    from infrastructure.monitoring.tracing import TracingMiddleware, traced_middleware, span as trace_span
+    from infrastructure.monitoring.traffic_capture import (
+        TrafficCaptureMiddleware, traffic_writer, TRAFFIC_CAPTURE_ENABLED
+    )
+    from infrastructure.monitoring.sampling_profiler import (
+        sampling_profiler, export_window, SAMPLING_PROFILER_ENABLED
+    )
+    from infrastructure.monitoring.event_loop import event_loop_monitor, EVENT_LOOP_MONITOR_ENABLED
+    from infrastructure.monitoring import memory as memory_diagnostics
+    MONITORING_AVAILABLE = True
+    if DATABASE_AVAILABLE:
+        from infrastructure.database.slow_query import install_slow_query_log
+        instrument_database(engine)
+        install_slow_query_log()
+        memory_diagnostics.install_session_tracking()
+except ImportError as e:
+    MONITORING_AVAILABLE = False
+    print(f"  Advertencia: Monitoreo no disponible - {e}")
+    
+    def trace_span(name, kind="internal", **attributes):
+        """Sin monitoreo los spans no miden nada"""
+        return nullcontext()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Iniciar y detener los monitores y el despachador de eventos del worker"""
+    if DATABASE_AVAILABLE:
+        # Tablas, índices y fila del resumen que los listeners de flush
+        # necesitan (bases creadas con una versión anterior)
+        upgrade_schema()
+    if DATABASE_AVAILABLE and EVENT_DISPATCHER_ENABLED:
+        stock_feed.start()
+        event_dispatcher.start()
+    if MONITORING_AVAILABLE and SAMPLING_PROFILER_ENABLED:
+        sampling_profiler.start()
+    if MONITORING_AVAILABLE and EVENT_LOOP_MONITOR_ENABLED:
+        event_loop_monitor.start(app)
+    yield
+    if MONITORING_AVAILABLE:
+        sampling_profiler.stop()
+        await event_loop_monitor.stop()
+    if DATABASE_AVAILABLE:
+        event_dispatcher.stop()
+        stock_feed.stop()
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="SCIS API - Sistema de Control de Inventario",
     description="API para gestión de inventario con autenticación JWT",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Rutas con tracing y perfilado bajo demanda (X-Profile, solo administradores)
+if MONITORING_AVAILABLE:
+    app.router.route_class = InstrumentedRoute
+
 # Configurar CORS
 app.add_middleware(
-    CORSMiddleware,
+    traced_middleware(CORSMiddleware) if MONITORING_AVAILABLE else CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Log de cada request (método, plantilla de ruta, status y tiempo de proceso)
+if LOGGING_AVAILABLE:
+    app.add_middleware(
+        traced_middleware(LoggingMiddleware) if MONITORING_AVAILABLE else LoggingMiddleware
+    )
+
+# Métricas HTTP (latencia por ruta, requests en proceso),
+# conteo de SQL por request (detección de N+1), perfilado bajo demanda y
+# captura de tráfico opcional (TRAFFIC_CAPTURE_ENABLED).
+# TracingMiddleware va al final (más externo): fija el id de correlación
+if MONITORING_AVAILABLE:
+    app.add_middleware(traced_middleware(ProfilingMiddleware))
+    app.add_middleware(traced_middleware(QueryCountMiddleware))
+    app.add_middleware(traced_middleware(MetricsMiddleware))
+    if TRAFFIC_CAPTURE_ENABLED:
+        app.add_middleware(traced_middleware(TrafficCaptureMiddleware))
+    app.add_middleware(TracingMiddleware)
+
 # Configurar OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token", auto_error=False)
 
@@ -107,6 +198,18 @@ class MovementCreate(BaseModel):
     movement_type: str  # "IN" o "OUT"
     reason: str
 
+class UploadedMovement(BaseModel):
+    client_id: str = Field(..., min_length=1, max_length=64)
+    product_id: int
+    quantity: int
+    movement_type: str  # "IN" o "OUT"
+    reason: str
+    occurred_at: Optional[datetime] = None
+
+class MovementUpload(BaseModel):
+    device_id: str = Field(..., min_length=1, max_length=64)
+    movements: List[UploadedMovement]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -145,6 +248,7 @@ def get_current_user(
             )
         
         user = db.query(User).filter(User.id == user_id).first()
+        db.close()  # El usuario queda cargado; devolver la conexión al pool
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -210,6 +314,16 @@ def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # ==================== ENDPOINTS DE AUTENTICACIÓN ====================
 
 @app.post("/token", response_model=Token)
@@ -233,6 +347,7 @@ def login_for_access_token(
     db = next(get_db())
     
     user = db.query(User).filter(User.username == form_data.username).first()
+    db.close()  # El usuario queda cargado; devolver la conexión al pool
     
     if not user:
         raise HTTPException(
@@ -340,6 +455,8 @@ def get_products(
     except Exception as e:
         print(f"Error al obtener productos: {e}")
         return []
+    finally:
+        db.close()
 
 @app.post("/products/", dependencies=[Depends(require_role("manager"))])
 def create_product(
@@ -401,6 +518,8 @@ def create_product(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear producto: {str(e)}"
         )
+    finally:
+        db.close()
 
 @app.get("/products/{product_id}")
 def get_product(
@@ -450,6 +569,8 @@ def get_product(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener producto: {str(e)}"
         )
+    finally:
+        db.close()
 
 # ==================== ENDPOINTS DE MOVIMIENTOS ====================
 
@@ -490,42 +611,46 @@ def create_movement(
                 detail="La cantidad debe ser mayor a 0"
             )
         
-        product = db.query(Product).filter(Product.id == movement.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Producto con ID {movement.product_id} no encontrado"
-            )
-        
-        previous_stock = product.current_stock
-        
-        if movement.movement_type == "IN":
-            new_stock = previous_stock + movement.quantity
-        else:  # OUT
-            if previous_stock < movement.quantity:
+        # Spans use_case / repository: visibles en las requests trazadas
+        with trace_span("use_case create_movement", kind="use_case"):
+            with trace_span("repository Product.find_by_id", kind="repository"):
+                product = db.query(Product).filter(Product.id == movement.product_id).first()
+            if not product:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente. Disponible: {previous_stock}, Requerido: {movement.quantity}"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Producto con ID {movement.product_id} no encontrado"
                 )
-            new_stock = previous_stock - movement.quantity
-        
-        # Actualizar producto
-        product.current_stock = new_stock
-        
-        # Crear registro de movimiento
-        inventory_movement = InventoryMovement(
-            product_id=movement.product_id,
-            quantity=movement.quantity,
-            movement_type=movement.movement_type,
-            reason=movement.reason,
-            previous_stock=previous_stock,
-            new_stock=new_stock,
-            user_id=current_user.id
-        )
-        
-        db.add(inventory_movement)
-        db.commit()
-        db.refresh(inventory_movement)
+            
+            previous_stock = product.current_stock
+            
+            if movement.movement_type == "IN":
+                new_stock = previous_stock + movement.quantity
+            else:  # OUT
+                if previous_stock < movement.quantity:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Stock insuficiente. Disponible: {previous_stock}, Requerido: {movement.quantity}"
+                    )
+                new_stock = previous_stock - movement.quantity
+            
+            # Actualizar producto
+            product.current_stock = new_stock
+            
+            # Crear registro de movimiento
+            inventory_movement = InventoryMovement(
+                product_id=movement.product_id,
+                quantity=movement.quantity,
+                movement_type=movement.movement_type,
+                reason=movement.reason,
+                previous_stock=previous_stock,
+                new_stock=new_stock,
+                user_id=current_user.id
+            )
+            
+            with trace_span("repository InventoryMovement.save", kind="repository"):
+                db.add(inventory_movement)
+                db.commit()
+                db.refresh(inventory_movement)
         
         return {
             "message": "Movimiento registrado exitosamente",
@@ -551,6 +676,39 @@ def create_movement(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al registrar movimiento: {str(e)}"
         )
+    finally:
+        db.close()
+
+def _movement_columns(movement) -> dict:
+    """Columnas de un movimiento activo (mismo formato que las filas del archivo histórico)"""
+    return {
+        "id": movement.id,
+        "product_id": movement.product_id,
+        "quantity": movement.quantity,
+        "movement_type": movement.movement_type,
+        "reason": movement.reason,
+        "previous_stock": movement.previous_stock,
+        "new_stock": movement.new_stock,
+        "user_id": movement.user_id,
+        "created_at": movement.created_at,
+    }
+
+def _movement_response(row: dict, product: Any, user: Any) -> dict:
+    """Respuesta de GET /movements/ para un movimiento activo o archivado"""
+    return {
+        "id": row["id"],
+        "product_id": row["product_id"],
+        "product_code": product.code if product else None,
+        "product_name": product.name if product else None,
+        "quantity": row["quantity"],
+        "movement_type": row["movement_type"],
+        "reason": row["reason"],
+        "previous_stock": row["previous_stock"],
+        "new_stock": row["new_stock"],
+        "user_id": row["user_id"],
+        "username": user.username if user else None,
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None
+    }
 
 @app.get("/movements/")
 def get_movements(
@@ -568,8 +726,20 @@ def get_movements(
     db = next(get_db())
     
     try:
-        query = db.query(InventoryMovement).join(Product).join(User)
+        from infrastructure.database.movement_archive import MovementArchive, archived_until_subquery
+        
+        # Cargar producto y usuario en el mismo JOIN (evita 2 queries por fila)
+        query = (
+            db.query(InventoryMovement)
+            .join(InventoryMovement.product)
+            .join(InventoryMovement.user)
+            .options(
+                contains_eager(InventoryMovement.product),
+                contains_eager(InventoryMovement.user)
+            )
+        )
         
+        date_limit = None
         if product_id:
             query = query.filter(InventoryMovement.product_id == product_id)
         
@@ -577,33 +747,42 @@ def get_movements(
             date_limit = datetime.utcnow() - timedelta(days=days)
             query = query.filter(InventoryMovement.created_at >= date_limit)
         
-        query = query.order_by(InventoryMovement.created_at.desc())
-        
-        movements = query.offset(skip).limit(limit).all()
-        
-        result = []
-        for movement in movements:
-            result.append({
-                "id": movement.id,
-                "product_id": movement.product_id,
-                "product_code": movement.product.code if movement.product else None,
-                "product_name": movement.product.name if movement.product else None,
-                "quantity": movement.quantity,
-                "movement_type": movement.movement_type,
-                "reason": movement.reason,
-                "previous_stock": movement.previous_stock,
-                "new_stock": movement.new_stock,
-                "user_id": movement.user_id,
-                "username": movement.user.username if movement.user else None,
-                "created_at": movement.created_at.isoformat() if movement.created_at else None
-            })
-        
-        return result
+        query = query.order_by(InventoryMovement.created_at.desc(), InventoryMovement.id.desc())
+        
+        # El archivo solo tiene movimientos anteriores a los activos: se lee
+        # únicamente si la página queda incompleta (el horizonte viene en la
+        # misma consulta)
+        page = query.add_columns(archived_until_subquery()).offset(skip).limit(limit).all()
+        archive = MovementArchive(db)
+        horizon = page[0][1] if page else archive.horizon()
+        if len(page) == limit or horizon is None or (date_limit is not None and date_limit >= horizon):
+            return [
+                _movement_response(_movement_columns(movement), movement.product, movement.user)
+                for movement, _ in page
+            ]
+        
+        # La página llega a meses archivados: se completa con los segmentos
+        # (mismo criterio que SQLAlchemyMovementRepository)
+        wanted = skip + limit
+        rows = [_movement_columns(movement) for movement in query.limit(wanted).all()]
+        for segment in archive.segments(date_limit):
+            if len(rows) >= wanted and rows[wanted - 1]["created_at"] >= segment.period_end:
+                break
+            rows.extend(archive.query(segment, limit=wanted, product_id=product_id or None, start_date=date_limit))
+            rows.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+            del rows[wanted:]
+        rows = rows[skip:]
+        
+        products = {p.id: p for p in db.query(Product).filter(Product.id.in_({row["product_id"] for row in rows}))}
+        users = {u.id: u for u in db.query(User).filter(User.id.in_({row["user_id"] for row in rows}))}
+        return [_movement_response(row, products.get(row["product_id"]), users.get(row["user_id"])) for row in rows]
         
     except Exception as e:
         print(f"Error al obtener movimientos: {e}")
         # Si no existe la tabla, devolver array vacío
         return []
+    finally:
+        db.close()
 
 @app.get("/movements/{movement_id}")
 def get_movement_detail(
@@ -626,27 +805,27 @@ def get_movement_detail(
     db = next(get_db())
     
     try:
-        movement = db.query(InventoryMovement).filter(InventoryMovement.id == movement_id).first()
-        if not movement:
+        movement = (
+            db.query(InventoryMovement)
+            .options(
+                joinedload(InventoryMovement.product),
+                joinedload(InventoryMovement.user)
+            )
+            .filter(InventoryMovement.id == movement_id)
+            .first()
+        )
+        if movement:
+            return _movement_response(_movement_columns(movement), movement.product, movement.user)
+        
+        # Movimiento anterior al horizonte de retención (archivo histórico)
+        from infrastructure.database.movement_archive import MovementArchive
+        archived = MovementArchive(db).find(movement_id)
+        if not archived:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Movimiento con ID {movement_id} no encontrado"
             )
-        
-        return {
-            "id": movement.id,
-            "product_id": movement.product_id,
-            "product_code": movement.product.code if movement.product else None,
-            "product_name": movement.product.name if movement.product else None,
-            "quantity": movement.quantity,
-            "movement_type": movement.movement_type,
-            "reason": movement.reason,
-            "previous_stock": movement.previous_stock,
-            "new_stock": movement.new_stock,
-            "user_id": movement.user_id,
-            "username": movement.user.username if movement.user else None,
-            "created_at": movement.created_at.isoformat() if movement.created_at else None
-        }
+        return _movement_response(archived, db.get(Product, archived["product_id"]), db.get(User, archived["user_id"]))
         
     except HTTPException:
         raise
@@ -655,6 +834,8 @@ def get_movement_detail(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener movimiento: {str(e)}"
         )
+    finally:
+        db.close()
 
 # ==================== ENDPOINTS DE DASHBOARD ====================
 
@@ -672,33 +853,19 @@ def get_dashboard_stats(
         }
     
     from infrastructure.database.session import get_db
-    from sqlalchemy import func
+    from infrastructure.database.stock_summary import read_stock_summary, movements_on
     
     db = next(get_db())
     
     try:
-        # Total productos
-        total_products = db.query(func.count(Product.id)).scalar() or 0
-        
-        # Total movimientos
-        total_movements = db.query(func.count(InventoryMovement.id)).scalar() or 0
-        
-        # Productos con stock bajo
-        low_stock_count = db.query(func.count(Product.id)).filter(
-            Product.current_stock < Product.min_stock
-        ).scalar() or 0
-        
-        # Movimientos de hoy
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_movements = db.query(func.count(InventoryMovement.id)).filter(
-            InventoryMovement.created_at >= today_start
-        ).scalar() or 0
+        # Resumen materializado: dos lecturas por clave primaria en lugar de contar las tablas
+        summary = read_stock_summary(db)
         
         return {
-            "total_products": total_products,
-            "total_movements": total_movements,
-            "low_stock_count": low_stock_count,
-            "today_movements": today_movements
+            "total_products": summary["total_products"],
+            "total_movements": summary["total_movements"],
+            "low_stock_count": summary["low_stock_count"],
+            "today_movements": movements_on(db, datetime.utcnow().date())
         }
         
     except Exception as e:
@@ -709,6 +876,466 @@ def get_dashboard_stats(
             "low_stock_count": 0,
             "today_movements": 0
         }
+    finally:
+        db.close()
+
+
+# ==================== ENDPOINTS DE INVENTARIO HISTÓRICO ====================
+
+@app.get("/inventory/as-of")
+def get_inventory_as_of(
+    timestamp: datetime,
+    product_id: Optional[int] = None,
+    current_user: Any = Depends(get_current_user)
+):
+    """
+    Stock de todos los productos (o de uno) a un instante dado.
+    Parte del punto de control más cercano y aplica solo los movimientos
+    intermedios (ver stock_checkpoints.py).
+    """
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Base de datos no disponible")
+    
+    from infrastructure.database.session import get_db
+    from infrastructure.database.stock_checkpoints import stock_as_of
+    
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    db = next(get_db())
+    
+    try:
+        if product_id is not None and db.get(Product, product_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Producto con ID {product_id} no encontrado"
+            )
+        
+        result = stock_as_of(db, timestamp, product_id)
+        # Solo las columnas de la respuesta (puede ser todo el catálogo)
+        query = db.query(Product.id, Product.code, Product.name, Product.unit)
+        if product_id is not None:
+            query = query.filter(Product.id == product_id)
+        products = {product.id: product for product in query}
+        
+        return {
+            "timestamp": result.timestamp.isoformat(),
+            "baseline": result.baseline,
+            "baseline_at": result.baseline_at.isoformat() if result.baseline_at else None,
+            "movements_applied": result.movements_applied,
+            "total_products": len(result.stocks),
+            "products": [
+                {
+                    "id": pid,
+                    "code": products[pid].code,
+                    "name": products[pid].name,
+                    "unit": products[pid].unit,
+                    "stock": stock
+                }
+                for pid, stock in result.stocks.items()
+            ]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al calcular stock histórico: {str(e)}"
+        )
+    finally:
+        db.close()
+
+
+@app.get("/inventory/products/{product_id}/ledger")
+def get_product_ledger(
+    product_id: int,
+    from_: datetime = Query(..., alias="from"),
+    to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|csv)$"),
+    current_user: Any = Depends(get_current_user)
+):
+    """
+    Estado de cuenta de un producto: saldo inicial, movimientos del rango
+    [from, to] con su saldo acumulado y saldo final. Se transmite mientras
+    se lee, así que sirve para rangos largos (ver product_ledger.py).
+    """
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Base de datos no disponible")
+    
+    from infrastructure.database.session import get_db
+    from infrastructure.database.product_ledger import LEDGER_FIELDS, ProductLedger
+    
+    start = from_.astimezone(timezone.utc).replace(tzinfo=None) if from_.tzinfo else from_
+    end = to or datetime.utcnow()
+    end = end.astimezone(timezone.utc).replace(tzinfo=None) if end.tzinfo else end
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' debe ser posterior a 'from'")
+    
+    db = next(get_db())
+    try:
+        product = db.get(Product, product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Producto con ID {product_id} no encontrado"
+            )
+        ledger = ProductLedger(db, product_id, start, end)
+        header = {
+            "product": {"id": product.id, "code": product.code, "name": product.name, "unit": product.unit},
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "opening_balance": ledger.opening_balance,
+        }
+    except HTTPException:
+        db.close()
+        raise
+    except Exception as e:
+        db.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al generar estado de cuenta: {str(e)}"
+        )
+    
+    def stream_json():
+        try:
+            yield json.dumps(header)[:-1] + ', "movements": ['
+            chunk = []
+            for index, row in enumerate(ledger):
+                chunk.append(("," if index else "") + json.dumps(row))
+                if len(chunk) >= 500:
+                    yield "".join(chunk)
+                    chunk = []
+            yield "".join(chunk)
+            yield f'], "closing_balance": {ledger.closing_balance}, "totals": {json.dumps(ledger.totals())}}}'
+        finally:
+            db.close()
+    
+    def stream_csv():
+        try:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=LEDGER_FIELDS)
+            buffer.write(f"# saldo inicial: {ledger.opening_balance}\n")
+            writer.writeheader()
+            for index, row in enumerate(ledger, 1):
+                writer.writerow(row)
+                if index % 500 == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            buffer.write(f"# saldo final: {ledger.closing_balance}\n")
+            yield buffer.getvalue()
+        finally:
+            db.close()
+    
+    if format == "csv":
+        return StreamingResponse(
+            stream_csv(), media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="ledger-{product.code}.csv"'}
+        )
+    return StreamingResponse(stream_json(), media_type="application/json")
+
+
+# ==================== ENDPOINTS DE SINCRONIZACIÓN ====================
+
+@app.get("/sync")
+def sync_changes(
+    since: Optional[str] = Query(None, description="Cursor de la sincronización anterior (vacío = estado completo)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Cambios por respuesta (default SYNC_PAGE_SIZE)"),
+    current_user: Any = Depends(get_current_user)
+):
+    """
+    Sincronización incremental para clientes offline: productos y movimientos
+    creados o modificados desde `since`, y los ids eliminados. Con
+    has_more=true hay que volver a pedir con el cursor recibido. Un cursor
+    rechazado (400) se resuelve con una sincronización completa (sin since).
+    """
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Base de datos no disponible")
+    
+    from infrastructure.database.session import get_db
+    from infrastructure.database.delta_sync import (
+        SYNC_PAGE_SIZE, InvalidCursor, changes_since, full_sync, parse_cursor
+    )
+    
+    db = next(get_db())
+    try:
+        cursor = parse_cursor(since)
+        if cursor is None:
+            return full_sync(db)
+        return changes_since(db, cursor, limit or SYNC_PAGE_SIZE)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al sincronizar: {str(e)}"
+        )
+    finally:
+        db.close()
+
+
+@app.post("/sync/movements")
+def upload_movements(
+    upload: MovementUpload,
+    current_user: Any = Depends(get_current_user)
+):
+    """
+    Subir la cola de movimientos registrados offline por un dispositivo. Se
+    aplican en orden y en una transacción; cada ítem vuelve como applied,
+    already_applied (client_id ya subido) o rejected (con el motivo), junto
+    con el estado actual de los productos afectados.
+    """
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Base de datos no disponible")
+    
+    from sqlalchemy.exc import IntegrityError
+    from infrastructure.database.session import get_db
+    from infrastructure.database.sync_upload import SYNC_UPLOAD_MAX_ITEMS, apply_uploaded_movements
+    
+    if len(upload.movements) > SYNC_UPLOAD_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {SYNC_UPLOAD_MAX_ITEMS} movimientos por lote"
+        )
+    
+    db = next(get_db())
+    try:
+        return apply_uploaded_movements(
+            db, current_user.id, upload.device_id, [item.model_dump() for item in upload.movements]
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otro lote subió los mismos movimientos al mismo tiempo; reintentar"
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al aplicar movimientos: {str(e)}"
+        )
+    finally:
+        db.close()
+
+
+# ==================== ENDPOINTS EN TIEMPO REAL ====================
+
+@app.get("/inventory/stream")
+async def stream_inventory(
+    request: Request,
+    product_ids: Optional[str] = Query(None, description="IDs de productos separados por coma (default: todos)"),
+    types: Optional[str] = Query(None, description="stock, movement, low_stock separados por coma (default: todos)"),
+    current_user: Any = Depends(get_current_user)
+):
+    """
+    Cambios de stock en tiempo real (Server-Sent Events): stock, movement y
+    low_stock. Un evento resync indica que se descartaron mensajes porque el
+    cliente no los consumía a tiempo; hay que volver a pedir el estado.
+    """
+    if not DATABASE_AVAILABLE or not EVENT_DISPATCHER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Stream de inventario no disponible"
+        )
+    try:
+        ids = frozenset(int(value) for value in product_ids.split(",") if value.strip()) if product_ids else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="product_ids debe ser una lista de enteros")
+    selected = frozenset(value.strip() for value in types.split(",") if value.strip()) if types else MESSAGE_TYPES
+    if not selected or selected - MESSAGE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"types debe contener solo: {', '.join(sorted(MESSAGE_TYPES))}"
+        )
+    try:
+        client = stock_feed.connect(product_ids=ids, types=selected)
+    except StockFeedFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return StreamingResponse(
+        sse_stream(client, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ==================== ENDPOINTS DE ADMINISTRACIÓN ====================
+
+@app.get("/admin/profiles", dependencies=[Depends(require_role("admin"))])
+def list_request_profiles():
+    """Listar perfiles de requests recientes (X-Profile: 1)"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    return {"profiles": profile_store.list()}
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_role("admin"))])
+def get_request_profile(profile_id: str, limit: int = 30, sort_by: str = "cumulative"):
+    """Detalle de un perfil: funciones con mayor tiempo, SQL vs Python"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil no encontrado"
+        )
+    return profile.to_dict(limit=limit, sort_by=sort_by)
+
+@app.get("/admin/sampling-profiler", dependencies=[Depends(require_role("admin"))])
+def get_sampling_profiler_status():
+    """Estado del profiler por muestreo y ventanas disponibles"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    return sampling_profiler.status()
+
+@app.post("/admin/sampling-profiler/start", dependencies=[Depends(require_role("admin"))])
+def start_sampling_profiler():
+    """Iniciar el profiler por muestreo en este worker"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    sampling_profiler.start()
+    return sampling_profiler.status()
+
+@app.post("/admin/sampling-profiler/stop", dependencies=[Depends(require_role("admin"))])
+def stop_sampling_profiler():
+    """Detener el profiler por muestreo en este worker"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    sampling_profiler.stop()
+    return sampling_profiler.status()
+
+@app.get("/admin/sampling-profiler/export", dependencies=[Depends(require_role("admin"))])
+def export_sampling_profile(window_id: Optional[int] = None, format: str = "collapsed"):
+    """
+    Exportar una ventana de muestras (collapsed o speedscope).
+    Sin window_id se exporta la última ventana cerrada.
+    """
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato inválido. Use 'collapsed' o 'speedscope'"
+        )
+    window = sampling_profiler.get_window(window_id)
+    if window is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ventana de muestras no encontrada"
+        )
+    content, media_type = export_window(window, format)
+    extension = "speedscope.json" if format == "speedscope" else "collapsed"
+    return PlainTextResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile_{window.id}.{extension}"'}
+    )
+
+@app.get("/admin/event-loop", dependencies=[Depends(require_role("admin"))])
+def get_event_loop_status():
+    """Lag del event loop (percentiles) y bloqueos recientes con su stack"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    return event_loop_monitor.status()
+
+@app.get("/admin/traffic-capture", dependencies=[Depends(require_role("admin"))])
+def get_traffic_capture_status():
+    """Estado de la captura de tráfico (requests capturadas y descartadas)"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    return traffic_writer.status()
+
+@app.get("/admin/event-dispatcher", dependencies=[Depends(require_role("admin"))])
+def get_event_dispatcher_status():
+    """Suscriptores de los eventos de stock: entregados, fallos y eventos pendientes"""
+    if not DATABASE_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos no disponible"
+        )
+    return {**event_dispatcher.status(), "stock_feed": stock_feed.status()}
+
+
+def _memory_diagnostics_call(function, *args, **kwargs):
+    """Ejecutar una operación de diagnóstico de memoria traduciendo sus errores"""
+    if not MONITORING_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitoreo no disponible"
+        )
+    try:
+        return function(*args, **kwargs)
+    except memory_diagnostics.MemoryDiagnosticsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get("/admin/memory", dependencies=[Depends(require_role("admin"))])
+def get_memory_overview():
+    """Memoria del worker, estado de tracemalloc, sesiones e identity maps"""
+    return _memory_diagnostics_call(memory_diagnostics.memory_overview)
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_role("admin"))])
+def start_memory_tracing(frames: int = 10):
+    """Iniciar tracemalloc (agrega costo a cada asignación mientras está activo)"""
+    return _memory_diagnostics_call(memory_diagnostics.start_tracing, frames)
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_role("admin"))])
+def stop_memory_tracing():
+    """Detener tracemalloc y descartar los snapshots"""
+    return _memory_diagnostics_call(memory_diagnostics.stop_tracing)
+
+@app.post("/admin/memory/snapshots", dependencies=[Depends(require_role("admin"))])
+def take_memory_snapshot(label: str = ""):
+    """Tomar un snapshot de tracemalloc"""
+    return _memory_diagnostics_call(memory_diagnostics.snapshot_store.take, label)
+
+@app.get("/admin/memory/snapshots/{snapshot_id}", dependencies=[Depends(require_role("admin"))])
+def get_memory_snapshot_top(snapshot_id: int, key_type: str = "lineno", limit: int = 20, sort_by: str = "size"):
+    """Sitios de asignación con más memoria (sort_by=size) o más bloques (sort_by=count)"""
+    return {
+        "snapshot_id": snapshot_id,
+        "top": _memory_diagnostics_call(
+            memory_diagnostics.top_allocations, snapshot_id, key_type, limit, sort_by
+        ),
+    }
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_role("admin"))])
+def diff_memory_snapshots(base: int, current: int, key_type: str = "lineno", limit: int = 20, sort_by: str = "size"):
+    """Comparar dos snapshots: dónde creció la memoria entre ambos"""
+    return {
+        "base": base,
+        "current": current,
+        "diff": _memory_diagnostics_call(
+            memory_diagnostics.compare_snapshots, base, current, key_type, limit, sort_by
+        ),
+    }
 
 
 # ==================== PUNTO DE ENTRADA ====================
@@ -0,0 +1,415 @@
+"""
+Script de análisis de logs de requests (latencias por endpoint).
+
+Lee los archivos generados por LoggingMiddleware (logs/app.log y sus
+rotaciones app.log.1, app.log.2.gz, ...) como un stream, línea por línea,
+y calcula por plantilla de ruta y ventana de tiempo:
+- p50, p95 y p99 de latencia
+- Throughput (requests/segundo)
+- Tasa de errores (respuestas 5xx y errores no manejados)
+
+La memoria es constante respecto al tamaño de los logs: cada grupo usa un
+histograma logarítmico de tamaño acotado en lugar de guardar cada latencia.
+
+Uso:
+    python scripts/analyze_logs.py
+    python scripts/analyze_logs.py --bucket 15m --route "GET /products/"
+    python scripts/analyze_logs.py --baseline 2026-01-10T00:00,2026-01-11T00:00 \\
+                                   --candidate 2026-01-11T00:00,2026-01-12T00:00
+"""
+import argparse
+import bz2
+import glob
+import gzip
+import json
+import lzma
+import math
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Extensiones de compresión soportadas
+OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+# Acciones que registra LoggingMiddleware al finalizar una request
+COMPLETE_ACTIONS = {"request_complete", "request_error"}
+
+# Segmentos de path que se reemplazan por un parámetro en la plantilla
+ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
+)
+
+BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Los timestamps del log son UTC sin zona horaria (datetime.utcnow)
+EPOCH = datetime(1970, 1, 1)
+
+
+# ==================== HISTOGRAMA DE LATENCIAS ====================
+
+class LatencyHistogram:
+    """
+    Histograma logarítmico de latencias con memoria acotada.
+
+    Cada bucket cubre un rango [gamma^i, gamma^(i+1)) de milisegundos, por lo
+    que el error relativo de los percentiles es menor a (gamma - 1).
+    """
+
+    GAMMA = 1.02
+    MIN_MS = 0.01
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._log_gamma = math.log(self.GAMMA)
+
+    def add(self, latency_ms: float, is_error: bool = False) -> None:
+        """Registrar una latencia en milisegundos"""
+        value = max(latency_ms, self.MIN_MS)
+        index = int(math.log(value / self.MIN_MS) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        if is_error:
+            self.errors += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Obtener el percentil p (0-100) en milisegundos.
+
+        Returns:
+            float: Punto medio geométrico del bucket que contiene el percentil
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low = self.MIN_MS * self.GAMMA ** index
+                return min(low * math.sqrt(self.GAMMA), self.max_ms)
+        return self.max_ms
+
+    def summary(self, seconds: float) -> dict:
+        """Resumen estadístico del histograma para una ventana de `seconds`"""
+        return {
+            "count": self.count,
+            "throughput_rps": round(self.count / seconds, 4) if seconds > 0 else 0.0,
+            "error_rate": round(self.errors / self.count, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+        }
+
+
+# ==================== LECTURA DE LOGS ====================
+
+def _rotation_key(path: str) -> Tuple[str, int]:
+    """
+    Ordenar archivos del más antiguo al más reciente.
+    RotatingFileHandler usa app.log.N donde N mayor es más antiguo.
+    """
+    name = os.path.basename(path)
+    for ext in OPENERS:
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    match = re.match(r"^(.*\.log)\.(\d+)$", name)
+    if match:
+        return match.group(1), -int(match.group(2))
+    return name, 0
+
+
+def find_log_files(pattern: str) -> List[str]:
+    """Encontrar archivos de log (incluyendo rotados y comprimidos)"""
+    files = [path for path in glob.glob(pattern) if os.path.isfile(path)]
+    return sorted(files, key=_rotation_key)
+
+
+def open_log(path: str):
+    """Abrir un archivo de log en modo texto, descomprimiendo si aplica"""
+    opener = OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, "rt", encoding="utf-8", errors="replace")
+
+
+def iter_requests(paths: List[str]) -> Iterator[dict]:
+    """Iterar registros de requests completadas, una línea a la vez"""
+    for path in paths:
+        with open_log(path) as handle:
+            for line in handle:
+                if '"request_' not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("action") in COMPLETE_ACTIONS:
+                    yield record
+
+
+def route_template(record: dict) -> str:
+    """
+    Obtener la plantilla de ruta de un registro.
+    Usa el campo `route` si existe; si no, reemplaza segmentos numéricos por {id}.
+    """
+    method = record.get("method", "?")
+    route = record.get("route")
+    if not route:
+        path = record.get("path") or urlsplit(record.get("url", "")).path or "/"
+        route = "/".join(
+            "{id}" if ID_SEGMENT.match(segment) else segment
+            for segment in path.split("/")
+        )
+    return f"{method} {route}"
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parsear timestamp ISO 8601 del log"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", ""))
+    except ValueError:
+        return None
+
+
+def parse_bucket(value: str) -> int:
+    """Convertir '15m', '1h', '30s' a segundos"""
+    match = re.match(r"^(\d+)([smhd])$", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Ventana inválida: {value} (ej: 30s, 15m, 1h, 1d)")
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def parse_window(value: str) -> Tuple[datetime, datetime]:
+    """Convertir 'INICIO,FIN' (ISO 8601) a tupla de datetimes"""
+    try:
+        start, end = (datetime.fromisoformat(part.strip()) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ventana inválida: {value} (formato: INICIO,FIN en ISO 8601)")
+    if end <= start:
+        raise argparse.ArgumentTypeError(f"La ventana debe terminar después de iniciar: {value}")
+    return start, end
+
+
+def _is_error(record: dict) -> bool:
+    if record.get("action") == "request_error":
+        return True
+    return int(record.get("status_code") or 0) >= 500
+
+
+def _latency_ms(record: dict) -> Optional[float]:
+    try:
+        return float(record["process_time"]) * 1000
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# ==================== AGREGACIÓN ====================
+
+def aggregate_by_bucket(
+    records: Iterator[dict],
+    bucket_seconds: int,
+    route_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[Tuple[str, datetime], LatencyHistogram]:
+    """Agrupar latencias por (ruta, inicio de ventana)"""
+    groups: Dict[Tuple[str, datetime], LatencyHistogram] = {}
+    for record in records:
+        latency = _latency_ms(record)
+        timestamp = parse_timestamp(record.get("timestamp"))
+        if latency is None or timestamp is None:
+            continue
+        if (since and timestamp < since) or (until and timestamp >= until):
+            continue
+        route = route_template(record)
+        if route_filter and route_filter not in route:
+            continue
+        epoch = int((timestamp - EPOCH).total_seconds())
+        bucket_start = EPOCH + timedelta(seconds=epoch - epoch % bucket_seconds)
+        key = (route, bucket_start)
+        if key not in groups:
+            groups[key] = LatencyHistogram()
+        groups[key].add(latency, _is_error(record))
+    return groups
+
+
+def aggregate_windows(
+    records: Iterator[dict],
+    baseline: Tuple[datetime, datetime],
+    candidate: Tuple[datetime, datetime],
+    route_filter: Optional[str] = None,
+) -> Tuple[Dict[str, LatencyHistogram], Dict[str, LatencyHistogram]]:
+    """Agrupar latencias por ruta para dos ventanas de tiempo en una sola pasada"""
+    windows = ({}, {})
+    for record in records:
+        latency = _latency_ms(record)
+        timestamp = parse_timestamp(record.get("timestamp"))
+        if latency is None or timestamp is None:
+            continue
+        route = route_template(record)
+        if route_filter and route_filter not in route:
+            continue
+        for (start, end), groups in zip((baseline, candidate), windows):
+            if start <= timestamp < end:
+                if route not in groups:
+                    groups[route] = LatencyHistogram()
+                groups[route].add(latency, _is_error(record))
+    return windows
+
+
+def _seconds_in_bucket(bucket_start: datetime, bucket_seconds: int,
+                       since: Optional[datetime], until: Optional[datetime]) -> float:
+    """Duración efectiva de la ventana (recortada por --since/--until)"""
+    start = max(bucket_start, since) if since else bucket_start
+    end = bucket_start + timedelta(seconds=bucket_seconds)
+    end = min(end, until) if until else end
+    return max((end - start).total_seconds(), 1.0)
+
+
+# ==================== SALIDA ====================
+
+def print_buckets(groups, bucket_seconds, since, until, output_format):
+    rows = []
+    for (route, bucket_start) in sorted(groups, key=lambda key: (key[1], key[0])):
+        seconds = _seconds_in_bucket(bucket_start, bucket_seconds, since, until)
+        rows.append({
+            "bucket": bucket_start.isoformat(),
+            "route": route,
+            **groups[(route, bucket_start)].summary(seconds),
+        })
+
+    if output_format == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+
+    print("=" * 110)
+    print("LATENCIAS POR ENDPOINT - SCIS")
+    print("=" * 110)
+    print(f"{'Ventana':19} {'Ruta':40} {'Reqs':>7} {'req/s':>8} {'Err%':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    print("-" * 110)
+    for row in rows:
+        print(f"{row['bucket']:19} {row['route'][:40]:40} {row['count']:7} "
+              f"{row['throughput_rps']:8.2f} {row['error_rate'] * 100:6.2f} "
+              f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f}")
+    print("=" * 110)
+    print(f"Grupos: {len(rows)}")
+
+
+def _delta(before: float, after: float) -> float:
+    if before <= 0:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def print_comparison(baseline_groups, candidate_groups, baseline, candidate,
+                     threshold, min_samples, output_format) -> int:
+    """Imprimir comparación entre ventanas. Retorna el número de regresiones."""
+    baseline_seconds = (baseline[1] - baseline[0]).total_seconds()
+    candidate_seconds = (candidate[1] - candidate[0]).total_seconds()
+
+    rows = []
+    for route in sorted(set(baseline_groups) | set(candidate_groups)):
+        before = baseline_groups.get(route, LatencyHistogram()).summary(baseline_seconds)
+        after = candidate_groups.get(route, LatencyHistogram()).summary(candidate_seconds)
+        deltas = {f"{key}_delta_pct": round(_delta(before[key], after[key]), 2)
+                  for key in ("p50_ms", "p95_ms", "p99_ms")}
+        enough = before["count"] >= min_samples and after["count"] >= min_samples
+        regression = enough and (
+            deltas["p95_ms_delta_pct"] > threshold
+            or deltas["p99_ms_delta_pct"] > threshold
+            or after["error_rate"] > before["error_rate"] + threshold / 100
+        )
+        rows.append({"route": route, "baseline": before, "candidate": after,
+                     **deltas, "regression": regression})
+
+    regressions = sum(1 for row in rows if row["regression"])
+
+    if output_format == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return regressions
+
+    print("=" * 110)
+    print("COMPARACIÓN DE VENTANAS - SCIS")
+    print(f"Base:      {baseline[0].isoformat()} -> {baseline[1].isoformat()}")
+    print(f"Candidata: {candidate[0].isoformat()} -> {candidate[1].isoformat()}")
+    print("=" * 110)
+    print(f"{'Ruta':40} {'Reqs':>13} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17}  Estado")
+    print("-" * 110)
+    for row in rows:
+        before, after = row["baseline"], row["candidate"]
+        status = "REGRESIÓN" if row["regression"] else "ok"
+        print(f"{row['route'][:40]:40} {before['count']:6}/{after['count']:<6} "
+              f"{before['p50_ms']:8.1f}->{after['p50_ms']:<8.1f}"
+              f"{before['p95_ms']:8.1f}->{after['p95_ms']:<8.1f}"
+              f"{before['p99_ms']:8.1f}->{after['p99_ms']:<8.1f} {status}")
+    print("=" * 110)
+    print(f"Regresiones (umbral {threshold}%): {regressions}")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Análisis de latencias desde logs de SCIS")
+    parser.add_argument("--logs", default="logs/app*.log*",
+                        help="Patrón glob de archivos de log (default: logs/app*.log*)")
+    parser.add_argument("--bucket", type=parse_bucket, default=parse_bucket("1h"),
+                        help="Tamaño de ventana de tiempo: 30s, 15m, 1h, 1d (default: 1h)")
+    parser.add_argument("--route", help="Filtrar rutas que contengan este texto")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Desde (ISO 8601)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Hasta (ISO 8601)")
+    parser.add_argument("--baseline", type=parse_window, help="Ventana base: INICIO,FIN")
+    parser.add_argument("--candidate", type=parse_window, help="Ventana candidata: INICIO,FIN")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Porcentaje de aumento en p95/p99 considerado regresión (default: 10)")
+    parser.add_argument("--min-samples", type=int, default=20,
+                        help="Mínimo de requests por ventana para evaluar regresión (default: 20)")
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if bool(args.baseline) != bool(args.candidate):
+        print(" Debe indicar --baseline y --candidate juntos", file=sys.stderr)
+        return 2
+
+    paths = find_log_files(args.logs)
+    if not paths:
+        print(f" No se encontraron archivos de log con el patrón: {args.logs}", file=sys.stderr)
+        return 1
+
+    records = iter_requests(paths)
+
+    if args.baseline:
+        baseline_groups, candidate_groups = aggregate_windows(
+            records, args.baseline, args.candidate, args.route
+        )
+        regressions = print_comparison(
+            baseline_groups, candidate_groups, args.baseline, args.candidate,
+            args.threshold, args.min_samples, args.format
+        )
+        return 3 if regressions else 0
+
+    groups = aggregate_by_bucket(records, args.bucket, args.route, args.since, args.until)
+    print_buckets(groups, args.bucket, args.since, args.until, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Archivar movimientos antiguos en segmentos inmutables (ver
+infrastructure/database/movement_archive.py).
+
+Mueve los meses completos anteriores al horizonte de retención a un archivo
+SQLite por mes en ARCHIVE_DIR y los elimina de inventory_movements. Pensado
+para ejecutarse periódicamente (cron, una vez al día o al mes).
+
+Uso:
+    python scripts/archive_movements.py --retention-days 365
+    python scripts/archive_movements.py --dry-run
+    python scripts/archive_movements.py --verify
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from infrastructure.database.movement_archive import ARCHIVE_DIR, MOVEMENT_RETENTION_DAYS
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Archivar movimientos antiguos de SCIS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos (default: DATABASE_URL)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directorio de los segmentos (default: ARCHIVE_DIR)")
+    parser.add_argument("--retention-days", type=int, default=MOVEMENT_RETENTION_DAYS,
+                        help="Días que se conservan en la tabla activa (default: MOVEMENT_RETENTION_DAYS)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar qué se archivaría")
+    parser.add_argument("--verify", action="store_true", help="Verificar los checksums de los segmentos existentes")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from datetime import datetime
+    from sqlalchemy import create_engine, func, select
+    from infrastructure.database.base import Base
+    from infrastructure.database.models import InventoryMovement
+    from infrastructure.database.movement_archive import archive_cutoff, archive_movements, verify_segments
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+
+    if args.verify:
+        with engine.connect() as connection:
+            problems = verify_segments(connection, args.archive_dir)
+        for problem in problems:
+            print(problem)
+        print("Segmentos íntegros" if not problems else f"{len(problems)} segmentos con problemas")
+        return 1 if problems else 0
+
+    if args.dry_run:
+        cutoff = archive_cutoff(datetime.utcnow(), args.retention_days)
+        with engine.connect() as connection:
+            pending = connection.execute(
+                select(func.count()).where(InventoryMovement.created_at < cutoff)
+            ).scalar()
+        print(f"Se archivarían {pending:,} movimientos anteriores a {cutoff:%Y-%m-%d}")
+        return 0
+
+    result = archive_movements(engine, args.retention_days, args.archive_dir)
+    print(json.dumps(result.to_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
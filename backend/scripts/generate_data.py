@@ -0,0 +1,431 @@
+"""
+Generador de datos sintéticos a gran escala.
+
+Crea millones de productos, usuarios y movimientos con inserts masivos
+directos al driver (executemany en SQLite, COPY en PostgreSQL), para
+reproducir volúmenes de producción en desarrollo y benchmarks.
+
+Los datos son coherentes y realistas:
+- Cada producto parte de un inventario inicial y su historial forma una
+  cadena previous_stock -> new_stock sin saltos; current_stock es el último
+  new_stock
+- La demanda por producto sigue una distribución de Pareto (pocos productos
+  concentran la mayoría de los movimientos) y lo mismo los operadores
+- Salidas frecuentes y pequeñas; entradas grandes al caer bajo el stock
+  mínimo (reabastecimiento), más devoluciones ocasionales
+- Más actividad en días hábiles y horario laboral, con tendencia creciente
+  y estacionalidad anual
+- Reproducible: la misma semilla genera exactamente los mismos datos
+
+Uso:
+    python scripts/generate_data.py --products 100000 --users 500 --movements 10000000 \\
+        --database-url sqlite:///database/scis_large.db --reset
+"""
+import argparse
+import bisect
+import io
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+DEFAULT_PASSWORD = "Scis12345!"
+USER_PREFIX = "user_"
+PRODUCT_PREFIX = "GEN-"
+EMAIL_DOMAIN = "scis.local"
+
+# Reparto de roles de los usuarios generados (el primero siempre es admin)
+ROLE_WEIGHTS = (("operator", 60), ("manager", 20), ("viewer", 20))
+# Roles que registran movimientos
+MOVER_ROLES = ("admin", "manager", "operator")
+
+PRODUCT_WORDS = (
+    "Cemento", "Varilla", "Arena", "Grava", "Asfalto", "Señal", "Cono", "Tubo",
+    "Cable", "Pintura", "Malla", "Bloque", "Perno", "Lámina", "Poste", "Barrera",
+)
+PRODUCT_QUALIFIERS = ("gris", "corrugada", "fina", "reflectiva", "PVC", "galvanizado", "vial", "premium")
+UNITS = ("unidades", "kg", "litros", "metros")
+MAX_STOCK_CHOICES = (100, 250, 500, 1000, 5000, 10000)
+
+RESTOCK_REASONS = ("Compra a proveedor", "Reabastecimiento programado")
+RETURN_REASONS = ("Devolución de obra", "Ajuste de inventario")
+OUT_REASONS = ("Despacho a proyecto", "Consumo en mantenimiento", "Traslado entre bodegas")
+OPENING_REASON = "Inventario inicial"
+
+# Actividad relativa por día de la semana (lunes..domingo) y por hora del día
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 0.9, 0.35, 0.1)
+HOUR_WEIGHTS = (
+    0.02, 0.02, 0.02, 0.02, 0.02, 0.05, 0.3, 0.8, 1.0, 1.0, 1.0, 0.9,
+    0.6, 0.9, 1.0, 1.0, 0.9, 0.6, 0.25, 0.15, 0.1, 0.05, 0.03, 0.02,
+)
+HOUR_CUM_WEIGHTS = list(accumulate(HOUR_WEIGHTS))
+
+# Probabilidades de cada tipo de movimiento
+RESTOCK_PROBABILITY = 0.9   # Reabastecer al llegar al stock mínimo
+RETURN_PROBABILITY = 0.05   # Entrada pequeña (devolución / ajuste)
+
+PRODUCT_COLUMNS = (
+    "id", "code", "name", "description", "current_stock", "min_stock", "max_stock",
+    "unit", "created_at", "updated_at",
+)
+USER_COLUMNS = (
+    "id", "username", "email", "hashed_password", "full_name", "role", "is_active",
+    "created_at", "updated_at",
+)
+MOVEMENT_COLUMNS = (
+    "product_id", "quantity", "movement_type", "reason", "previous_stock", "new_stock",
+    "user_id", "created_at",
+)
+
+
+@dataclass
+class GenerationSummary:
+    """Resultado de la generación"""
+    products: int
+    users: int
+    movements: int
+    seconds: float
+    seed: int
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.movements / self.seconds, 1) if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "rows_per_second": self.rows_per_second}
+
+
+def usernames(users: int, prefix: str = USER_PREFIX) -> List[str]:
+    return [f"{prefix}{i:04}" for i in range(1, users + 1)]
+
+
+def format_timestamp(value: datetime) -> str:
+    """Mismo formato que usa SQLAlchemy para DateTime en SQLite"""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+# ==================== ESCRITURA MASIVA ====================
+
+class BulkWriter:
+    """
+    Inserts masivos con el driver, sin crear objetos ORM.
+
+    - SQLite: executemany con PRAGMAs de carga rápida en la conexión
+    - PostgreSQL (psycopg2): COPY FROM STDIN
+    - Otros drivers: executemany con el paramstyle del driver
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.connection = engine.raw_connection()
+        self.cursor = self.connection.cursor()
+        self.use_copy = self.dialect == "postgresql" and hasattr(self.cursor, "copy_expert")
+        if self.dialect == "sqlite":
+            # Seguro para una carga que se puede repetir; se aplica solo a esta conexión
+            for pragma in ("synchronous = OFF", "journal_mode = MEMORY", "temp_store = MEMORY", "cache_size = -262144"):
+                self.cursor.execute(f"PRAGMA {pragma}")
+
+    def _placeholders(self, count: int) -> str:
+        style = engine_paramstyle(self.engine)
+        if style == "qmark":
+            return ", ".join("?" * count)
+        if style in ("format", "pyformat"):
+            return ", ".join(["%s"] * count)
+        if style == "numeric":
+            return ", ".join(f":{i + 1}" for i in range(count))
+        raise ValueError(f"paramstyle no soportado: {style}")
+
+    def insert(self, table: str, columns: Sequence[str], rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        if self.use_copy:
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+                buffer.write("\n")
+            buffer.seek(0)
+            self.cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+            return
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({self._placeholders(len(columns))})",
+            rows
+        )
+
+    def update_stock(self, stocks: Dict[int, int]) -> None:
+        """Fijar current_stock al último new_stock de cada producto"""
+        rows = [(stock, product_id) for product_id, stock in stocks.items()]
+        placeholders = self._placeholders(2).split(", ")
+        self.cursor.executemany(
+            f"UPDATE products SET current_stock = {placeholders[0]} WHERE id = {placeholders[1]}", rows
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.cursor.close()
+        self.connection.close()
+
+
+def engine_paramstyle(engine) -> str:
+    return engine.dialect.dbapi.paramstyle
+
+
+# ==================== DISTRIBUCIONES ====================
+
+def day_counts(rng: random.Random, start: datetime, days: int, total: int) -> List[int]:
+    """Repartir `total` movimientos entre días según semana, tendencia y estacionalidad"""
+    weights = []
+    for day in range(days):
+        date = start + timedelta(days=day)
+        trend = 0.7 + 0.6 * day / max(days - 1, 1)
+        seasonal = 1 + 0.15 * math.sin(2 * math.pi * date.timetuple().tm_yday / 365)
+        weights.append(WEEKDAY_WEIGHTS[date.weekday()] * trend * seasonal * rng.uniform(0.85, 1.15))
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for day in rng.choices(range(days), weights=weights, k=total - sum(counts)):
+        counts[day] += 1
+    return counts
+
+
+def pareto_cum_weights(rng: random.Random, count: int, alpha: float = 1.2) -> List[float]:
+    return list(accumulate(rng.paretovariate(alpha) for _ in range(count)))
+
+
+# ==================== GENERACIÓN ====================
+
+def generate(
+    engine,
+    products: int,
+    users: int,
+    movements: int,
+    days: int = 365,
+    seed: int = 42,
+    batch_size: int = 20000,
+    reset: bool = False,
+    progress: bool = True,
+    user_prefix: str = USER_PREFIX,
+    product_prefix: str = PRODUCT_PREFIX,
+    email_domain: str = EMAIL_DOMAIN,
+    password: str = DEFAULT_PASSWORD
+) -> GenerationSummary:
+    """
+    Poblar la base de datos del engine.
+
+    Args:
+        engine: Engine de SQLAlchemy destino
+        products, users, movements: Cantidades a generar
+        days: Los movimientos cubren los últimos `days` días
+        seed: Semilla; la misma semilla produce los mismos datos
+        batch_size: Filas por insert masivo
+        reset: Eliminar y recrear las tablas antes de cargar
+        user_prefix, product_prefix, email_domain, password: Identificadores de los datos generados
+
+    Raises:
+        ValueError: Si las tablas ya tienen datos y no se pidió reset
+    """
+    from sqlalchemy import inspect, text
+    from infrastructure.auth.jwt_handler import JWTHandler
+    from infrastructure.database.base import Base
+    from infrastructure.database import models  # noqa: F401  (registra las tablas)
+    from infrastructure.database.stock_summary import rebuild_stock_summary
+    from infrastructure.database.movement_rollup import backfill_movement_rollup
+
+    if users < 1 or products < 1:
+        raise ValueError("Se requiere al menos un usuario y un producto")
+
+    start_time = time.perf_counter()
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    first_day = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0)
+
+    tables = [Base.metadata.tables[name] for name in ("users", "products", "inventory_movements")]
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    if not reset:
+        with engine.connect() as conn:
+            for table in tables:
+                if conn.execute(text(f"SELECT 1 FROM {table.name} LIMIT 1")).first():
+                    raise ValueError(f"La tabla {table.name} ya tiene datos; usar --reset para reemplazarlos")
+
+    # Los índices se recrean al final: cargar sin índices y construirlos una vez es mucho más rápido
+    existing_indexes = {index["name"] for table in tables for index in inspect(engine).get_indexes(table.name)}
+    deferred_indexes = [index for table in tables for index in table.indexes if index.name in existing_indexes]
+    for index in deferred_indexes:
+        index.drop(bind=engine)
+
+    writer = BulkWriter(engine)
+    try:
+        stamp = format_timestamp(first_day - timedelta(days=1))
+
+        # Usuarios (el hash se calcula una sola vez)
+        password_hash = JWTHandler.get_password_hash(password)
+        roles, role_weights = zip(*ROLE_WEIGHTS)
+        user_roles = ["admin"] + rng.choices(roles, role_weights, k=users - 1)
+        writer.insert("users", USER_COLUMNS, [
+            (i + 1, username, f"{username}@{email_domain}", password_hash, f"Usuario {i + 1}",
+             user_roles[i].upper(), True, stamp, stamp)
+            for i, username in enumerate(usernames(users, user_prefix))
+        ])
+
+        # Productos: se insertan con stock 0 y se actualizan al terminar la historia
+        max_stock = [rng.choice(MAX_STOCK_CHOICES) for _ in range(products)]
+        min_stock = [int(value * rng.uniform(0.1, 0.25)) for value in max_stock]
+        for offset in range(0, products, batch_size):
+            writer.insert("products", PRODUCT_COLUMNS, [
+                (i + 1, f"{product_prefix}{i + 1:07}",
+                 f"{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_QUALIFIERS)} {rng.randint(1, 999)}",
+                 f"Producto sintético {i + 1}", 0, min_stock[i], max_stock[i], rng.choice(UNITS), stamp, stamp)
+                for i in range(offset, min(offset + batch_size, products))
+            ])
+        writer.commit()
+
+        # Demanda concentrada: pesos de Pareto por producto y por operador
+        product_cum = pareto_cum_weights(rng, products)
+        movers = [i + 1 for i, role in enumerate(user_roles) if role in MOVER_ROLES]
+        mover_cum = pareto_cum_weights(rng, len(movers))
+
+        stock = [0] * products
+        batch: List[Tuple] = []
+        written = 0
+
+        def flush() -> None:
+            nonlocal batch, written
+            writer.insert("inventory_movements", MOVEMENT_COLUMNS, batch)
+            written += len(batch)
+            if progress and written // 1_000_000 != (written - len(batch)) // 1_000_000:
+                elapsed = time.perf_counter() - start_time
+                print(f"   {written:,} movimientos ({written / elapsed:,.0f}/s)")
+            batch = []
+            if written % (batch_size * 25) == 0:
+                writer.commit()
+
+        # Inventario inicial de los productos (todos si alcanza el presupuesto de movimientos),
+        # el día anterior al primer día de historia para que siempre preceda a los demás movimientos
+        opening_count = min(products, movements // 2)
+        opening_products = range(products) if opening_count == products else rng.sample(range(products), opening_count)
+        opening_day = first_day - timedelta(days=1)
+        for second, product in enumerate(sorted(opening_products)):
+            quantity = rng.randint(max(min_stock[product], 1), max_stock[product])
+            stock[product] = quantity
+            created = format_timestamp(opening_day + timedelta(seconds=second % 86400))
+            batch.append((product + 1, quantity, "IN", OPENING_REASON, 0, quantity, movers[0], created))
+            if len(batch) >= batch_size:
+                flush()
+
+        # Historia diaria
+        counts = day_counts(rng, first_day, days, movements - opening_count)
+        product_ids = range(products)
+        for day, count in enumerate(counts):
+            if not count:
+                continue
+            day_prefix = (first_day + timedelta(days=day)).strftime("%Y-%m-%d")
+            seconds = sorted(
+                hour * 3600 + rng.randrange(3600)
+                for hour in rng.choices(range(24), cum_weights=HOUR_CUM_WEIGHTS, k=count)
+            )
+            chosen_products = rng.choices(product_ids, cum_weights=product_cum, k=count)
+            chosen_users = rng.choices(movers, cum_weights=mover_cum, k=count)
+            for second, product, user_id in zip(seconds, chosen_products, chosen_users):
+                previous = stock[product]
+                top = max_stock[product]
+                roll = rng.random()
+                if previous == 0 or (previous <= min_stock[product] and roll < RESTOCK_PROBABILITY):
+                    # Reabastecer hasta 75-100% del máximo
+                    movement_type, reason = "IN", rng.choice(RESTOCK_REASONS)
+                    quantity = max(rng.randint(int(top * 0.75), top) - previous, 1)
+                elif roll > 1 - RETURN_PROBABILITY and previous < top:
+                    movement_type, reason = "IN", rng.choice(RETURN_REASONS)
+                    quantity = min(max(int(top * 0.01 * rng.lognormvariate(0, 0.6)), 1), top - previous)
+                else:
+                    # Consumo: pequeño, sesgado a la derecha
+                    movement_type, reason = "OUT", rng.choice(OUT_REASONS)
+                    quantity = min(max(int(top * 0.04 * rng.lognormvariate(0, 0.6)), 1), previous)
+
+                new = previous + quantity if movement_type == "IN" else previous - quantity
+                stock[product] = new
+                batch.append((
+                    product + 1, quantity, movement_type, reason, previous, new, user_id,
+                    f"{day_prefix} {second // 3600:02}:{second // 60 % 60:02}:{second % 60:02}.000000"
+                ))
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+
+        writer.update_stock({i + 1: value for i, value in enumerate(stock) if value})
+        writer.commit()
+    finally:
+        writer.close()
+
+    for index in deferred_indexes:
+        index.create(bind=engine)
+    # La carga no pasa por el ORM: recalcular los resúmenes materializados
+    with engine.begin() as conn:
+        rebuild_stock_summary(conn)
+    backfill_movement_rollup(engine)
+    # Estadísticas actualizadas para el planificador
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    return GenerationSummary(products, users, movements, round(time.perf_counter() - start_time, 2), seed)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos a gran escala para SCIS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos destino (default: DATABASE_URL)")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--movements", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="Días de historia")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para reproducir los mismos datos")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--reset", action="store_true", help="Eliminar y recrear las tablas antes de cargar")
+    parser.add_argument("--user-prefix", default=USER_PREFIX)
+    parser.add_argument("--product-prefix", default=PRODUCT_PREFIX)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Contraseña de todos los usuarios generados")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine
+
+    print("=" * 70)
+    print("GENERACIÓN DE DATOS SINTÉTICOS - SCIS")
+    print("=" * 70)
+    print(f"Base de datos: {args.database_url}")
+    print(f"{args.products:,} productos, {args.users:,} usuarios, {args.movements:,} movimientos "
+          f"en {args.days} días (semilla {args.seed})")
+
+    try:
+        summary = generate(
+            create_engine(args.database_url), args.products, args.users, args.movements,
+            days=args.days, seed=args.seed, batch_size=args.batch_size, reset=args.reset,
+            user_prefix=args.user_prefix, product_prefix=args.product_prefix, password=args.password
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Completado en {summary.seconds}s ({summary.rows_per_second:,.0f} movimientos/s)")
+    print(f"Contraseña de los usuarios {args.user_prefix}*: {args.password}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Recalcular los resúmenes materializados del inventario desde products e
+inventory_movements:
+- summary: stock_summary y daily_movement_counts
+- rollup: product_daily_movements (acumulado diario por producto), por
+  lotes de productos con una transacción por lote
+
+Los resúmenes se mantienen solos en cada flush del ORM; ejecutar este script
+después de escrituras que no pasan por el ORM (cargas masivas, SQL manual,
+restauraciones) o para verificar que no hay deriva.
+
+Uso:
+    python scripts/rebuild_summaries.py --database-url sqlite:///database/scis.db
+    python scripts/rebuild_summaries.py --only rollup --batch-products 5000
+    python scripts/rebuild_summaries.py --check
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recalcular los resúmenes materializados de SCIS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos (default: DATABASE_URL)")
+    parser.add_argument("--only", choices=("summary", "rollup"), help="Recalcular solo uno de los resúmenes")
+    parser.add_argument("--batch-products", type=int, default=1000,
+                        help="Productos por lote al reconstruir el acumulado diario")
+    parser.add_argument("--check", action="store_true",
+                        help="Solo comparar el resumen global actual con el recalculado (no modifica nada)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from infrastructure.database.base import Base
+    from infrastructure.database.stock_summary import read_stock_summary, rebuild_stock_summary
+    from infrastructure.database.movement_rollup import backfill_movement_rollup
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+
+    if args.check:
+        with Session(engine) as db:
+            current = read_stock_summary(db)
+            connection = db.connection()
+            rebuilt = rebuild_stock_summary(connection)
+            db.rollback()
+        drift = {key: (current[key], rebuilt[key]) for key in current if current[key] != rebuilt[key]}
+        for key, (stored, expected) in drift.items():
+            print(f"{key}: guardado {stored}, recalculado {expected}")
+        print("Resumen consistente" if not drift else f"{len(drift)} contadores con deriva")
+        return 1 if drift else 0
+
+    if args.only != "rollup":
+        with engine.begin() as connection:
+            summary = rebuild_stock_summary(connection)
+        print(f"Resumen recalculado en {time.perf_counter() - start:.2f}s: {summary}")
+    if args.only != "summary":
+        start = time.perf_counter()
+        rows = backfill_movement_rollup(
+            engine, args.batch_products,
+            progress=lambda done, total: print(f"  productos {done:,}/{total:,}", end="\r", flush=True)
+        )
+        print(f"\nAcumulado diario recalculado en {time.perf_counter() - start:.2f}s: {rows:,} filas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Conciliar products.current_stock con la cadena de movimientos (ver
+infrastructure/database/stock_reconciliation.py).
+
+Reparte los productos por rangos de ids entre varios procesos y guarda el
+avance en un archivo de estado: si la corrida se interrumpe, la siguiente
+continúa donde quedó. Pensado para ejecutarse periódicamente (cron, por
+ejemplo cada noche); termina con código 1 si encontró discrepancias.
+
+Uso:
+    python scripts/reconcile_stock.py                       # solo reportar
+    python scripts/reconcile_stock.py --workers 8 --repair  # corregir current_stock
+    python scripts/reconcile_stock.py --details             # listar cada discrepancia
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from infrastructure.database.stock_reconciliation import (
+    BATCH_PRODUCTS, RECONCILE_STATE_PATH, RECONCILE_WORKERS
+)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Conciliar el stock de SCIS con los movimientos")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos (default: DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=RECONCILE_WORKERS,
+                        help="Procesos en paralelo (default: RECONCILE_WORKERS)")
+    parser.add_argument("--batch-products", type=int, default=BATCH_PRODUCTS,
+                        help="Ancho de cada rango de ids de productos")
+    parser.add_argument("--repair", action="store_true", help="Corregir current_stock de los productos con deriva")
+    parser.add_argument("--state-path", default=RECONCILE_STATE_PATH,
+                        help="Archivo de estado para reanudar (default: RECONCILE_STATE_PATH)")
+    parser.add_argument("--restart", action="store_true", help="Ignorar una corrida interrumpida y empezar de cero")
+    parser.add_argument("--details", action="store_true", help="Incluir cada discrepancia en la salida")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine
+    from infrastructure.database.base import Base
+    from infrastructure.database.stock_reconciliation import reconcile_stock
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    report = reconcile_stock(
+        args.database_url, workers=args.workers, batch_products=args.batch_products, repair=args.repair,
+        state_path=args.state_path, resume=not args.restart,
+        progress=lambda done, total: print(f"  rangos {done:,}/{total:,}", end="\r", file=sys.stderr, flush=True),
+    )
+    print(file=sys.stderr)
+    print(json.dumps(report.to_dict(details=args.details), indent=2))
+    return 1 if report.discrepancies else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Mantener y reproducir el flujo de eventos de stock (ver
+infrastructure/database/event_stream.py).
+
+Uso:
+    python scripts/replay_events.py --backfill         # flujo inicial de una base existente
+    python scripts/replay_events.py --snapshot         # snapshots de los productos con muchos eventos (cron)
+    python scripts/replay_events.py --verify           # comparar current_stock con el flujo
+    python scripts/replay_events.py --restore          # reescribir current_stock y stock_summary desde el flujo
+    python scripts/replay_events.py --product 42       # estado de un producto
+    python scripts/replay_events.py --verify --no-snapshots   # reproducción completa (medición)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+from typing import List, Optional
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from infrastructure.database.event_stream import SNAPSHOT_EVERY
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Flujo de eventos de stock de SCIS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos (default: DATABASE_URL)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--backfill", action="store_true", help="Crear eventos para los productos sin flujo")
+    group.add_argument("--snapshot", action="store_true", help="Guardar snapshots pendientes")
+    group.add_argument("--verify", action="store_true", help="Comparar products.current_stock con el flujo")
+    group.add_argument("--restore", action="store_true", help="Reescribir los modelos de lectura desde el flujo")
+    group.add_argument("--product", type=int, help="Mostrar el estado reproducido de un producto")
+    parser.add_argument("--every", type=int, default=SNAPSHOT_EVERY,
+                        help="Eventos entre snapshots (default: SNAPSHOT_EVERY)")
+    parser.add_argument("--no-snapshots", action="store_true", help="Reproducir desde el primer evento")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine
+    from infrastructure.database.base import Base
+    from infrastructure.database.event_stream import (
+        backfill_event_stream, replay, restore_read_models, stock_drift, write_snapshots
+    )
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+
+    if args.backfill:
+        print(f"{backfill_event_stream(engine):,} eventos creados en {time.perf_counter() - start:.2f}s")
+    elif args.snapshot:
+        print(f"{write_snapshots(engine, args.every):,} snapshots en {time.perf_counter() - start:.2f}s")
+    elif args.restore:
+        print(f"{restore_read_models(engine):,} productos corregidos en {time.perf_counter() - start:.2f}s")
+    else:
+        with engine.connect() as connection:
+            result = replay(connection, args.product, use_snapshots=not args.no_snapshots)
+            drift = stock_drift(connection, result.states) if args.verify else []
+        print(f"{result.events:,} eventos desde {result.snapshots:,} snapshots en {result.seconds:.3f}s "
+              f"({result.events_per_second:,.0f} eventos/s)")
+        if args.product is not None:
+            state = result.states.get(args.product)
+            print(json.dumps(asdict(state) if state else None, indent=2, default=str))
+        for product_id, current_stock, stock in drift:
+            print(f"producto {product_id}: current_stock {current_stock}, flujo {stock}")
+        if args.verify:
+            print("Stock consistente con el flujo" if not drift else f"{len(drift)} productos con deriva")
+            return 1 if drift else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
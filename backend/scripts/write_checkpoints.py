@@ -0,0 +1,84 @@
+"""
+Guardar puntos de control de stock (ver infrastructure/database/stock_checkpoints.py).
+
+Pensado para ejecutarse periódicamente (cron); cada punto de control se
+calcula desde el anterior, así que cuesta O(productos + movimientos desde
+el último punto de control).
+
+Uso:
+    python scripts/write_checkpoints.py                      # ahora
+    python scripts/write_checkpoints.py --at 2025-02-01      # instante dado
+    python scripts/write_checkpoints.py --monthly            # inicio de cada mes sin punto de control
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+# Configurar path (mismo esquema que init_database.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from infrastructure.database.movement_archive import ARCHIVE_DIR
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Guardar puntos de control de stock de SCIS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///database/scis.db"),
+                        help="Base de datos (default: DATABASE_URL)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directorio del archivo histórico")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--at", type=datetime.fromisoformat, help="Instante (UTC, ISO 8601); default: ahora")
+    group.add_argument("--monthly", action="store_true",
+                       help="Un punto de control al inicio de cada mes desde el primer movimiento")
+    return parser.parse_args(argv)
+
+
+def monthly_instants(first: datetime, until: datetime) -> List[datetime]:
+    """Inicio de cada mes en (first, until]"""
+    instants = []
+    month = datetime(first.year, first.month, 1)
+    while True:
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        if month > until:
+            return instants
+        instants.append(month)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.orm import Session
+    from infrastructure.database.base import Base
+    from infrastructure.database.models import InventoryMovement, MovementArchiveSegment, StockCheckpoint
+    from infrastructure.database.stock_checkpoints import write_checkpoint
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        if args.monthly:
+            first = min(filter(None, (
+                db.execute(select(func.min(InventoryMovement.created_at))).scalar(),
+                db.execute(select(func.min(MovementArchiveSegment.period_start))).scalar(),
+            )), default=None)
+            existing = set(db.execute(select(StockCheckpoint.taken_at).distinct()).scalars())
+            instants = [at for at in monthly_instants(first, datetime.utcnow()) if at not in existing] if first else []
+        else:
+            instants = [args.at or datetime.utcnow()]
+
+        for taken_at in instants:
+            start = time.perf_counter()
+            products = write_checkpoint(db, taken_at, archive_dir=args.archive_dir)
+            print(f"{taken_at.isoformat()}: {products:,} productos en {time.perf_counter() - start:.2f}s")
+    if not instants:
+        print("Sin puntos de control pendientes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# Rutas para importar tanto `backend.main` como los módulos de infraestructura
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+project_root = os.path.dirname(backend_dir)
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, project_root)
+
+# Base de datos temporal: debe configurarse antes de importar la sesión
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/scis_test.db")
+os.environ.setdefault("APP_DEBUG", "true")
+# Sin trazas ni logs escritos dentro del árbol de trabajo
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+_log_dir = tempfile.mkdtemp()
+os.environ.setdefault("LOG_FILE", os.path.join(_log_dir, "app.log"))
+os.environ.setdefault("AUDIT_LOG_FILE", os.path.join(_log_dir, "audit.log"))
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_log_dir, "archive"))
+os.environ["TESTING"] = "true"
@@ -0,0 +1,92 @@
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.logging.structured_logger import LOG_FILE
+from scripts.analyze_logs import find_log_files, iter_requests, main
+
+BASE = datetime(2026, 1, 10, 10, 0)
+
+
+def _record(minute, route, latency_ms, status_code=200):
+    return json.dumps({
+        "timestamp": (BASE + timedelta(minutes=minute)).isoformat(),
+        "action": "request_complete",
+        "method": "GET",
+        "path": route.replace("{product_id}", "7"),
+        "route": route,
+        "status_code": status_code,
+        "process_time": latency_ms / 1000,
+    })
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """Hora base: latencias 1..100 ms con 5 errores; hora candidata: el doble"""
+    baseline = [_record(i * 0.5, "/products/{product_id}", i, 500 if i % 20 == 0 else 200) for i in range(1, 101)]
+    baseline += [_record(i, "/health", 5) for i in range(30)]
+    candidate = [_record(60 + i * 0.5, "/products/{product_id}", i * 2) for i in range(1, 101)]
+    candidate += [_record(60 + i, "/health", 5) for i in range(30)]
+    noise = json.dumps({"timestamp": BASE.isoformat(), "action": "request_start", "method": "GET"})
+
+    # RotatingFileHandler: app.log.2 es el más antiguo (aquí comprimido)
+    with gzip.open(tmp_path / "app.log.2.gz", "wt", encoding="utf-8") as handle:
+        handle.write("\n".join(baseline[:60] + [noise, "no es json"]) + "\n")
+    (tmp_path / "app.log.1").write_text("\n".join(baseline[60:]) + "\n", encoding="utf-8")
+    (tmp_path / "app.log").write_text("\n".join(candidate) + "\n", encoding="utf-8")
+    return str(tmp_path / "app*.log*")
+
+
+def _run(capsys, *argv):
+    code = main(list(argv) + ["--format", "json"])
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_rotated_and_compressed_logs_are_read_oldest_first(logs):
+    assert [path.rsplit("/", 1)[1] for path in find_log_files(logs)] == ["app.log.2.gz", "app.log.1", "app.log"]
+    assert sum(1 for _ in iter_requests(find_log_files(logs))) == 260
+
+
+def test_percentiles_throughput_and_error_rate_by_route_and_hour(logs, capsys):
+    code, rows = _run(capsys, "--logs", logs, "--bucket", "1h")
+    assert code == 0
+    by_key = {(row["bucket"], row["route"]): row for row in rows}
+    products = by_key[("2026-01-10T10:00:00", "GET /products/{product_id}")]
+    assert products["count"] == 100
+    assert products["throughput_rps"] == round(100 / 3600, 4)
+    assert products["error_rate"] == 0.05
+    # Histograma logarítmico: error relativo menor al 2%
+    assert products["p50_ms"] == pytest.approx(50, rel=0.02)
+    assert products["p95_ms"] == pytest.approx(95, rel=0.02)
+    assert products["p99_ms"] == pytest.approx(99, rel=0.02)
+    assert by_key[("2026-01-10T11:00:00", "GET /products/{product_id}")]["p95_ms"] == pytest.approx(190, rel=0.02)
+    assert by_key[("2026-01-10T10:00:00", "GET /health")]["error_rate"] == 0.0
+
+
+def test_window_comparison_flags_only_the_regressed_route(logs, capsys):
+    code, rows = _run(
+        capsys, "--logs", logs,
+        "--baseline", "2026-01-10T10:00,2026-01-10T11:00",
+        "--candidate", "2026-01-10T11:00,2026-01-10T12:00",
+    )
+    assert code == 3
+    by_route = {row["route"]: row for row in rows}
+    products = by_route["GET /products/{product_id}"]
+    assert products["regression"] is True
+    assert products["p95_ms_delta_pct"] == pytest.approx(100, abs=4)
+    assert by_route["GET /health"]["regression"] is False
+    assert by_route["GET /health"]["p99_ms_delta_pct"] == 0.0
+
+
+def test_application_logs_each_request_with_its_route_template():
+    TestClient(app).get("/products/987654")  # Sin token: 401
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    records = [record for record in iter_requests([LOG_FILE]) if record.get("path") == "/products/987654"]
+    assert records and records[-1]["route"] == "/products/{product_id}"
+    assert records[-1]["status_code"] == 401
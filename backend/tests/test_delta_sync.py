@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.delta_sync import InvalidCursor, changes_since, full_sync, parse_cursor
+from infrastructure.database.models import InventoryMovement, Product, SyncChange, User, UserRole
+
+
+def test_sync_returns_only_changes_and_tombstones_since_cursor():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    user = User(username="sync_op", email="sync_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    products = [Product(code=f"SYNC-{i}", name=f"Producto {i}", current_stock=10, max_stock=100) for i in range(5)]
+    db.add_all([user, *products])
+    db.commit()
+
+    initial = full_sync(db)
+    assert len(initial["products"]) == 5 and initial["movements"] == []
+    cursor = parse_cursor(initial["cursor"])
+    assert changes_since(db, cursor)["products"] == []
+
+    products[0].name = "Renombrado"
+    products[1].current_stock = 7
+    db.add(InventoryMovement(product_id=products[1].id, quantity=3, movement_type="OUT", reason="Prueba",
+                             previous_stock=10, new_stock=7, user_id=user.id, created_at=datetime.utcnow()))
+    db.commit()
+    products[0].name = "Renombrado otra vez"
+    db.delete(products[4])
+    db.commit()
+
+    delta = changes_since(db, cursor)
+    assert [item["id"] for item in delta["products"]] == [products[0].id, products[1].id]
+    assert delta["products"][0]["name"] == "Renombrado otra vez"
+    assert delta["products"][1]["current_stock"] == 7
+    assert [item["quantity"] for item in delta["movements"]] == [3]
+    assert delta["deleted_product_ids"] == [products[4].id]
+    # Una fila por entidad: el segundo cambio reemplazó al primero
+    assert db.execute(select(func.count()).select_from(SyncChange)).scalar() == 5 + 1
+
+    page = changes_since(db, cursor, limit=2)
+    assert page["has_more"] and len(page["products"]) + len(page["movements"]) == 2
+    rest = changes_since(db, parse_cursor(page["cursor"]), limit=2)
+    assert not rest["has_more"] and rest["deleted_product_ids"] == [products[4].id]
+    assert changes_since(db, parse_cursor(delta["cursor"]))["products"] == []
+
+    with pytest.raises(InvalidCursor):
+        parse_cursor("abc")
+    with pytest.raises(InvalidCursor):
+        changes_since(db, 10 ** 9)
+    db.close()
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.event_dispatcher import EventDispatcher
+from infrastructure.database.models import EventSubscriberOffset, InventoryMovement, Product, User, UserRole
+
+
+def test_durable_subscriber_gets_batches_once_and_retries_failures():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    user = User(username="disp_op", email="disp_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    product = Product(code="DISP-1", name="Producto", current_stock=100, max_stock=1000)
+    db.add_all([user, product])
+    db.commit()
+
+    received, local = [], []
+    fail = {"next": False}
+    dispatcher = EventDispatcher(factory, batch_size=4, poll_seconds=0, max_retry_seconds=0)
+
+    @dispatcher.subscribe("pruebas", from_start=True)
+    def collect(events, session):
+        if fail["next"]:
+            fail["next"] = False
+            session.add(Product(code="DISP-ROLLBACK", name="Revertido", current_stock=0))
+            session.flush()
+            raise RuntimeError("caído")
+        received.extend(item["seq"] for item in events)
+
+    dispatcher.subscribe("local", lambda events, session: local.extend(item["seq"] for item in events),
+                         durable=False)
+
+    for quantity in range(1, 10):
+        previous = product.current_stock
+        product.current_stock -= quantity
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type="OUT", reason="Prueba",
+            previous_stock=previous, new_stock=product.current_stock, user_id=user.id,
+            created_at=datetime.utcnow(),
+        ))
+        db.commit()
+        if quantity == 1:
+            dispatcher.dispatch_once()  # El suscriptor local empieza desde aquí
+
+    assert dispatcher.dispatch_once() == 4 + 4
+    fail["next"] = True
+    assert dispatcher.dispatch_once() == 4  # Solo el local avanza
+    assert dispatcher.subscribers["pruebas"].failures == 1
+    while dispatcher.dispatch_once():
+        pass
+
+    assert received == list(range(1, 11))  # StockInitialized + 9 movimientos, sin repetidos
+    assert local == list(range(3, 11))
+    assert db.query(Product).filter_by(code="DISP-ROLLBACK").count() == 0
+    assert dispatcher.subscribers["pruebas"].failures == 0
+    assert db.execute(select(EventSubscriberOffset.position).where(
+        EventSubscriberOffset.subscriber == "pruebas")).scalar() == 10
+
+    # Un despachador nuevo (reinicio) continúa desde la posición guardada
+    restarted = EventDispatcher(factory)
+    restarted.subscribe("pruebas", lambda events, session: received.extend(events), from_start=True)
+    assert restarted.dispatch_once() == 0
+    db.close()
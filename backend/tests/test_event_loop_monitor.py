@@ -0,0 +1,38 @@
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from infrastructure.monitoring.event_loop import EventLoopMonitor
+from infrastructure.monitoring.metrics import render_metrics
+
+
+def test_blocking_async_endpoint_is_detected_with_route():
+    monitor = EventLoopMonitor(interval=0.02, block_threshold_ms=50)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        monitor.start(app)
+        yield
+        await monitor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/blocking")
+    async def blocking_endpoint():
+        time.sleep(0.3)  # Llamada bloqueante dentro de una ruta async
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        time.sleep(0.1)
+        assert client.get("/blocking").status_code == 200
+        time.sleep(0.1)
+        status = monitor.status()
+
+    assert status["total_blocks"] == 1
+    block = status["recent_blocks"][0]
+    assert block["route"] == "GET /blocking"
+    assert any("blocking_endpoint" in line for line in block["stack"])
+    assert status["lag_ms"]["max"] >= 200
+    assert 'scis_event_loop_blocks_total{route="GET /blocking"}' in render_metrics()
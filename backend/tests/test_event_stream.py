@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.event_stream import (
+    PRODUCT_REMOVED, STOCK_INITIALIZED, backfill_event_stream, replay, restore_read_models, write_snapshots
+)
+from infrastructure.database.models import InventoryMovement, Product, StockEvent, User, UserRole
+
+
+def _move(db, user, product, movement_type, quantity, created_at):
+    previous = product.current_stock
+    product.current_stock += quantity if movement_type == "IN" else -quantity
+    db.add(InventoryMovement(
+        product_id=product.id, quantity=quantity, movement_type=movement_type, reason="Prueba",
+        previous_stock=previous, new_stock=product.current_stock, user_id=user.id, created_at=created_at,
+    ))
+
+
+def test_replay_matches_products_through_snapshots_and_removals():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    start = datetime.utcnow() - timedelta(days=30)
+    user = User(username="evt_op", email="evt_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    products = [Product(code=f"EVT-{i}", name=f"Producto {i}", current_stock=50 + i, max_stock=1000)
+                for i in range(4)]
+    db.add_all([user, *products])
+    db.commit()
+
+    def run(steps, offset, moved=4):
+        for step in range(steps):
+            _move(db, user, products[step % moved], "IN" if step % 3 == 0 else "OUT", 2 + step % 5,
+                  start + timedelta(hours=offset + step))
+            db.commit()
+
+    def assert_replay_matches(**kwargs):
+        with engine.connect() as connection:
+            states = replay(connection, **kwargs).states
+        current = {product.id: product.current_stock for product in db.query(Product)}
+        assert {pid: state.stock for pid, state in states.items()} == current
+        return states
+
+    run(40, 0)
+    states = assert_replay_matches()
+    assert states[products[0].id].version == 11 and states[products[0].id].movements == 10
+    assert write_snapshots(engine, every=1) == 4
+
+    run(20, 40)
+    db.delete(products[3])
+    db.commit()
+    with engine.connect() as connection:
+        position = connection.execute(select(func.max(StockEvent.seq))).scalar()
+    assert write_snapshots(engine, every=1000) == 0
+    assert write_snapshots(engine, every=1) == 4  # 3 que cambiaron + la marca del eliminado
+    run(12, 60, moved=3)
+
+    with engine.connect() as connection:
+        full = replay(connection, use_snapshots=False)
+        incremental = replay(connection)
+        assert incremental.snapshots == 3 and incremental.events == 12 < full.events
+        assert full.states == incremental.states
+        assert products[3].id not in full.states
+        # Estado en una posición anterior del flujo: antes de los últimos 12 movimientos
+        past = replay(connection, until_seq=position)
+        assert past.states[products[0].id].stock == full.states[products[0].id].stock - sum(
+            (2 + step % 5) * (1 if step % 3 == 0 else -1) for step in range(0, 12, 3)
+        )
+        single = replay(connection, products[1].id)
+        assert single.states == {products[1].id: full.states[products[1].id]}
+        event_types = connection.execute(
+            select(StockEvent.event_type).where(StockEvent.product_id == products[3].id).order_by(StockEvent.version)
+        ).scalars().all()
+    assert event_types[0] == STOCK_INITIALIZED and event_types[-1] == PRODUCT_REMOVED
+    assert_replay_matches()
+
+    # Recuperación: el stock editado fuera del flujo vuelve al reproducido
+    products[0].current_stock += 100
+    db.commit()
+    assert restore_read_models(engine) == 1
+    db.expire_all()
+    assert_replay_matches()
+    db.close()
+    engine.dispose()
+
+
+def test_backfill_creates_stream_for_rows_written_outside_the_orm():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    created = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__).values(
+            id=1, username="bulk", email="bulk@scis.com", hashed_password="x", role="OPERATOR",
+            is_active=True, created_at=created, updated_at=created,
+        ))
+        connection.execute(insert(Product.__table__), [
+            {"id": pid, "code": f"BLK-{pid}", "name": "Carga", "current_stock": 30 + 5 * pid, "min_stock": 0,
+             "max_stock": 1000, "unit": "unidades", "created_at": created, "updated_at": created}
+            for pid in (1, 2, 3)
+        ])
+        connection.execute(insert(InventoryMovement.__table__), [
+            {"product_id": pid, "quantity": 5, "movement_type": "IN", "reason": "Carga", "previous_stock": 30 + 5 * (pid - 1),
+             "new_stock": 30 + 5 * pid, "user_id": 1, "created_at": created + timedelta(days=pid)}
+            for pid in (1, 2)
+        ])
+    assert backfill_event_stream(engine) == 5
+    assert backfill_event_stream(engine) == 0
+    with engine.connect() as connection:
+        states = replay(connection).states
+    assert {pid: state.stock for pid, state in states.items()} == {1: 35, 2: 40, 3: 45}
+    assert states[1].movements == 1 and states[3].movements == 0
+    engine.dispose()
@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine, text
+
+from scripts.generate_data import generate
+
+
+def _snapshot(engine):
+    with engine.connect() as conn:
+        movements = conn.execute(text(
+            "SELECT product_id, quantity, movement_type, previous_stock, new_stock, user_id "
+            "FROM inventory_movements ORDER BY id"
+        )).all()
+        stocks = dict(conn.execute(text("SELECT id, current_stock FROM products")).all())
+    return movements, stocks
+
+
+def test_generated_history_is_chained_and_reproducible(tmp_path):
+    engines = [create_engine(f"sqlite:///{tmp_path}/gen_{i}.db") for i in range(2)]
+    for engine in engines:
+        summary = generate(engine, products=50, users=5, movements=2000, days=30, seed=7,
+                           batch_size=300, progress=False)
+        assert summary.movements == 2000
+
+    movements, stocks = _snapshot(engines[0])
+    assert (movements, stocks) == _snapshot(engines[1])
+    assert len(movements) == 2000
+
+    last_stock = {}
+    with engines[0].connect() as conn:
+        ordered = conn.execute(text(
+            "SELECT product_id, movement_type, quantity, previous_stock, new_stock "
+            "FROM inventory_movements ORDER BY created_at, id"
+        )).all()
+    for product_id, movement_type, quantity, previous, new in ordered:
+        assert previous == last_stock.get(product_id, 0)
+        assert quantity > 0 and new >= 0
+        assert new == (previous + quantity if movement_type == "IN" else previous - quantity)
+        last_stock[product_id] = new
+    assert {k: v for k, v in stocks.items() if v} == {k: v for k, v in last_stock.items() if v}
+
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.models import Product, User, UserRole
+from infrastructure.database.session import SessionLocal, create_tables
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(
+            username="memory_admin",
+            email="memory_admin@scis.com",
+            hashed_password="pbkdf2_sha256$1$c2FsdA==$aGFzaA==",
+            full_name="Memory Admin",
+            role=UserRole.ADMIN,
+            is_active=True
+        )
+        db.add(user)
+        db.commit()
+        token = JWTHandler.create_access_token({"sub": user.username, "user_id": user.id, "role": "admin"})
+        return {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def test_tracemalloc_snapshot_diff_cycle(admin_headers):
+    assert client.post("/admin/memory/snapshots", headers=admin_headers).status_code == 400
+
+    assert client.post("/admin/memory/tracemalloc/start", headers=admin_headers).json()["tracing"] is True
+    try:
+        base = client.post("/admin/memory/snapshots?label=base", headers=admin_headers).json()["id"]
+        retained = [bytearray(1024) for _ in range(200)]
+        current = client.post("/admin/memory/snapshots", headers=admin_headers).json()["id"]
+
+        top = client.get(f"/admin/memory/snapshots/{current}?limit=5", headers=admin_headers).json()["top"]
+        assert len(top) == 5 and top[0]["size_bytes"] >= top[-1]["size_bytes"]
+
+        diff = client.get(f"/admin/memory/diff?base={base}&current={current}", headers=admin_headers).json()["diff"]
+        assert any(
+            "test_memory_diagnostics.py" in entry["site"][0] and entry["size_diff_bytes"] >= 200 * 1024
+            for entry in diff
+        )
+        del retained
+    finally:
+        stopped = client.post("/admin/memory/tracemalloc/stop", headers=admin_headers).json()
+    assert stopped["tracing"] is False and stopped["snapshots"] == []
+
+
+def test_orm_statistics_count_unclosed_sessions(admin_headers):
+    leaked = SessionLocal()
+    leaked.add(Product(code="MEM-001", name="Producto memoria", current_stock=0, max_stock=10))
+    leaked.commit()
+    products = leaked.query(Product).all()  # El identity map solo retiene objetos referenciados
+    try:
+        orm = client.get("/admin/memory", headers=admin_headers).json()["orm"]
+        assert orm["sessions_in_transaction"] >= 1
+        assert orm["identity_map_by_class"].get("Product", 0) >= len(products)
+    finally:
+        leaked.close()
@@ -0,0 +1,63 @@
+import asyncio
+import re
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.monitoring.http import MetricsMiddleware
+from infrastructure.monitoring.metrics import render_metrics
+
+client = TestClient(app)
+
+
+def _sample(text, name, **labels):
+    """Valor de la serie `name` con exactamente esas etiquetas (None si no existe)"""
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    series = f"{name}{{{rendered}}}" if labels else name
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_endpoint_exposes_histograms_by_route_template_and_pool_gauges():
+    before = client.get("/metrics").text
+    labels = {"method": "GET", "route": "/products/{product_id}", "status_class": "4xx"}
+    count_before = _sample(before, "scis_http_request_duration_seconds_count", **labels) or 0
+
+    for product_id in (123, 456):
+        assert client.get(f"/products/{product_id}").status_code == 401  # Sin token
+    response = client.get("/metrics")
+    text = response.text
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE scis_http_request_duration_seconds histogram" in text
+    assert "# TYPE scis_http_requests_in_flight gauge" in text
+    assert "# TYPE scis_db_queries_total counter" in text
+    # La plantilla agrupa /products/123 y /products/456 en una sola serie
+    assert _sample(text, "scis_http_request_duration_seconds_count", **labels) == count_before + 2
+    assert _sample(text, "scis_http_request_duration_seconds_bucket", **labels, le="+Inf") == count_before + 2
+    assert _sample(text, "scis_http_request_duration_seconds_sum", **labels) > 0
+    assert "/products/123" not in text and "/products/456" not in text
+    for gauge in ("scis_db_pool_size", "scis_db_pool_checked_out", "scis_db_pool_overflow"):
+        assert f"# TYPE {gauge} gauge" in text and _sample(text, gauge) is not None
+    assert _sample(text, "scis_db_pool_size") > 0
+
+
+def test_event_stream_records_time_to_first_byte():
+    stream_app = FastAPI()
+    stream_app.add_middleware(MetricsMiddleware)
+
+    @stream_app.get("/test-metrics-stream")
+    async def stream():
+        async def events():
+            yield ": conectado\n\n"
+            await asyncio.sleep(0.5)
+            yield "event: stock\ndata: {}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    assert "event: stock" in TestClient(stream_app).get("/test-metrics-stream").text
+    labels = {"method": "GET", "route": "/test-metrics-stream", "status_class": "2xx"}
+    text = render_metrics()
+    assert _sample(text, "scis_http_request_duration_seconds_count", **labels) == 1
+    assert _sample(text, "scis_http_request_duration_seconds_sum", **labels) < 0.5
@@ -0,0 +1,156 @@
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.models import (
+    InventoryMovement, Product, ProductOpeningBalance, User, UserRole
+)
+from infrastructure.database.movement_archive import archive_movements, verify_segments
+from infrastructure.database.repositories import SQLAlchemyMovementRepository
+from infrastructure.database.stock_summary import read_stock_summary, rebuild_stock_summary
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _snapshot(repo, product_id, user_id, now):
+    def ids(movements):
+        return [movement.id for movement in movements]
+    return {
+        "product_pages": [ids(repo.find_by_product(product_id, skip, 7)) for skip in (0, 7, 30, 60)],
+        "user": ids(repo.find_by_user(user_id, 5, 40)),
+        "range": ids(repo.find_by_date_range(now - timedelta(days=150), now - timedelta(days=40), product_id)),
+        "count": repo.count_movements(start_date=now - timedelta(days=120)),
+        "count_all": repo.count_movements(product_id=product_id),
+        "stats": repo.get_movement_stats(start_date=now - timedelta(days=100, hours=5)),
+        "product_stats": repo.get_movement_stats(product_id=product_id, end_date=now - timedelta(days=33, hours=2)),
+    }
+
+
+def test_archived_movements_stay_queryable_through_repository(db, tmp_path):
+    now = datetime(2025, 6, 15, 12, 0)
+    users = [User(username=f"arch_{i}", email=f"arch_{i}@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+             for i in range(2)]
+    products = [Product(code=f"ARC-{i}", name=f"Producto {i}", current_stock=0, max_stock=1000) for i in range(2)]
+    db.add_all(users + products)
+    db.commit()
+
+    stock = {product.id: 0 for product in products}
+    for step in range(180):
+        product = products[step % 2]
+        movement_type = "IN" if stock[product.id] < 10 else "OUT"
+        quantity = 30 if movement_type == "IN" else 4
+        previous = stock[product.id]
+        stock[product.id] += quantity if movement_type == "IN" else -quantity
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type=movement_type, reason="Prueba",
+            previous_stock=previous, new_stock=stock[product.id], user_id=users[step % 3 % 2].id,
+            created_at=now - timedelta(days=180 - step, hours=step % 5),
+        ))
+    db.commit()
+
+    repo = SQLAlchemyMovementRepository(db, archive_dir=str(tmp_path))
+    before = _snapshot(repo, products[0].id, users[0].id, now)
+    summary = read_stock_summary(db)
+
+    result = archive_movements(db.get_bind(), retention_days=60, archive_dir=str(tmp_path), now=now)
+    db.expire_all()
+
+    assert result.cutoff == datetime(2025, 4, 1) and result.segments == 4
+    assert db.query(func.min(InventoryMovement.created_at)).scalar() >= result.cutoff
+    assert db.query(InventoryMovement).count() + result.movements == 180
+    assert _snapshot(repo, products[0].id, users[0].id, now) == before
+    assert repo.find_by_id(1).created_at < result.cutoff
+    assert os.stat(tmp_path / "movements-2025-01.db").st_mode & 0o222 == 0
+    assert verify_segments(db, str(tmp_path)) == []
+
+    # Saldo de apertura = stock tras el último movimiento archivado del producto
+    balance = db.get(ProductOpeningBalance, products[0].id)
+    first_hot = (db.query(InventoryMovement).filter(InventoryMovement.product_id == products[0].id)
+                 .order_by(InventoryMovement.created_at).first())
+    assert balance.stock == first_hot.previous_stock and balance.as_of == result.cutoff
+
+    # Reconstruir los resúmenes conserva los días archivados
+    with db.get_bind().begin() as connection:
+        rebuild_stock_summary(connection)
+    assert read_stock_summary(db) == summary
+
+
+def test_archived_movements_are_served_by_the_movement_endpoints():
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+    from infrastructure.auth.jwt_handler import JWTHandler
+    from infrastructure.database import movement_archive
+    from infrastructure.database.models import MovementArchiveSegment
+    from infrastructure.database.session import SessionLocal, create_tables, engine
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(username="arch_http", email="arch_http@scis.com", hashed_password="x", role=UserRole.ADMIN)
+        product = Product(code="ARC-HTTP", name="Arena", current_stock=0, max_stock=1000)
+        db.add_all([user, product])
+        db.flush()
+        dates = [datetime(2020, 1, 10), datetime(2020, 1, 20), datetime(2020, 2, 5), datetime.utcnow()]
+        for stock, created_at in enumerate(dates, start=1):
+            db.add(InventoryMovement(
+                product_id=product.id, quantity=1, movement_type="IN", reason="Prueba",
+                previous_stock=stock - 1, new_stock=stock, user_id=user.id, created_at=created_at,
+            ))
+        db.commit()
+        user_id, product_id = user.id, product.id
+    finally:
+        db.close()
+
+    result = archive_movements(engine, retention_days=30, archive_dir=movement_archive.ARCHIVE_DIR,
+                               now=datetime(2020, 6, 1))
+    try:
+        assert result.movements == 3
+        client = TestClient(app)
+        token = JWTHandler.create_access_token({"sub": "arch_http", "user_id": user_id, "role": "admin"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get(f"/movements/?product_id={product_id}", headers=headers)
+        assert response.status_code == 200
+        movements = response.json()
+        assert [movement["new_stock"] for movement in movements] == [4, 3, 2, 1]
+        assert all(movement["product_code"] == "ARC-HTTP" and movement["username"] == "arch_http"
+                   for movement in movements)
+
+        page = client.get(f"/movements/?product_id={product_id}&skip=1&limit=2", headers=headers).json()
+        assert [movement["id"] for movement in page] == [movement["id"] for movement in movements[1:3]]
+
+        archived_id = movements[-1]["id"]
+        detail = client.get(f"/movements/{archived_id}", headers=headers)
+        assert detail.status_code == 200
+        assert detail.json()["created_at"] == "2020-01-10T00:00:00"
+        assert detail.json()["product_name"] == "Arena"
+    finally:
+        db = SessionLocal()
+        try:
+            for segment in db.query(MovementArchiveSegment).all():
+                path = Path(movement_archive.ARCHIVE_DIR) / segment.file_name
+                path.chmod(0o644)
+                path.unlink()
+                db.delete(segment)
+            db.delete(db.get(ProductOpeningBalance, product_id))
+            db.delete(db.get(Product, product_id))
+            db.delete(db.get(User, user_id))
+            db.commit()
+            with engine.begin() as connection:
+                rebuild_stock_summary(connection)
+        finally:
+            db.close()
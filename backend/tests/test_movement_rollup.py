@@ -0,0 +1,82 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.models import (
+    DailyProductMovement, InventoryMovement, Product, User, UserRole
+)
+from infrastructure.database.movement_rollup import backfill_movement_rollup
+from infrastructure.database.repositories import SQLAlchemyMovementRepository
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _rollup_rows(db):
+    return [tuple(row) for row in db.execute(
+        select(DailyProductMovement.__table__).order_by(DailyProductMovement.product_id, DailyProductMovement.day)
+    )]
+
+
+def test_rollup_stats_match_raw_movements_and_backfill(db):
+    user = User(username="rollup_op", email="rollup_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    products = [Product(code=f"ROL-{i}", name=f"Producto {i}", current_stock=0, max_stock=1000) for i in range(3)]
+    db.add_all([user, *products])
+    db.commit()
+
+    midnight = datetime.combine(datetime.utcnow().date(), time.min) - timedelta(days=10)
+    stock = {product.id: 0 for product in products}
+    for step in range(60):
+        product = products[step % 3]
+        movement_type = "IN" if step % 4 == 0 or stock[product.id] < 5 else "OUT"
+        quantity = 20 if movement_type == "IN" else 3
+        previous = stock[product.id]
+        stock[product.id] += quantity if movement_type == "IN" else -quantity
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type=movement_type, reason="Prueba",
+            previous_stock=previous, new_stock=stock[product.id], user_id=user.id,
+            created_at=midnight + timedelta(hours=4 * step + 1),
+        ))
+        if step % 7 == 0:
+            db.commit()
+    db.commit()
+    # Eliminar un movimiento recalcula su fila del acumulado
+    db.delete(db.query(InventoryMovement).filter(InventoryMovement.movement_type == "OUT").first())
+    db.commit()
+
+    repo = SQLAlchemyMovementRepository(db)
+    ranges = [
+        (None, None),
+        (midnight + timedelta(days=2, hours=5), None),
+        (midnight + timedelta(days=3), midnight + timedelta(days=7, hours=13)),
+        (midnight + timedelta(days=4, hours=2), midnight + timedelta(days=4, hours=20)),
+        (midnight + timedelta(days=6, hours=23), midnight + timedelta(days=7, hours=1)),
+    ]
+    for start, end in ranges:
+        raw = repo._raw_totals(products[1].id, start, end)
+        assert repo.get_movement_stats(product_id=products[1].id, start_date=start, end_date=end)["total_movements"] \
+            == raw[0]
+        raw = repo._raw_totals(None, start, end)
+        stats = repo.get_movement_stats(start_date=start, end_date=end)
+        assert (stats["total_movements"], stats["total_in"], stats["quantity_in"], stats["quantity_out"]) == raw
+
+    closing = {row[0]: row for row in _rollup_rows(db)}
+    assert all(closing[product.id][6] == stock[product.id] for product in products if product.id in closing)
+
+    incremental = _rollup_rows(db)
+    backfill_movement_rollup(db.get_bind(), batch_products=2)
+    assert _rollup_rows(db) == incremental
+
+    db.delete(products[0])
+    db.commit()
+    assert {row[0] for row in _rollup_rows(db)} == {products[1].id, products[2].id}
@@ -0,0 +1,99 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.base import Base
+from infrastructure.database.models import InventoryMovement, Product, User, UserRole
+from infrastructure.database.movement_archive import archive_movements
+from infrastructure.database.product_ledger import ProductLedger
+from infrastructure.database.session import SessionLocal, create_tables
+
+client = TestClient(app)
+
+
+def _add_history(db, code, start, steps):
+    user = User(username=f"{code.lower()}_op", email=f"{code.lower()}_op@scis.com", hashed_password="x",
+                role=UserRole.OPERATOR)
+    product = Product(code=code, name="Cemento", current_stock=20, max_stock=1000, created_at=start)
+    db.add_all([user, product])
+    db.flush()
+    for step in range(steps):
+        movement_type = "IN" if step % 4 == 0 else "OUT"
+        quantity = 9 if movement_type == "IN" else 2
+        previous = product.current_stock
+        product.current_stock += quantity if movement_type == "IN" else -quantity
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type=movement_type, reason="Prueba",
+            previous_stock=previous, new_stock=product.current_stock, user_id=user.id,
+            created_at=start + timedelta(days=step, hours=3),
+        ))
+    db.commit()
+    return user, product
+
+
+def test_ledger_running_balances_across_archive(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=120)
+    _, product = _add_history(db, "LED-ARCH", start, 110)
+    archive_movements(engine, retention_days=60, archive_dir=str(tmp_path))
+    db.expire_all()
+
+    for first, last in ((10, 100), (70, 80), (0, 5)):
+        ledger = ProductLedger(db, product.id, start + timedelta(days=first), start + timedelta(days=last),
+                               archive_dir=str(tmp_path))
+        rows = list(ledger)
+        assert rows and ledger.discrepancies == 0
+        assert ledger.opening_balance == rows[0]["previous_stock"]
+        assert [row["balance"] for row in rows] == [row["new_stock"] for row in rows]
+        assert ledger.closing_balance == ledger.opening_balance + ledger.totals()["net_change"]
+        assert all(row["username"] == "led-arch_op" for row in rows)
+    db.close()
+    engine.dispose()
+
+
+def test_ledger_endpoint_streams_json_and_csv():
+    create_tables()
+    db = SessionLocal()
+    try:
+        user, product = _add_history(db, "LED-API", datetime.utcnow() - timedelta(days=40), 30)
+    finally:
+        db.close()
+    try:
+        _check_ledger_endpoint(user, product)
+    finally:
+        # La base de pruebas es compartida: otros tests cuentan los movimientos
+        db = SessionLocal()
+        try:
+            # Por instancia (los movimientos caen en cascada): Query.delete() omite los listeners de flush
+            db.delete(db.get(Product, product.id))
+            db.delete(db.get(User, user.id))
+            db.commit()
+        finally:
+            db.close()
+
+
+def _check_ledger_endpoint(user, product):
+    token = JWTHandler.create_access_token({"sub": user.username, "user_id": user.id, "role": "operator"})
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"from": (datetime.utcnow() - timedelta(days=30)).isoformat()}
+
+    body = client.get(f"/inventory/products/{product.id}/ledger", params=params, headers=headers).json()
+    assert body["product"]["code"] == "LED-API"
+    assert body["totals"]["movements"] == len(body["movements"]) == 20
+    assert body["opening_balance"] == body["movements"][0]["previous_stock"]
+    assert body["closing_balance"] == body["movements"][-1]["balance"] == 20 + 8 * 9 - 22 * 2
+
+    text = client.get(f"/inventory/products/{product.id}/ledger", params={**params, "format": "csv"},
+                      headers=headers).text
+    rows = list(csv.DictReader(line for line in io.StringIO(text) if not line.startswith("#")))
+    assert [int(row["balance"]) for row in rows] == [row["balance"] for row in body["movements"]]
+
+    assert client.get("/inventory/products/999999/ledger", params=params, headers=headers).status_code == 404
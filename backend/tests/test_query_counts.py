@@ -0,0 +1,93 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.models import InventoryMovement, Product, User, UserRole
+from infrastructure.database.query_counter import N_PLUS_ONE_THRESHOLD, count_queries
+from infrastructure.database.session import SessionLocal, create_tables
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(
+            username="query_admin",
+            email="query_admin@scis.com",
+            hashed_password="pbkdf2_sha256$1$c2FsdA==$aGFzaA==",
+            full_name="Query Admin",
+            role=UserRole.ADMIN,
+            is_active=True
+        )
+        db.add(user)
+        products = [
+            Product(code=f"QRY-{i:03}", name=f"Producto {i}", current_stock=0, max_stock=1000)
+            for i in range(5)
+        ]
+        db.add_all(products)
+        db.flush()
+
+        # 30 movimientos repartidos entre 5 productos
+        for i in range(30):
+            product = products[i % 5]
+            previous = product.current_stock
+            product.current_stock = previous + 1
+            db.add(InventoryMovement(
+                product_id=product.id,
+                quantity=1,
+                movement_type="IN",
+                reason="Carga de prueba",
+                previous_stock=previous,
+                new_stock=previous + 1,
+                user_id=user.id
+            ))
+        db.commit()
+
+        token = JWTHandler.create_access_token({"sub": user.username, "user_id": user.id, "role": "admin"})
+        return {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def test_movement_list_query_count_is_constant(auth_headers):
+    small = client.get("/movements/?limit=5", headers=auth_headers)
+    large = client.get("/movements/?limit=100", headers=auth_headers)
+
+    assert small.status_code == 200
+    assert large.status_code == 200
+    assert len(large.json()) == 30
+    assert all(item["username"] == "query_admin" for item in large.json())
+
+    # Usuario autenticado + listado con JOIN, sin importar el número de filas
+    assert int(large.headers["X-DB-Query-Count"]) == int(small.headers["X-DB-Query-Count"])
+    assert int(large.headers["X-DB-Query-Count"]) <= 2
+
+
+def test_movement_detail_loads_relations_in_one_query(auth_headers):
+    movement_id = client.get("/movements/?limit=1", headers=auth_headers).json()[0]["id"]
+
+    response = client.get(f"/movements/{movement_id}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["product_code"].startswith("QRY-")
+    assert int(response.headers["X-DB-Query-Count"]) <= 2
+
+
+def test_repeated_statement_logs_n_plus_one_warning(auth_headers, caplog):
+    db = SessionLocal()
+    try:
+        with caplog.at_level(logging.WARNING), count_queries("test") as stats:
+            for product_id in range(N_PLUS_ONE_THRESHOLD + 2):
+                db.query(Product).filter(Product.id == product_id).first()
+    finally:
+        db.close()
+
+    assert stats.count == N_PLUS_ONE_THRESHOLD + 2
+    warnings = [record for record in caplog.records if "N+1" in record.getMessage()]
+    assert len(warnings) == 1
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.application.use_cases.register_movement import RegisterMovementRequest, RegisterMovementUseCase
+from app.domain.entities.inventory_movement import InventoryMovement
+from app.domain.entities.product import Product
+from app.domain.entities.user import User, UserRole
+from infrastructure.database.base import Base
+from infrastructure.database import models  # noqa: F401
+from infrastructure.database.repositories import (
+    SQLAlchemyMovementRepository, SQLAlchemyProductRepository, SQLAlchemyUserRepository
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_product_repository_roundtrip_and_summary(db):
+    repo = SQLAlchemyProductRepository(db)
+    saved = repo.save(Product.create(code="REP-001", name="Cemento gris", current_stock=5, min_stock=10, max_stock=100))
+    repo.save(Product.create(code="REP-002", name="Varilla", current_stock=95, min_stock=0, max_stock=100))
+
+    assert saved.id is not None
+    assert repo.find_by_code("REP-001").name == "Cemento gris"
+    assert [p.code for p in repo.find_all(search="cemento")] == ["REP-001"]
+    assert [p.code for p in repo.get_high_stock_products()] == ["REP-002"]
+    assert repo.get_stock_summary() == {
+        "total_products": 2, "total_stock": 100, "low_stock_count": 1, "out_of_stock_count": 0,
+        "high_stock_count": 1,
+    }
+
+
+def test_register_movement_use_case_with_sqlalchemy_repositories(db):
+    users = SQLAlchemyUserRepository(db)
+    products = SQLAlchemyProductRepository(db)
+    movements = SQLAlchemyMovementRepository(db)
+    user = users.save(User.create("repo_operator", "repo_operator@scis.com", "hash", role=UserRole.OPERATOR))
+    product = products.save(Product.create(code="REP-010", name="Arena", current_stock=10, max_stock=100))
+
+    response = RegisterMovementUseCase(products, movements, users).execute(RegisterMovementRequest(
+        product_id=product.id, quantity=4, movement_type="OUT", reason="Despacho a proyecto", user_id=user.id
+    ))
+
+    assert (response.previous_stock, response.new_stock) == (10, 6)
+    assert products.find_by_id(product.id).current_stock == 6
+    assert users.find_by_username("repo_operator").role == UserRole.OPERATOR
+    assert movements.find_by_product(product.id)[0].id == response.movement_id
+
+    movements.save(InventoryMovement(
+        product_id=product.id, quantity=3, movement_type="IN", reason="Compra", user_id=user.id,
+        created_at=datetime.utcnow() - timedelta(days=10)
+    ))
+    stats = movements.get_movement_stats(start_date=datetime.utcnow() - timedelta(days=7))
+    assert stats == {
+        "total_movements": 1, "total_in": 0, "total_out": 1,
+        "quantity_in": 0, "quantity_out": 4, "net_change": -4,
+    }
+    assert movements.count_movements(product_id=product.id) == 2
@@ -0,0 +1,98 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.models import User, UserRole
+from infrastructure.database.session import SessionLocal, create_tables
+
+client = TestClient(app)
+
+
+def _create_user(db, username: str, role: UserRole) -> dict:
+    user = User(
+        username=username,
+        email=f"{username}@scis.com",
+        hashed_password="pbkdf2_sha256$1$c2FsdA==$aGFzaA==",
+        full_name=username,
+        role=role,
+        is_active=True
+    )
+    db.add(user)
+    db.flush()
+    token = JWTHandler.create_access_token({"sub": user.username, "user_id": user.id, "role": role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="module")
+def users():
+    create_tables()
+    db = SessionLocal()
+    try:
+        headers = {
+            "admin": _create_user(db, "profile_admin", UserRole.ADMIN),
+            "operator": _create_user(db, "profile_operator", UserRole.OPERATOR),
+        }
+        db.commit()
+        return headers
+    finally:
+        db.close()
+
+
+def test_admin_profile_is_stored_with_sql_split(users):
+    response = client.get("/dashboard/stats", headers={**users["admin"], "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    detail = client.get(f"/admin/profiles/{profile_id}", headers=users["admin"]).json()
+    assert detail["path"] == "/dashboard/stats"
+    # Usuario del token, fila del resumen y movimientos del día; la validación
+    # del administrador en el middleware no cuenta
+    assert detail["sql_queries"] == 3
+    assert detail["total_ms"] >= detail["sql_ms"] > 0
+    assert any(row["function"] == "get_dashboard_stats" for row in detail["top_functions"])
+
+
+def test_profile_flag_ignored_for_non_admin(users):
+    response = client.get("/dashboard/stats?profile=1", headers=users["operator"])
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+    listing = client.get("/admin/profiles", headers=users["operator"])
+    assert listing.status_code == 403
+
+
+def test_concurrent_profile_request_is_skipped(users):
+    from infrastructure.monitoring import request_profiler
+
+    # Otra request ya tiene el perfilador
+    assert request_profiler._profiling_lock.acquire(blocking=False)
+    try:
+        response = client.get("/dashboard/stats", headers={**users["admin"], "X-Profile": "1"})
+    finally:
+        request_profiler._profiling_lock.release()
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-skipped"] == "busy"
+    assert "x-profile-id" not in response.headers
+
+
+def test_profile_skipped_when_another_profiler_is_active(users, monkeypatch):
+    import cProfile
+    from types import SimpleNamespace
+
+    from infrastructure.monitoring import request_profiler
+
+    class ActiveProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(request_profiler, "cProfile", SimpleNamespace(Profile=ActiveProfile))
+    stored = len(request_profiler.profile_store.list())
+
+    response = client.get("/dashboard/stats", headers={**users["admin"], "X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-skipped"] == "profiler-in-use"
+    assert "x-profile-id" not in response.headers
+    assert len(request_profiler.profile_store.list()) == stored
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from infrastructure.monitoring.sampling_profiler import SamplingProfiler, export_window
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_records_busy_thread_and_exports():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    profiler = SamplingProfiler(hz=200, window_seconds=60, max_windows=2, output_dir=None)
+
+    worker.start()
+    profiler.start()
+    time.sleep(0.3)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    window = profiler.get_window()
+    assert window is not None and window.ended_at is not None
+    assert any("_busy_loop" in stack and stack.startswith("busy-worker;") for stack in window.samples)
+
+    collapsed, _ = export_window(window, "collapsed")
+    assert collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+    speedscope = window.to_speedscope()
+    profile = speedscope["profiles"][0]
+    assert len(profile["samples"]) == len(profile["weights"]) == len(window.samples)
+    assert any(frame["name"] == "_busy_loop" for frame in speedscope["shared"]["frames"])
+
+
+def test_sampler_bounds_distinct_stacks():
+    profiler = SamplingProfiler(hz=100, max_stacks=2)
+    profiler.start()
+    profiler.stop()
+    window = profiler.get_window()
+    for i in range(5):
+        window.add(f"thread;stack_{i}")
+    assert len(window.samples) <= 3
+    assert window.truncated_samples >= 3
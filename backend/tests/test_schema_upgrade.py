@@ -0,0 +1,67 @@
+import os
+import shutil
+
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.models import (
+    DailyProductMovement, InventoryMovement, Product, StockEvent, StockSummary, SyncChange, User
+)
+from infrastructure.database.delta_sync import changes_since, full_sync
+from infrastructure.database.session import upgrade_schema
+from infrastructure.database.stock_summary import read_stock_summary
+
+SHIPPED_DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "scis.db")
+
+
+def _count(connection, model):
+    return connection.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+
+def test_upgrade_prepares_an_existing_database_for_orm_writes(tmp_path):
+    # Base creada antes de los resúmenes, el flujo de eventos y la sincronización
+    shutil.copy(SHIPPED_DATABASE, tmp_path / "scis.db")
+    engine = create_engine(f"sqlite:///{tmp_path}/scis.db")
+    try:
+        with engine.connect() as connection:
+            movements = _count(connection, InventoryMovement)
+            products = _count(connection, Product)
+
+        created = upgrade_schema(engine)
+        assert {"stock_summary", "product_daily_movements", "stock_events", "sync_changes"} <= set(created)
+        indexes = {index["name"] for index in inspect(engine).get_indexes("inventory_movements")}
+        assert "ix_inventory_movements_product_created" in indexes
+        with engine.connect() as connection:
+            assert _count(connection, StockSummary) == 1
+            rollup = DailyProductMovement.__table__.c
+            assert connection.execute(select(func.sum(rollup.in_count + rollup.out_count))).scalar() == movements
+            # Un StockInitialized por producto y un evento por movimiento
+            assert _count(connection, StockEvent) == products + movements
+
+        db = sessionmaker(bind=engine, expire_on_commit=False)()
+        try:
+            product = db.query(Product).order_by(Product.id).first()
+            user = db.query(User).order_by(User.id).first()
+            previous_stock = product.current_stock
+            product.current_stock = previous_stock + 5
+            db.add(InventoryMovement(product_id=product.id, quantity=5, movement_type="IN", reason="Migración",
+                                     previous_stock=previous_stock, new_stock=product.current_stock,
+                                     user_id=user.id))
+            db.commit()
+            assert read_stock_summary(db)["total_movements"] == movements + 1
+            assert db.query(SyncChange).count() == 2
+            # Cursor de la sincronización completa y luego solo lo que cambió
+            assert len(full_sync(db)["products"]) == products
+            delta = changes_since(db, 0)
+            assert [item["id"] for item in delta["products"]] == [product.id]
+            assert len(delta["movements"]) == 1
+        finally:
+            db.close()
+
+        # Idempotente: una segunda ejecución no crea ni recarga nada
+        assert upgrade_schema(engine) == []
+        with engine.connect() as connection:
+            assert _count(connection, StockSummary) == 1
+            assert _count(connection, StockEvent) == products + movements + 1
+    finally:
+        engine.dispose()
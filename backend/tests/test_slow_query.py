@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.instrumentation import add_query_observer, remove_query_observer
+from infrastructure.database.models import Product, User, UserRole
+from infrastructure.database.query_counter import count_queries
+from infrastructure.database.session import SessionLocal, create_tables
+from infrastructure.database.slow_query import SlowQueryLogger
+from infrastructure.logging.structured_logger import StructuredFormatter
+
+client = TestClient(app)
+
+
+def test_slow_queries_are_logged_with_route_template_redacted_parameters_and_plan():
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(username="slow_op", email="slow_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+        product = Product(code="SLOW-1", name="Cemento", current_stock=10, max_stock=1000)
+        db.add_all([user, product])
+        db.commit()
+        user_id, product_id = user.id, product.id
+    finally:
+        db.close()
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter())
+    slow_logger = logging.getLogger("slow_query")
+    slow_logger.addHandler(handler)
+    observer = SlowQueryLogger(threshold_ms=0.0001, explain=True)
+    add_query_observer(observer)
+    try:
+        token = JWTHandler.create_access_token({"sub": "slow_op", "user_id": user_id, "role": "operator"})
+        response = client.get(f"/products/{product_id}", headers={"Authorization": f"Bearer {token}"})
+        db = SessionLocal()
+        try:
+            with count_queries("login"):
+                db.execute(
+                    text("SELECT id FROM users WHERE username = :username AND hashed_password = :password"),
+                    {"username": "slow_op", "password": "s3cr3t-pass"},
+                )
+        finally:
+            db.close()
+    finally:
+        remove_query_observer(observer)
+        slow_logger.removeHandler(handler)
+        db = SessionLocal()
+        try:
+            # Por instancia: Query.delete() omite los listeners de flush (resumen, eventos)
+            db.delete(db.get(Product, product_id))
+            db.delete(db.get(User, user_id))
+            db.commit()
+        finally:
+            db.close()
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records and all(record["action"] == "slow_query" for record in records)
+
+    product_query = next(record for record in records if "FROM products" in record["statement"])
+    assert product_query["request"] == "GET /products/{product_id}"
+    assert product_query["threshold_ms"] == 0.0001
+    assert product_query["query_plan"]
+
+    login_query = next(record for record in records if record["request"] == "login")
+    assert login_query["parameters"] == ["<str:7>", "<str:11>"]  # Posicionales en SQLite
+    assert login_query["query_plan"]
+    assert "s3cr3t-pass" not in stream.getvalue()
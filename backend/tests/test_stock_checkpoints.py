@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.models import InventoryMovement, Product, User, UserRole
+from infrastructure.database.movement_archive import archive_movements
+from infrastructure.database.stock_checkpoints import stock_as_of, write_checkpoint
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_stock_as_of_matches_replay_from_any_baseline(db, tmp_path):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=200)
+    user = User(username="ckpt_op", email="ckpt_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    products = [Product(code=f"CKP-{i}", name=f"Producto {i}", current_stock=10 * i, max_stock=1000,
+                        created_at=start - timedelta(days=1)) for i in range(3)]
+    db.add_all([user, *products])
+    db.commit()
+
+    history = []
+    for step in range(150):
+        product = products[step % 3]
+        movement_type = "IN" if step % 5 == 0 or product.current_stock < 4 else "OUT"
+        quantity = 12 if movement_type == "IN" else 3
+        previous = product.current_stock
+        product.current_stock += quantity if movement_type == "IN" else -quantity
+        created_at = start + timedelta(days=step, hours=step % 7)
+        history.append((created_at, product.id, product.current_stock))
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=quantity, movement_type=movement_type, reason="Prueba",
+            previous_stock=previous, new_stock=product.current_stock, user_id=user.id, created_at=created_at,
+        ))
+    db.commit()
+    # Producto creado después de todo el historial (sin movimientos)
+    late = Product(code="CKP-LATE", name="Tardío", current_stock=7, max_stock=100)
+    db.add(late)
+    db.commit()
+
+    def replay(timestamp):
+        stocks = {product.id: 10 * i for i, product in enumerate(products)}
+        for created_at, product_id, new_stock in history:
+            if created_at <= timestamp:
+                stocks[product_id] = new_stock
+        return stocks
+
+    instants = [start + timedelta(days=days, hours=5) for days in (3, 40, 41, 90, 130, 160)]
+    assert stock_as_of(db, instants[2], archive_dir=str(tmp_path)).baseline == "current"
+    for timestamp in instants:
+        assert stock_as_of(db, timestamp, archive_dir=str(tmp_path)).stocks == replay(timestamp)
+
+    for days in (30, 60, 120):
+        write_checkpoint(db, start + timedelta(days=days), archive_dir=str(tmp_path))
+    # Los movimientos más antiguos pasan al archivo histórico
+    archive_movements(db.get_bind(), retention_days=120, archive_dir=str(tmp_path))
+    db.expire_all()
+
+    for timestamp in instants:
+        result = stock_as_of(db, timestamp, archive_dir=str(tmp_path))
+        assert result.stocks == replay(timestamp)
+        # Día 160: el stock actual (día 200) está más cerca que el punto de control del día 120
+        assert result.baseline == ("current" if timestamp == instants[-1] else "checkpoint")
+        assert result.movements_applied < 40
+    one = stock_as_of(db, instants[3], product_id=products[1].id, archive_dir=str(tmp_path))
+    assert one.stocks == {products[1].id: replay(instants[3])[products[1].id]}
+    assert stock_as_of(db, datetime.utcnow() + timedelta(seconds=5), archive_dir=str(tmp_path)).stocks[late.id] == 7
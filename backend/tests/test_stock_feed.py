@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime
+
+from infrastructure.database.stock_feed import StockFeed, build_messages
+
+
+def _movement(seq, product_id, old, new):
+    return {
+        "seq": seq, "product_id": product_id, "version": seq + 1, "event_type": "StockMovementApplied",
+        "delta": new - old, "old_stock": old, "new_stock": new, "movement_id": seq, "user_id": 1,
+        "occurred_at": datetime(2024, 1, 1),
+    }
+
+
+def test_build_messages_detects_low_stock_transitions():
+    messages = build_messages([_movement(1, 7, 12, 8), _movement(2, 7, 8, 15), _movement(3, 8, 5, 4)], {7: 10, 8: None})
+    low = [text for kind, _, text in messages if kind == "low_stock"]
+    assert [kind for kind, _, _ in messages].count("stock") == 3
+    assert len(low) == 2 and '"below": true' in low[0] and '"below": false' in low[1]
+    assert low[0].startswith("id: 1\nevent: low_stock\n")
+
+
+def test_fan_out_filters_by_product_and_resyncs_slow_clients():
+    async def scenario():
+        feed = StockFeed(max_clients=2)
+        feed.start()
+        everything = feed.connect()
+        only_seven = feed.connect(product_ids=frozenset({7}), types=frozenset({"stock"}))
+        everything.queue = asyncio.Queue(maxsize=3)
+
+        feed._fan_out(build_messages([_movement(1, 7, 12, 8), _movement(2, 8, 5, 4)], {}))
+        assert only_seven.queue.qsize() == 1
+        assert everything.dropped == 4 and everything.queue.qsize() == 1
+        assert "event: resync" in everything.queue.get_nowait()
+        try:
+            feed.connect()
+        except Exception as error:
+            assert "Máximo" in str(error)
+        else:
+            raise AssertionError("se esperaba StockFeedFull")
+
+    asyncio.run(scenario())
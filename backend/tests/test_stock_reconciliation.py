@@ -0,0 +1,75 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.models import InventoryMovement, Product, User, UserRole
+from infrastructure.database.movement_archive import archive_movements
+from infrastructure.database.stock_reconciliation import id_ranges, reconcile_stock
+from infrastructure.database.stock_summary import read_stock_summary, rebuild_stock_summary
+
+
+def test_reconcile_reports_repairs_and_resumes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'reconcile.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=100)
+    user = User(username="rec_op", email="rec_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    products = [Product(code=f"REC-{i}", name=f"Producto {i}", current_stock=30, max_stock=1000, created_at=start)
+                for i in range(5)]
+    db.add_all([user, *products])
+    db.commit()
+    for step in range(200):
+        product = products[step % 5]
+        movement_type = "IN" if step % 3 == 0 else "OUT"
+        previous = product.current_stock
+        product.current_stock += 4 if movement_type == "IN" else -1
+        db.add(InventoryMovement(
+            product_id=product.id, quantity=4 if movement_type == "IN" else 1, movement_type=movement_type,
+            reason="Prueba", previous_stock=previous, new_stock=product.current_stock, user_id=user.id,
+            created_at=start + timedelta(hours=12 * step),
+        ))
+    db.commit()
+    archive_movements(engine, retention_days=40, archive_dir=str(tmp_path / "archive"))
+
+    # Deriva: un stock editado a mano y un movimiento cuyo previous_stock no continúa la cadena
+    with engine.begin() as connection:
+        connection.execute(update(Product.__table__).where(Product.id == products[1].id).values(current_stock=999))
+        rebuild_stock_summary(connection)
+        broken = connection.execute(
+            InventoryMovement.__table__.select().where(InventoryMovement.product_id == products[3].id)
+            .order_by(InventoryMovement.created_at.desc()).limit(1)
+        ).first()
+        connection.execute(update(InventoryMovement.__table__).where(InventoryMovement.id == broken.id)
+                           .values(previous_stock=broken.previous_stock + 2, new_stock=broken.new_stock + 2))
+
+    state_path = tmp_path / "state.json"
+    report = reconcile_stock(url, workers=2, batch_products=2, state_path=str(state_path))
+    assert report.ranges == len(id_ranges(5, 2)) == 3
+    assert report.products == 5 and report.movements == db.query(InventoryMovement).count()
+    assert report.discrepancies == {"stock_mismatch": 1, "chain_break": 1}
+    (mismatch,) = [item for item in report.details if item["kind"] == "stock_mismatch"]
+    assert (mismatch["product_id"], mismatch["expected"]) == (products[1].id, products[1].current_stock)
+    # La cantidad acumulada no cambia: el stock esperado del producto con la cadena rota sigue siendo el real
+    assert [item["product_id"] for item in report.details if item["kind"] == "chain_break"] == [products[3].id]
+    assert not state_path.exists()
+
+    # Corrida interrumpida: los rangos guardados (aquí el del producto con deriva) no se vuelven a verificar
+    saved = {"1-2": {"first_id": 1, "last_id": 2, "products": 2, "movements": 0, "discrepancies": [],
+                     "repaired": 0, "seconds": 0.0}}
+    state_path.write_text(json.dumps({"batch_products": 2, "repair": True, "completed": saved}))
+    report = reconcile_stock(url, workers=1, batch_products=2, repair=True, state_path=str(state_path))
+    assert report.resumed_ranges == 1 and report.ranges == 3
+    assert report.repaired == 0 and report.discrepancies == {"chain_break": 1}
+
+    report = reconcile_stock(url, workers=1, batch_products=2, repair=True, state_path=str(state_path))
+    assert report.repaired == 1 and report.discrepancies == {"stock_mismatch": 1, "chain_break": 1}
+    db.expire_all()
+    assert db.get(Product, products[1].id).current_stock == products[1].current_stock
+    # El resumen global se recalcula después de corregir
+    assert read_stock_summary(db)["total_stock"] == sum(product.current_stock for product in products)
+    db.close()
+    engine.dispose()
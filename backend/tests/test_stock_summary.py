@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database.base import Base
+from infrastructure.database.models import InventoryMovement, Product, StockSummary, User, UserRole
+from infrastructure.database.stock_summary import (
+    ensure_stock_summary, movements_on, read_stock_summary, rebuild_stock_summary
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _rebuilt(db):
+    with db.get_bind().begin() as connection:
+        rebuild_stock_summary(connection)
+    return read_stock_summary(db)
+
+
+def test_summary_is_maintained_incrementally_and_matches_rebuild(db):
+    user = User(username="sum_op", email="sum_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+    cement = Product(code="SUM-001", name="Cemento", current_stock=5, min_stock=10, max_stock=100)
+    rebar = Product(code="SUM-002", name="Varilla", current_stock=0, min_stock=0, max_stock=50)
+    db.add_all([user, cement, rebar])
+    db.commit()
+    assert read_stock_summary(db) == {
+        "total_products": 2, "total_stock": 5, "low_stock_count": 1, "out_of_stock_count": 1,
+        "high_stock_count": 0, "total_movements": 0,
+    }
+
+    # Movimiento como en main.create_movement: stock y registro en el mismo commit
+    cement.current_stock = 95
+    db.add(InventoryMovement(product_id=cement.id, quantity=90, movement_type="IN", reason="Compra",
+                             previous_stock=5, new_stock=95, user_id=user.id))
+    db.commit()
+    # Producto modificado sin su valor anterior cargado
+    db.expire(rebar, ["current_stock"])
+    rebar.current_stock = 50
+    db.add(InventoryMovement(product_id=rebar.id, quantity=50, movement_type="IN", reason="Compra",
+                             previous_stock=0, new_stock=50, user_id=user.id))
+    db.commit()
+
+    expected = {
+        "total_products": 2, "total_stock": 145, "low_stock_count": 0, "out_of_stock_count": 0,
+        "high_stock_count": 2, "total_movements": 2,
+    }
+    assert read_stock_summary(db) == expected
+    assert movements_on(db, datetime.utcnow().date()) == 2
+
+    db.delete(rebar)
+    db.commit()
+    expected.update(total_products=1, total_stock=95, high_stock_count=1, total_movements=1)
+    assert read_stock_summary(db) == expected
+    assert movements_on(db, datetime.utcnow().date()) == 1
+    assert _rebuilt(db) == expected
+
+
+def test_missing_summary_is_computed_on_read_and_created_by_ensure(db):
+    # Carga masiva fuera del ORM: ningún flush creó la fila del resumen
+    with db.get_bind().begin() as connection:
+        connection.execute(insert(Product.__table__), [
+            {"code": "BULK-1", "name": "Arena", "current_stock": 0, "min_stock": 5, "max_stock": 10},
+            {"code": "BULK-2", "name": "Grava", "current_stock": 8, "min_stock": 5, "max_stock": 10},
+        ])
+    expected = {
+        "total_products": 2, "total_stock": 8, "low_stock_count": 1, "out_of_stock_count": 1,
+        "high_stock_count": 0, "total_movements": 0,
+    }
+
+    assert read_stock_summary(db) == expected
+    db.rollback()
+    count_rows = select(func.count()).select_from(StockSummary.__table__)
+    assert db.execute(count_rows).scalar() == 0  # La lectura no escribe
+
+    with db.get_bind().begin() as connection:
+        assert ensure_stock_summary(connection) is True
+        assert ensure_stock_summary(connection) is False
+    assert db.execute(count_rows).scalar() == 1
+    assert read_stock_summary(db) == expected
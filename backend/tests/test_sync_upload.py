@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.models import InventoryMovement, Product, SyncUpload, User, UserRole
+from infrastructure.database.session import SessionLocal, create_tables
+
+client = TestClient(app)
+
+
+def test_upload_applies_in_order_rejects_and_deduplicates():
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(username="upload_op", email="upload_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+        product = Product(code="UPL-1", name="Arena", current_stock=5, max_stock=1000)
+        db.add_all([user, product])
+        db.commit()
+        user_id, product_id = user.id, product.id
+    finally:
+        db.close()
+    try:
+        token = JWTHandler.create_access_token({"sub": "upload_op", "user_id": user_id, "role": "operator"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def item(client_id, movement_type, quantity, target=product_id):
+            return {"client_id": client_id, "product_id": target, "movement_type": movement_type,
+                    "quantity": quantity, "reason": "Offline", "occurred_at": "2024-05-01T10:00:00Z"}
+
+        queue = [item("a", "OUT", 4), item("b", "OUT", 3), item("c", "IN", 10), item("c", "IN", 10),
+                 item("d", "OUT", 1, target=999999)]
+        body = client.post("/sync/movements", json={"device_id": "tablet-1", "movements": queue},
+                           headers=headers).json()
+        statuses = [(result["status"], result.get("reason")) for result in body["results"]]
+        assert statuses == [("applied", None), ("rejected", "insufficient_stock"), ("applied", None),
+                            ("already_applied", None), ("rejected", "product_not_found")]
+        assert body["results"][3]["movement_id"] == body["results"][2]["movement_id"]
+        assert body["counts"] == {"applied": 2, "already_applied": 1, "rejected": 2}
+        assert [(state["id"], state["current_stock"]) for state in body["products"]] == [(product_id, 11)]
+
+        # Reintento tras reconectar: lo aplicado no se duplica, el rechazado ahora entra
+        retry = client.post("/sync/movements", json={"device_id": "tablet-1", "movements": queue[:3]},
+                            headers=headers).json()
+        assert [result["status"] for result in retry["results"]] == ["already_applied", "applied", "already_applied"]
+        assert retry["results"][0]["movement_id"] == body["results"][0]["movement_id"]
+        assert retry["products"][0]["current_stock"] == 8
+
+        db = SessionLocal()
+        try:
+            movements = db.query(InventoryMovement).filter(InventoryMovement.product_id == product_id) \
+                .order_by(InventoryMovement.id).all()
+            assert [(m.previous_stock, m.new_stock) for m in movements] == [(5, 1), (1, 11), (11, 8)]
+        finally:
+            db.close()
+    finally:
+        # La base de pruebas es compartida: otros tests cuentan los movimientos
+        db = SessionLocal()
+        try:
+            db.query(SyncUpload).filter(SyncUpload.device_id == "tablet-1").delete()
+            # Por instancia (los movimientos caen en cascada): Query.delete() omite los listeners de flush
+            db.delete(db.get(Product, product_id))
+            db.delete(db.get(User, user_id))
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,130 @@
+import io
+import json
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.main import app as main_app
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.database.models import Product, User, UserRole
+from infrastructure.database.session import SessionLocal, create_tables
+from infrastructure.logging.structured_logger import StructuredFormatter
+from infrastructure.monitoring import tracing
+from infrastructure.monitoring.tracing import (
+    JsonlSpanExporter, TracedProxy, TracingMiddleware, TracingRoute, set_exporter, traced_middleware
+)
+
+
+class StockRepository:
+    def current_stock(self, db):
+        return db.execute(text("SELECT 1")).scalar()
+
+
+def build_app(sample_rate: float) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = TracingRoute
+    app.add_middleware(traced_middleware(CORSMiddleware), allow_origins=["*"])
+    app.add_middleware(TracingMiddleware, sample_rate=sample_rate)
+
+    def get_session():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/stock/{product_id}")
+    def stock(product_id: int, db=Depends(get_session)):
+        logging.getLogger("tracing_test").warning("consultando stock")
+        return {"stock": TracedProxy(StockRepository(), "repository").current_stock(db)}
+
+    return app
+
+
+def test_sampled_request_exports_span_tree(tmp_path):
+    exporter = JsonlSpanExporter(str(tmp_path / "traces.jsonl"))
+    set_exporter(exporter)
+    try:
+        client = TestClient(build_app(sample_rate=1.0))
+        response = client.get("/stock/7", headers={"X-Request-ID": "req-123"})
+        exporter.flush()
+    finally:
+        set_exporter(None)
+
+    assert response.headers["x-request-id"] == "req-123"
+    spans = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    by_name = {span["name"]: span for span in spans}
+    assert {span["correlation_id"] for span in spans} == {"req-123"}
+
+    root = by_name["HTTP GET /stock/{product_id}"]
+    assert root["parent_id"] is None and root["attributes"]["status_code"] == 200
+    assert by_name["middleware CORSMiddleware"]["parent_id"] == root["span_id"]
+    route = by_name["route /stock/{product_id}"]
+    assert by_name["dependencies"]["parent_id"] == route["span_id"]
+    endpoint = by_name["endpoint stock"]
+    repository = by_name["repository StockRepository.current_stock"]
+    assert repository["parent_id"] == endpoint["span_id"]
+    assert by_name["sql SELECT"]["parent_id"] == repository["span_id"]
+
+
+def test_unsampled_request_still_gets_correlation_id_in_logs():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter())
+    test_logger = logging.getLogger("tracing_test")
+    test_logger.addHandler(handler)
+    try:
+        response = TestClient(build_app(sample_rate=0.0)).get("/stock/1")
+    finally:
+        test_logger.removeHandler(handler)
+
+    log_line = json.loads(stream.getvalue().splitlines()[0])
+    assert log_line["correlation_id"] == response.headers["x-request-id"]
+
+
+def test_movement_endpoint_exports_use_case_and_repository_spans(tmp_path, monkeypatch):
+    create_tables()
+    db = SessionLocal()
+    try:
+        user = User(username="trace_op", email="trace_op@scis.com", hashed_password="x", role=UserRole.OPERATOR)
+        product = Product(code="TRACE-1", name="Ladrillo", current_stock=10, max_stock=1000)
+        db.add_all([user, product])
+        db.commit()
+        user_id, product_id = user.id, product.id
+    finally:
+        db.close()
+
+    exporter = JsonlSpanExporter(str(tmp_path / "traces.jsonl"))
+    set_exporter(exporter)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    try:
+        token = JWTHandler.create_access_token({"sub": "trace_op", "user_id": user_id, "role": "operator"})
+        response = TestClient(main_app).post(
+            "/movements/", headers={"Authorization": f"Bearer {token}"},
+            json={"product_id": product_id, "quantity": 3, "movement_type": "OUT", "reason": "Traza"},
+        )
+        exporter.flush()
+    finally:
+        set_exporter(None)
+        # La base de pruebas es compartida: otros tests cuentan los movimientos
+        db = SessionLocal()
+        try:
+            # Por instancia (los movimientos caen en cascada): Query.delete() omite los listeners de flush
+            db.delete(db.get(Product, product_id))
+            db.delete(db.get(User, user_id))
+            db.commit()
+        finally:
+            db.close()
+
+    assert response.status_code == 200
+    spans = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    by_name = {span["name"]: span for span in spans}
+    use_case = by_name["use_case create_movement"]
+    assert use_case["kind"] == "use_case"
+    for name in ("repository Product.find_by_id", "repository InventoryMovement.save"):
+        assert by_name[name]["kind"] == "repository" and by_name[name]["parent_id"] == use_case["span_id"]
+    assert any(span["name"].startswith("sql ") and span["parent_id"] == by_name["repository Product.find_by_id"]["span_id"]
+               for span in spans)
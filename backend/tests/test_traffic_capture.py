@@ -0,0 +1,71 @@
+import itertools
+import json
+
+from fastapi import FastAPI, Form
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from infrastructure.auth.jwt_handler import JWTHandler
+from infrastructure.monitoring.traffic_capture import TrafficCaptureMiddleware, TrafficCaptureWriter
+from benchmarks.replay_traffic import build_request
+
+
+class Movement(BaseModel):
+    product_id: int
+    quantity: int
+    movement_type: str
+    reason: str
+
+
+def build_app(writer: TrafficCaptureWriter) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TrafficCaptureMiddleware, writer=writer, sample_rate=1.0, exclude=["/health"])
+
+    @app.post("/movements/{warehouse_id}", status_code=201)
+    def create_movement(warehouse_id: int, movement: Movement):
+        return {"ok": True}
+
+    @app.post("/token")
+    def token(username: str = Form(...), password: str = Form(...)):
+        return {"access_token": "x"}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def test_capture_is_sanitized_and_replayable(tmp_path):
+    writer = TrafficCaptureWriter(str(tmp_path / "traffic.jsonl"))
+    client = TestClient(build_app(writer))
+    token = JWTHandler.create_access_token({"sub": "ana", "user_id": 1, "role": "operator"})
+
+    client.post(
+        "/movements/3?api_token=abc&page=2&search=Juan+Perez&sort_by=name",
+        json={"product_id": 7, "quantity": 5, "movement_type": "OUT", "reason": "Despacho a obra"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    client.post("/token", data={"username": "ana", "password": "Secreta123!"})
+    client.get("/health")
+    writer.flush()
+
+    movement, login = [json.loads(line) for line in (tmp_path / "traffic.jsonl").read_text().splitlines()]
+    assert movement["route"] == "/movements/{warehouse_id}" and movement["path"] == "/movements/3"
+    assert movement["query"] == {
+        "api_token": "<redacted>", "page": "2", "search": "<str:10>", "sort_by": "name"
+    }
+    assert movement["body"] == {"product_id": 7, "quantity": 5, "movement_type": "OUT", "reason": "<str:15>"}
+    assert (movement["status"], movement["role"]) == (201, "operator")
+    assert login["body"] == {"username": "<str:3>", "password": "<redacted>"}
+    captured = (tmp_path / "traffic.jsonl").read_text()
+    assert "Secreta123!" not in captured and "Juan" not in captured
+
+    request = build_request(movement, {"operator": "tok"}, {"operator": ("op", "pw")}, itertools.count(1))
+    assert request["params"]["page"] == "2" and request["params"]["sort_by"] == "name"
+    assert len(request["params"]["search"]) == 10 and "api_token" not in request["params"]
+    assert request["headers"]["Authorization"] == "Bearer tok"
+    assert request["json"]["movement_type"] == "OUT" and len(request["json"]["reason"]) == 15
+    assert build_request(login, {}, {"operator": ("op", "pw")}, itertools.count(1))["data"] == {
+        "username": "op", "password": "pw"
+    }